@@ -0,0 +1,113 @@
+"""Admission of requests to Практикум.Домашка under a global rate budget.
+
+All the requests share one token bucket. When they have to wait, they are
+admitted in weighted fair queuing order: every request gets a virtual
+finish tag max(virtual time, previous tag of its tenant) + 1 / weight, and
+the smallest tag goes first. A tenant with weight 4 gets up to 4 times the
+share of a tenant with weight 1, but nobody starves: tags of a waiting
+tenant stop growing while others keep being admitted.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+from rate_limit import TokenBucket
+
+COMMAND = 'command'
+REVIEWING = 'reviewing'
+IDLE = 'idle'
+DEFAULT_WEIGHTS: Dict[str, float] = {COMMAND: 8, REVIEWING: 4, IDLE: 1}
+# Tags of tenants older than the virtual time mean nothing, they are
+# dropped when there are more than PRUNE_AT of them.
+PRUNE_AT: int = 10000
+
+WAITING = REGISTRY.gauge(
+    'api_admission_waiting', 'Requests to API waiting for admission'
+)
+DELAY = REGISTRY.histogram(
+    'api_admission_delay_seconds', 'Time requests to API wait for admission'
+)
+
+
+def priority_of(answer: Optional[dict]) -> str:
+    """Priority class of a tenant by its last answer of API."""
+    homeworks = (answer or {}).get('homeworks') or []
+    if homeworks and homeworks[0].get('status') == REVIEWING:
+        return REVIEWING
+    return IDLE
+
+
+class AdmissionController:
+    """Global token bucket with weighted fair queuing of tenants.
+
+    rate == 0 means no limit: acquire() returns at once. The request at
+    the head of the queue waits for the bucket with `sleep`, in the time
+    of `clock`.
+    """
+
+    def __init__(self, rate: float, burst: float = 1,
+                 weights: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        for priority, weight in self.weights.items():
+            if weight <= 0:
+                raise ValueError(f'Weight of {priority} must be positive')
+        self._clock = clock
+        self._sleep = sleep
+        self._bucket = TokenBucket(rate, burst, clock)
+        self._condition = threading.Condition()
+        self._waiting: List[Tuple[float, int]] = []
+        self._tags: Dict[str, float] = {}
+        self._virtual = 0.0
+        self._sequence = itertools.count()
+
+    def acquire(self, tenant: str, priority: str = IDLE) -> float:
+        """Wait until the request of the tenant is admitted.
+
+        Return seconds waited.
+        """
+        if not self._bucket.rate:
+            return 0.0
+        started = self._clock()
+        with self._condition:
+            tag = max(self._virtual, self._tags.get(tenant, 0.0)) + (
+                1 / self.weights.get(priority, self.weights[IDLE])
+            )
+            self._tags[tenant] = tag
+            entry = (tag, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            WAITING.set(len(self._waiting))
+        while not self._admit(entry):
+            # Only the head waits for the bucket, outside of the lock.
+            self._sleep(self._bucket.wait_time())
+        delay = self._clock() - started
+        DELAY.observe(delay, labels={'priority': priority})
+        return delay
+
+    def _admit(self, entry: Tuple[float, int]) -> bool:
+        """Wait to be the head, then admit it if the bucket has a token."""
+        with self._condition:
+            while self._waiting[0] != entry:
+                self._condition.wait()
+            if not self._bucket.try_take():
+                return False
+            heapq.heappop(self._waiting)
+            self._virtual = entry[0]
+            if len(self._tags) > PRUNE_AT:
+                self._tags = {
+                    key: value for key, value in self._tags.items()
+                    if value > self._virtual
+                }
+            WAITING.set(len(self._waiting))
+            self._condition.notify_all()
+            return True
+
+    def waiting(self) -> int:
+        """Number of requests waiting for admission."""
+        with self._condition:
+            return len(self._waiting)
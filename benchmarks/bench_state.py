@@ -0,0 +1,118 @@
+"""Compare memory of the state of tenants: dicts, TenantRegistry, StateTable.
+
+Every tenant has `--homeworks` homeworks in the answer of API. The dict
+representation is the pair of reports main() used to keep: the last and
+the previous answer with the message. TenantRegistry keeps the state of
+polling in a StateTable, with the tenants from the config; StateTable
+alone is the state without the config. Sizes are measured by deep_sizeof.
+
+Usage: python -m benchmarks.bench_state [--tenants 100000]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.soak import deep_sizeof, make_tenant
+from state_table import StateTable, fingerprint_of
+from tenants import TenantRegistry
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+MESSAGE = 'Изменился статус проверки работы "{}". Работа взята на проверку'
+
+
+def answer_json(number: int, homeworks: int) -> str:
+    """Answer of API with the homeworks of the tenant."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number * homeworks + index,
+                'status': STATUSES[index % len(STATUSES)],
+                'homework_name': f'student{number}__hw{index:02d}.zip',
+                'reviewer_comment': 'Принято!',
+                'date_updated': '2024-01-01T00:00:00Z',
+                'lesson_name': f'Спринт {index}',
+            }
+            for index in range(homeworks)
+        ],
+        'current_date': 1704067200,
+    })
+
+
+def reports(tenants: int, homeworks: int) -> dict:
+    """current_report and previous_report of every tenant."""
+    state = {}
+    for number in range(tenants):
+        text = answer_json(number, homeworks)
+        message = MESSAGE.format(f'hw{number}')
+        state[f'tenant-{number}'] = {
+            'current_report': {'homework': json.loads(text),
+                               'message': message},
+            'previous_report': {'homework': json.loads(text),
+                                'message': message},
+        }
+    return state
+
+
+def tenant_registry(tenants: int, homeworks: int) -> TenantRegistry:
+    """Registry of the tenants after a poll of each."""
+    registry = TenantRegistry()
+    registry.apply(
+        [make_tenant(number) for number in range(tenants)], 1704067200
+    )
+    for number, state in enumerate(registry.states()):
+        state.observe(json.loads(answer_json(number, homeworks)))
+        state.last_poll = 1704067200.0
+        state.remember(MESSAGE.format(f'hw{number}'), status=True)
+    return registry
+
+
+def state_table(tenants: int, homeworks: int) -> StateTable:
+    """State of the same tenants as StateTable."""
+    table = StateTable(STATUSES)
+    for number in range(tenants):
+        tenant_id = f'tenant-{number}'
+        row = table.add(tenant_id, cursor=1704067200, last_poll=1704067200.0)
+        table.fingerprint[row] = fingerprint_of(
+            MESSAGE.format(f'hw{number}')
+        )
+        answer = json.loads(answer_json(number, homeworks))
+        table.set_status(row, answer['homeworks'][0]['status'])
+    return table
+
+
+def measure(build, tenants: int, homeworks: int) -> dict:
+    """Build the state and measure it."""
+    started = time.perf_counter()
+    state = build(tenants, homeworks)
+    seconds = time.perf_counter() - started
+    return {
+        'bytes_per_tenant': deep_sizeof(state) / tenants,
+        'build_seconds': seconds,
+    }
+
+
+def main():
+    """Build every representation and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100000)
+    parser.add_argument('--homeworks', type=int, default=5)
+    args = parser.parse_args()
+    results = {
+        'dict reports': measure(reports, args.tenants, args.homeworks),
+        'TenantRegistry': measure(
+            tenant_registry, args.tenants, args.homeworks
+        ),
+        'StateTable': measure(state_table, args.tenants, args.homeworks),
+    }
+    table = results['StateTable']['bytes_per_tenant']
+    for name, result in results.items():
+        print(
+            f'{name}: {result["bytes_per_tenant"]:.0f} bytes per tenant '
+            f'(x{result["bytes_per_tenant"] / table:.1f}), '
+            f'built in {result["build_seconds"]:.2f}s'
+        )
+
+
+if __name__ == '__main__':
+    main()
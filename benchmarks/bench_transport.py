@@ -0,0 +1,76 @@
+"""Compare pooled HTTP/1.1 and HTTP/2 transports against the local fake API.
+
+Every tenant sends one request, `--concurrency` requests are in flight at
+once. The fake answers every request after `--delay` seconds.
+
+Usage: python -m benchmarks.bench_transport [--tenants 1000]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from my_unittests.fakes import FakeHTTP2PracticumAPI, FakePracticumAPI
+from transport import HTTP2Transport, PooledTransport
+
+
+def run(api, transport, tenants, concurrency):
+    """Request the fake for every tenant and return the results."""
+    for tenant in range(tenants):
+        api.set_status(f'token-{tenant}', 'reviewing')
+    url = api.start()
+
+    def request(tenant):
+        response = transport.get(
+            url,
+            headers={'Authorization': f'OAuth token-{tenant}'},
+            params={'from_date': 0},
+        )
+        response.json()
+        return response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        codes = list(executor.map(request, range(tenants)))
+    elapsed = time.perf_counter() - started
+    transport.close()
+    api.stop()
+    return {
+        'seconds': elapsed,
+        'requests_per_second': tenants / elapsed,
+        'connections': api.connections,
+        'errors': sum(code != 200 for code in codes),
+    }
+
+
+def main():
+    """Run both transports and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--delay', type=float, default=0.02)
+    args = parser.parse_args()
+    results = {
+        f'HTTP/1.1 pool of {args.pool_size}': run(
+            FakePracticumAPI(delay=args.delay),
+            PooledTransport(args.pool_size),
+            args.tenants, args.concurrency,
+        ),
+        'HTTP/2': run(
+            FakeHTTP2PracticumAPI(delay=args.delay),
+            HTTP2Transport(prior_knowledge=True),
+            args.tenants, args.concurrency,
+        ),
+    }
+    for name, result in results.items():
+        print(
+            f'{name:>22}: {result["seconds"]:.2f}s, '
+            f'{result["requests_per_second"]:.0f} req/s, '
+            f'{result["connections"]} connections, '
+            f'{result["errors"]} errors'
+        )
+
+
+if __name__ == '__main__':
+    main()
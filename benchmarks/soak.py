@@ -0,0 +1,242 @@
+"""Soak test: many cycles of polling many tenants with bounded memory.
+
+Tenants are polled by homework.poll_tenant against the local fake API
+(in process, no sockets), statuses of some tenants change every cycle
+(an approved homework is followed by a new one, with a new id) and some
+tenants are replaced with new ones. After a warm-up RSS of the
+process and the size of the state kept per tenant are sampled; both must
+stay flat. If they do not, the top allocations grown since the warm-up
+(tracemalloc) are printed.
+
+Usage: python -m benchmarks.soak [--tenants 1000] [--cycles 2000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from typing import List
+
+import homework
+from config import Tenant
+from my_unittests.fakes import FakePracticumAPI, InProcessTransport
+from shadow import ShadowBot
+from tenants import TenantRegistry
+
+STATUSES = ('reviewing', 'rejected', 'reviewing', 'approved')
+MIB = 1024 * 1024
+
+
+class CountingSink:
+    """Sink of ShadowBot which only counts the messages."""
+
+    def __init__(self):
+        self.count = 0
+
+    def emit(self, event):
+        """Count the event."""
+        self.count += 1
+
+
+def rss() -> int:
+    """Resident set size of the process in bytes."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Peak, not current RSS: still never decreases if memory leaks.
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Size of the object with everything it refers to, in bytes.
+
+    Shared objects are counted once; classes, functions and modules are
+    not followed.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, (type, type(sys), type(rss))):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            deep_sizeof(key, seen) + deep_sizeof(value, seen)
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    else:
+        size += sum(
+            deep_sizeof(getattr(obj, name, None), seen)
+            for cls in type(obj).__mro__
+            for name in getattr(cls, '__slots__', ())
+        )
+    return size
+
+
+def make_tenant(number: int) -> Tenant:
+    """Tenant polled with token-<number>."""
+    return Tenant(
+        id=f'tenant-{number}',
+        practicum_token=f'token-{number}',
+        chat_id=str(number),
+    )
+
+
+class Population:
+    """Tenants of the soak test and their statuses in the fake API."""
+
+    def __init__(self, api: FakePracticumAPI, tenants: int, seed: int = 0):
+        self.api = api
+        self.randomizer = random.Random(seed)
+        self.active: List[Tenant] = []
+        self.statuses = {}
+        self.next_number = 0
+        self.next_homework = 0
+        for _ in range(tenants):
+            self.active.append(self._add())
+
+    def _add(self) -> Tenant:
+        tenant = make_tenant(self.next_number)
+        self.next_number += 1
+        self._submit(tenant)
+        return tenant
+
+    def _submit(self, tenant: Tenant) -> None:
+        self.next_homework += 1
+        self.statuses[tenant.id] = (self.next_homework, 0)
+        self.api.set_status(
+            tenant.practicum_token, STATUSES[0], self.next_homework
+        )
+
+    def change_statuses(self, count: int) -> None:
+        """Move `count` random tenants to the next status."""
+        for tenant in self.randomizer.sample(self.active, count):
+            homework_id, status = self.statuses[tenant.id]
+            if status == len(STATUSES) - 1:
+                self._submit(tenant)
+                continue
+            self.statuses[tenant.id] = (homework_id, status + 1)
+            self.api.set_status(
+                tenant.practicum_token, STATUSES[status + 1], homework_id
+            )
+
+    def replace(self, count: int) -> None:
+        """Replace `count` random tenants with new ones."""
+        for _ in range(count):
+            index = self.randomizer.randrange(len(self.active))
+            self.api.remove(self.active[index].practicum_token)
+            del self.statuses[self.active[index].id]
+            self.active[index] = self._add()
+
+
+def check(samples: List[dict], rss_slack: int,
+          state_slack: float) -> List[str]:
+    """Compare the first and the last samples, return the failures."""
+    first, last = samples[0], samples[-1]
+    failures = []
+    if last['rss'] - first['rss'] > rss_slack:
+        failures.append(
+            f'RSS grew by {(last["rss"] - first["rss"]) / MIB:.1f} MiB'
+        )
+    growth = last['state_per_tenant'] / first['state_per_tenant'] - 1
+    if growth > state_slack:
+        failures.append(f'State per tenant grew by {growth:.0%}')
+    return failures
+
+
+def run(tenants: int = 1000, cycles: int = 2000, churn: float = 0.05,
+        replace: float = 0.001, samples: int = 10, top: int = 10,
+        rss_slack: int = 8 * MIB, state_slack: float = 0.1,
+        seed: int = 0) -> dict:
+    """Run the soak test and return its samples and failures.
+
+    Memory is compared between the end of the warm-up (first 10% of
+    cycles) and the end. RSS may grow by `rss_slack` bytes, the state per
+    tenant by `state_slack` of its size after the warm-up.
+    """
+    api = FakePracticumAPI(max_homeworks=1)
+    population = Population(api, tenants, seed)
+    registry = TenantRegistry()
+    sink = CountingSink()
+    bot = ShadowBot(sink)
+    warmup = max(cycles // 10, 1)
+    every = max((cycles - warmup) // samples, 1)
+    result = {'samples': [], 'failures': [], 'top': [], 'polls': 0}
+    saved_transport = homework.TRANSPORT
+    homework.TRANSPORT = InProcessTransport(api)
+    started = time.perf_counter()
+    started_tracing = False
+    try:
+        for cycle in range(1, cycles + 1):
+            population.change_statuses(int(tenants * churn))
+            population.replace(int(tenants * replace))
+            registry.apply(population.active, int(time.time()))
+            states = registry.states()
+            for state in states:
+                homework.poll_tenant(bot, state)
+            result['polls'] += len(states)
+            if cycle == warmup:
+                # Tracing started by somebody else is left running.
+                started_tracing = not tracemalloc.is_tracing()
+                tracemalloc.start()
+                baseline = tracemalloc.take_snapshot()
+            if cycle >= warmup and (cycle - warmup) % every == 0:
+                result['samples'].append({
+                    'cycle': cycle,
+                    'rss': rss(),
+                    'state_per_tenant': deep_sizeof(states) / len(states),
+                })
+        result['failures'] = check(result['samples'], rss_slack, state_slack)
+        if result['failures']:
+            stats = tracemalloc.take_snapshot().compare_to(
+                baseline, 'lineno'
+            )
+            result['top'] = [str(stat) for stat in stats[:top]]
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        homework.TRANSPORT = saved_transport
+    result['seconds'] = time.perf_counter() - started
+    result['messages'] = sink.count
+    return result
+
+
+def main():
+    """Run the soak test, exit with 1 if memory was not flat."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--churn', type=float, default=0.05,
+                        help='share of tenants changing status every cycle')
+    parser.add_argument('--replace', type=float, default=0.001,
+                        help='share of tenants replaced every cycle')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    result = run(
+        args.tenants, args.cycles, args.churn, args.replace, top=args.top
+    )
+    print(f'{result["polls"]} polls in {result["seconds"]:.1f}s, '
+          f'{result["messages"]} messages')
+    for sample in result['samples']:
+        print(f'cycle {sample["cycle"]:>8}: '
+              f'RSS {sample["rss"] / MIB:8.1f} MiB, '
+              f'{sample["state_per_tenant"]:8.0f} bytes per tenant')
+    for failure in result['failures']:
+        print(f'FAILED: {failure}')
+    if result['top']:
+        print('Top allocations grown since the warm-up:')
+        print('\n'.join(result['top']))
+    sys.exit(1 if result['failures'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Pool of telegram bots sharing the delivery of messages.
+
+Telegram limits messages per second of a bot, so several bots deliver
+more. Every chat is pinned to one bot by consistent hashing of its id:
+adding or removing a bot moves only the chats of that bot. Every bot has
+its own connection and rate limit. A bot whose token was revoked
+(Unauthorized) is removed from the ring and its chats move to the other
+bots at once. python-telegram-bot raises Unauthorized for 403 as well, e.g.
+when a user has blocked the bot, so a bot is removed only if get_me()
+fails with Unauthorized too; otherwise it is a failure of that chat only.
+
+The pool has send_message and edit_message_text of telegram.Bot and
+passes anything else (getUpdates, set_webhook) to the first bot. Every
+bot of the pool must be able to write to every chat, e.g. all of them are
+members of the group chats.
+"""
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import telegram
+
+from metrics import REGISTRY
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+REPLICAS: int = 100
+BOT_RATE: float = 25
+
+ALIVE = REGISTRY.gauge('bots_alive', 'Bots of the pool delivering messages')
+SENT = REGISTRY.counter('bot_messages_total', 'Messages sent by the bot')
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Consistent hashing of keys to nodes with `replicas` points each."""
+
+    def __init__(self, nodes=(), replicas: int = REPLICAS):
+        self.replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Add the node."""
+        for replica in range(self.replicas):
+            bisect.insort(self._points, (_hash(f'{node}#{replica}'), node))
+
+    def remove(self, node: str) -> None:
+        """Remove the node, its keys go to the next nodes of the ring."""
+        self._points = [point for point in self._points if point[1] != node]
+
+    def node_for(self, key: str) -> str:
+        """Node the key belongs to."""
+        if not self._points:
+            raise LookupError('Hash ring is empty')
+        index = bisect.bisect(self._points, (_hash(key),))
+        return self._points[index % len(self._points)][1]
+
+    def __len__(self) -> int:
+        return len(self._points) // self.replicas
+
+
+def bot_name(token: str) -> str:
+    """Id of the bot: the part of the token before ':'."""
+    return token.split(':', 1)[0]
+
+
+class BotPool:
+    """Bots by name, chats pinned to them by HashRing."""
+
+    def __init__(self, bots: Dict[str, telegram.Bot], rate: float = BOT_RATE,
+                 sleep=time.sleep):
+        if not bots:
+            raise ValueError('Bot pool needs at least one bot')
+        self.bots = dict(bots)
+        self.primary = next(iter(self.bots.values()))
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._ring = HashRing(self.bots)
+        self._buckets = {
+            name: TokenBucket(rate, burst=rate) for name in self.bots
+        }
+        ALIVE.set(len(self._ring))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ring)
+
+    def __getattr__(self, name):
+        if name == 'primary':
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+
+    def name_for(self, chat_id) -> str:
+        """Name of the bot the chat is pinned to."""
+        with self._lock:
+            return self._ring.node_for(str(chat_id))
+
+    def revoke(self, name: str) -> None:
+        """Stop using the bot, its chats move to the other bots."""
+        with self._lock:
+            self._ring.remove(name)
+            alive = len(self._ring)
+        ALIVE.set(alive)
+        logger.error(f'Token of bot {name} is revoked, {alive} bots left')
+
+    def is_revoked(self, name: str) -> bool:
+        """Check that the token of the bot is rejected by telegram."""
+        try:
+            self.bots[name].get_me()
+        except telegram.error.Unauthorized:
+            return True
+        except telegram.error.TelegramError as error:
+            logger.warning(f'Can not check the token of bot {name}: {error}')
+        return False
+
+    def _call(self, chat_id, method: str, **kwargs):
+        while True:
+            name = self.name_for(chat_id)
+            bucket = self._buckets[name]
+            while not bucket.try_take():
+                self._sleep(bucket.wait_time())
+            try:
+                result = getattr(self.bots[name], method)(
+                    chat_id=chat_id, **kwargs
+                )
+            except telegram.error.Unauthorized:
+                if not self.is_revoked(name):
+                    raise
+                self.revoke(name)
+                if not len(self):
+                    raise
+                continue
+            SENT.inc(labels={'bot': name})
+            return result
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Send the message with the bot of the chat."""
+        return self._call(chat_id, 'send_message', text=text, **kwargs)
+
+    def edit_message_text(self, text=None, chat_id=None, message_id=None,
+                          **kwargs):
+        """Edit the message with the bot of the chat.
+
+        If the chat has moved to another bot, the edit fails with
+        BadRequest and send_card sends a new card.
+        """
+        return self._call(
+            chat_id, 'edit_message_text', text=text, message_id=message_id,
+            **kwargs
+        )
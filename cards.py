@@ -0,0 +1,86 @@
+"""Status "cards": one telegram message per homework, edited in place."""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import telegram
+
+from exceptions import SendMessageError
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class CardStore:
+    """Message id and text of the card of every homework in every chat.
+
+    If `path` is given the mapping is kept in that JSON file, so cards
+    survive restarts of the bot.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cards: Dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self._cards = json.load(file)
+
+    @staticmethod
+    def key(chat_id, homework_id) -> str:
+        """Key of the card, JSON allows only string keys."""
+        return f'{chat_id}:{homework_id}'
+
+    def get(self, chat_id, homework_id) -> Optional[dict]:
+        """Return {'message_id': ..., 'text': ...} or None."""
+        with self._lock:
+            return self._cards.get(self.key(chat_id, homework_id))
+
+    def set(self, chat_id, homework_id, message_id: int, text: str) -> None:
+        """Remember the card and write the mapping to the file."""
+        with self._lock:
+            self._cards[self.key(chat_id, homework_id)] = {
+                'message_id': message_id, 'text': text
+            }
+            if self.path:
+                tmp_path = f'{self.path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(self._cards, file)
+                os.replace(tmp_path, self.path)
+
+
+@timed('deliver')
+def send_card(bot, store: CardStore, chat_id, homework_id, text: str) -> None:
+    """Create the card of the homework or edit the existing one.
+
+    Card is not touched if it already shows the text, so it is safe to
+    repeat the call after a failure.
+    """
+    logger.debug('send_card started')
+    card = store.get(chat_id, homework_id)
+    if card and card['text'] == text:
+        logger.debug(f'Card of homework {homework_id} is up to date')
+        return
+    try:
+        if card:
+            try:
+                bot.edit_message_text(
+                    text=text, chat_id=chat_id, message_id=card['message_id']
+                )
+                store.set(chat_id, homework_id, card['message_id'], text)
+                return
+            except telegram.error.BadRequest as error:
+                if 'not modified' in str(error):
+                    store.set(chat_id, homework_id, card['message_id'], text)
+                    return
+                # The card was deleted from the chat, send a new one.
+                logger.warning(f'Failed to edit card, sending new: {error}')
+        message = bot.send_message(chat_id=chat_id, text=text)
+        store.set(chat_id, homework_id, message.message_id, text)
+    except telegram.error.TelegramError as error:
+        logger.exception('Failed to send a card in telegram')
+        raise SendMessageError('Failed to send a card in telegram') from error
+    logger.debug(f'Card of homework {homework_id} sent in chat {chat_id}')
@@ -0,0 +1,52 @@
+"""Clocks the bot reads time from.
+
+SystemClock is the real time. VirtualClock only moves when somebody sleeps
+on it or advances it, so days of polling can be simulated in milliseconds.
+"""
+
+import time
+
+
+class SystemClock:
+    """Real time of the system.
+
+    time.sleep and time.time are looked up on every call, so patching the
+    time module still works.
+    """
+
+    def time(self) -> float:
+        """Seconds since the epoch."""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """Seconds of a clock which never goes back."""
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        """Block for the seconds."""
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Time which passes only by sleep() and advance()."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def time(self) -> float:
+        """Virtual seconds since the epoch."""
+        return self.now
+
+    def monotonic(self) -> float:
+        """The same virtual time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Move the time forward at once."""
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """Move the time forward."""
+        if seconds < 0:
+            raise ValueError('Time can not go back')
+        self.now += seconds
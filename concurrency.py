@@ -0,0 +1,149 @@
+"""Adaptive (AIMD) limit of concurrent requests to Практикум.Домашка.
+
+The limit grows by one per `limit` healthy responses (additive increase)
+and is multiplied by `decrease` on overload (multiplicative decrease):
+a timeout, 429 Too Many Requests or a latency spike. Latency is tracked
+by two moving averages: `baseline` follows it slowly, `recent` quickly;
+gradient = baseline / recent falls below 1 when requests get slower, and
+below `spike_gradient` it counts as overload. The limit is cut at most
+once per recent latency, so a burst of slow responses of requests sent
+together is one overload.
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import requests
+
+from metrics import REGISTRY
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+TIMEOUTS = (requests.Timeout, socket.timeout, TimeoutError) + (
+    (httpx.TimeoutException,) if httpx is not None else ()
+)
+
+LIMIT = REGISTRY.gauge(
+    'api_concurrency_limit', 'Adaptive limit of concurrent requests to API'
+)
+GRADIENT = REGISTRY.gauge(
+    'api_latency_gradient', 'Baseline latency of API divided by recent one'
+)
+IN_FLIGHT = REGISTRY.gauge(
+    'api_in_flight', 'Requests to API in flight'
+)
+
+
+def is_timeout(error: Optional[BaseException]) -> bool:
+    """Check that the error or one of its causes is a timeout."""
+    while error is not None:
+        if isinstance(error, TIMEOUTS):
+            return True
+        error = error.__cause__
+    return False
+
+
+class Flight:
+    """One request in flight. Set `overloaded` if API says so."""
+
+    def __init__(self):
+        self.overloaded = False
+
+
+class AIMDLimiter:
+    """Limit of requests in flight adapting to latency and overload."""
+
+    def __init__(self, max_limit: int, initial: int = 4, min_limit: int = 1,
+                 decrease: float = 0.5, spike_gradient: float = 0.5,
+                 baseline_alpha: float = 0.02, recent_alpha: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError('Limits must be 1 <= min_limit <= max_limit')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.spike_gradient = spike_gradient
+        self.baseline_alpha = baseline_alpha
+        self.recent_alpha = recent_alpha
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._recent: Optional[float] = None
+        self._decreased_at: Optional[float] = None
+        LIMIT.set(self.limit)
+        GRADIENT.set(1.0)
+
+    @property
+    def limit(self) -> int:
+        """Current limit of requests in flight."""
+        return int(self._limit)
+
+    @property
+    def gradient(self) -> float:
+        """Baseline latency divided by recent latency, at most 1."""
+        if not self._recent:
+            return 1.0
+        return min(self._baseline / self._recent, 1.0)
+
+    @contextmanager
+    def flight(self):
+        """Wait for a free slot, then measure the request in the block.
+
+        Timeouts raised in the block count as overload.
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            IN_FLIGHT.set(self._in_flight)
+        flight = Flight()
+        started = self._clock()
+        try:
+            yield flight
+        except BaseException as error:
+            flight.overloaded = is_timeout(error)
+            raise
+        finally:
+            self._record(self._clock() - started, flight.overloaded)
+
+    def _record(self, latency: float, overloaded: bool) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            IN_FLIGHT.set(self._in_flight)
+            if not overloaded:
+                self._observe(latency)
+                overloaded = self.gradient < self.spike_gradient
+            if overloaded:
+                self._cut()
+            else:
+                self._limit = min(
+                    self._limit + 1 / self._limit, float(self.max_limit)
+                )
+            LIMIT.set(self.limit)
+            GRADIENT.set(self.gradient)
+            self._condition.notify_all()
+
+    def _observe(self, latency: float) -> None:
+        if self._recent is None:
+            self._baseline = self._recent = latency
+            return
+        self._recent += self.recent_alpha * (latency - self._recent)
+        self._baseline += self.baseline_alpha * (latency - self._baseline)
+
+    def _cut(self) -> None:
+        now = self._clock()
+        if (
+            self._decreased_at is not None and self._recent is not None
+            and now - self._decreased_at < self._recent
+        ):
+            return
+        self._decreased_at = now
+        self._limit = max(self._limit * self.decrease, float(self.min_limit))
@@ -0,0 +1,97 @@
+"""Conditional requests to Практикум.Домашка and the cache of answers.
+
+The cache of a tenant keeps validators (ETag, Last-Modified) and the
+decoded body of the last answer. The next request carries them
+(If-None-Match, If-Modified-Since), so a server supporting them answers
+304 Not Modified without a body. If the server does not, a body equal to
+the previous one (by digest) is not decoded again. Either way the cached
+answer itself is returned.
+"""
+
+import hashlib
+import threading
+from http import HTTPStatus
+from typing import Dict, Optional
+
+from metrics import REGISTRY
+
+ANSWERS = REGISTRY.counter(
+    'api_answers_total',
+    'Answers of API: not_modified (304), same_body or changed'
+)
+
+
+class ConditionalCache:
+    """Validators and decoded body of the last answer of one tenant."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._params: Optional[dict] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._digest: Optional[bytes] = None
+        self._answer: Optional[dict] = None
+
+    def request_headers(self, params: dict) -> Dict[str, str]:
+        """Headers making the request for `params` conditional."""
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        with self._lock:
+            if self._answer is None or params != self._params:
+                return headers
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        return headers
+
+    def is_not_modified(self, params: dict, response) -> bool:
+        """Check that the response is 304 to a request this cache made."""
+        with self._lock:
+            return (
+                response.status_code == HTTPStatus.NOT_MODIFIED
+                and self._answer is not None and params == self._params
+            )
+
+    def answer(self, params: dict, response) -> dict:
+        """Return the decoded answer, decoding only a changed body.
+
+        The response must be 200 or is_not_modified().
+        """
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            return self._hit(params, response, 'not_modified')
+        content = getattr(response, 'content', None)
+        digest = (
+            hashlib.blake2b(content, digest_size=16).digest()
+            if isinstance(content, bytes) else None
+        )
+        with self._lock:
+            same_body = (
+                digest is not None and digest == self._digest
+                and params == self._params
+            )
+        if same_body:
+            return self._hit(params, response, 'same_body')
+        answer = response.json()
+        with self._lock:
+            self._params = dict(params)
+            self._digest = digest
+            self._answer = answer
+            self._etag = self._last_modified = None
+            self._store_validators(response)
+        ANSWERS.inc(labels={'result': 'changed'})
+        return answer
+
+    def _hit(self, params: dict, response, result: str) -> dict:
+        with self._lock:
+            self._store_validators(response)
+            answer = self._answer
+        ANSWERS.inc(labels={'result': result})
+        return answer
+
+    def _store_validators(self, response) -> None:
+        # 304 may omit validators: then the previous ones stay valid.
+        headers = getattr(response, 'headers', None) or {}
+        self._etag = headers.get('ETag') or self._etag
+        self._last_modified = headers.get('Last-Modified') or (
+            self._last_modified
+        )
@@ -0,0 +1,164 @@
+"""Tenants and polling policy loaded from a JSON file reloaded on change.
+
+File format:
+{
+    "policy": {"retry_period": 600, "calendar": {...}},
+    "tenants": [
+        {"id": "student", "practicum_token": "...", "chat_id": "12345",
+         "calendar": {...}, "locale": "ru"}
+    ]
+}
+Calendar of the tenant (see polling_calendar.py) overrides the one of the
+policy.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from exceptions import ConfigError
+from polling_calendar import PollingCalendar
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CHECK_INTERVAL: int = 5
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Student whose homeworks are polled and chat statuses are sent to."""
+
+    id: str
+    practicum_token: str
+    chat_id: str
+    calendar: Optional[PollingCalendar] = None
+    locale: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Policy:
+    """Polling policy shared by all tenants."""
+
+    retry_period: int = 600
+    calendar: Optional[PollingCalendar] = None
+
+
+@dataclass(frozen=True)
+class Config:
+    """Content of the config file."""
+
+    tenants: Dict[str, Tenant] = field(default_factory=dict)
+    policy: Policy = field(default_factory=Policy)
+
+
+def parse_config(data: dict) -> Config:
+    """Validate the loaded JSON and build Config from it."""
+    if not isinstance(data, dict):
+        raise ConfigError('Config should be a JSON object')
+    try:
+        policy_data = dict(data.get('policy', {}))
+        if 'calendar' in policy_data:
+            policy_data['calendar'] = PollingCalendar.from_dict(
+                policy_data['calendar']
+            )
+        policy = Policy(**policy_data)
+        if (
+            not isinstance(policy.retry_period, int)
+            or isinstance(policy.retry_period, bool)
+            or policy.retry_period <= 0
+        ):
+            raise ConfigError('retry_period should be a positive integer')
+        tenants = {}
+        for item in data.get('tenants', []):
+            calendar = policy.calendar
+            if 'calendar' in item:
+                calendar = PollingCalendar.from_dict(item['calendar'])
+            tenant = Tenant(
+                id=str(item['id']),
+                practicum_token=item['practicum_token'],
+                chat_id=str(item['chat_id']),
+                calendar=calendar,
+                locale=item.get('locale'),
+            )
+            if tenant.id in tenants:
+                raise ConfigError(f'Tenant {tenant.id} is listed twice')
+            tenants[tenant.id] = tenant
+    except (KeyError, TypeError, ValueError) as error:
+        raise ConfigError(f'Invalid config: {error!r}') from error
+    return Config(tenants=tenants, policy=policy)
+
+
+def load_config(path: str) -> Config:
+    """Read and parse the config file."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            return parse_config(json.load(file))
+    except (OSError, ValueError) as error:
+        raise ConfigError(f'Failed to read config {path}: {error}') from error
+
+
+class ConfigWatcher:
+    """Reload the config when the file changes or reload is requested.
+
+    A daemon thread checks mtime of the file every `interval` seconds and
+    sets `changed`, so a loop sleeping on changed.wait() wakes up at once.
+    request_reload() does the same and is safe to call from a signal
+    handler (SIGHUP).
+    """
+
+    def __init__(self, path: str, interval: float = CONFIG_CHECK_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.changed = threading.Event()
+        self._mtime: Optional[float] = None
+        self._stop = threading.Event()
+
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def request_reload(self) -> None:
+        """Make the next reload() read the file."""
+        self.changed.set()
+
+    def reload(self, current: Optional[Config] = None) -> Optional[Config]:
+        """Return the new config if it has to be (re)loaded, else None.
+
+        Invalid config is logged and the current one is kept.
+        """
+        if current is not None and not self.changed.is_set():
+            return None
+        self.changed.clear()
+        self._mtime = self._read_mtime()
+        try:
+            config = load_config(self.path)
+        except ConfigError:
+            if current is None:
+                raise
+            logger.exception('Config not reloaded, keeping the current one')
+            return None
+        logger.info(
+            f'Config loaded: {len(config.tenants)} tenants, {config.policy}'
+        )
+        return config
+
+    def start(self) -> None:
+        """Watch the file in a daemon thread."""
+        self._mtime = self._read_mtime()
+        threading.Thread(
+            target=self._watch, name='config-watcher', daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self._read_mtime() != self._mtime:
+                self.changed.set()
@@ -0,0 +1,103 @@
+"""Digest delivery: status changes are collected and sent as one message."""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT: int = 4096
+DIGEST_HEADER: str = 'Изменения статусов проверки работ:'
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Split text into parts not longer than limit.
+
+    Text is split by lines, a line longer than limit is split by characters.
+    """
+    parts: List[str] = []
+    current = ''
+    for line in text.split('\n'):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:limit])
+            line = line[limit:]
+        candidate = f'{current}\n{line}' if current else line
+        if len(candidate) > limit:
+            parts.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def render_digest(messages: List[str]) -> str:
+    """Join parse_status messages into the text of the digest."""
+    lines = [DIGEST_HEADER]
+    lines.extend(f'- {message}' for message in messages)
+    return '\n'.join(lines)
+
+
+class DigestBuffer:
+    """Status change messages waiting for the digest of every chat.
+
+    The digest of the chat is due when `interval` seconds passed since its
+    first message or when it has `max_messages` messages.
+    """
+
+    def __init__(self, interval: float, max_messages: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.max_messages = max_messages
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._messages: Dict[str, List[str]] = {}
+        self._started_at: Dict[str, float] = {}
+
+    def add(self, chat_id, message: str) -> None:
+        """Put the message into the digest of the chat."""
+        with self._lock:
+            if chat_id not in self._messages:
+                self._messages[chat_id] = []
+                self._started_at[chat_id] = self._clock()
+            self._messages[chat_id].append(message)
+
+    def _is_due(self, chat_id) -> bool:
+        return (
+            len(self._messages[chat_id]) >= self.max_messages
+            or self._clock() - self._started_at[chat_id] >= self.interval
+        )
+
+    def flush_due(self, send: Callable[[object, str], None]) -> int:
+        """Send due digests as send(chat_id, text) and return their number.
+
+        If sending fails, messages of the chat are kept for the next flush.
+        """
+        with self._lock:
+            due = {
+                chat_id: self._messages.pop(chat_id)
+                for chat_id in list(self._messages)
+                if self._is_due(chat_id)
+            }
+            started_at = {
+                chat_id: self._started_at.pop(chat_id) for chat_id in due
+            }
+        sent = 0
+        for chat_id, messages in due.items():
+            try:
+                for part in split_message(render_digest(messages)):
+                    send(chat_id, part)
+            except Exception:
+                logger.exception(f'Failed to send digest in chat {chat_id}')
+                with self._lock:
+                    self._messages[chat_id] = (
+                        messages + self._messages.get(chat_id, [])
+                    )
+                    self._started_at[chat_id] = started_at[chat_id]
+                continue
+            sent += 1
+        return sent
@@ -9,5 +9,17 @@ class ResponseError(Exception):
     """Got unexpected response from Практикум.Домашка."""
 
 
+class CredentialsError(ResponseError):
+    """Token of Практикум.Домашка is invalid or revoked (401, 403)."""
+
+
 class SendMessageError(Exception):
     """Failed to send a message in telegram."""
+
+
+class TransportError(Exception):
+    """HTTP transport failed to get an answer from Практикум.Домашка."""
+
+
+class ConfigError(Exception):
+    """Config file of tenants is missing or invalid."""
@@ -0,0 +1,559 @@
+"""Append-only history of status transitions of homeworks.
+
+Every change of status the bot detects is one fixed-size record (RECORD)
+of the log: tenant, homework id, lesson, status before and after,
+date_updated and time of detection. Strings (tenant ids, lessons,
+statuses) are interned: `<path>.strings` keeps them one JSON string per
+line and records refer to them by number.
+
+The log is a compacted segment followed by a tail. Records of the segment
+are sorted by lesson, tenant, homework and time, so a lesson is one range
+(kept in `<path>.index`) and records of a homework or a tenant are found
+by binary search within the ranges. Records of the tail are indexed in
+memory, on opening only the tail is read. Queries read the records they
+need, never the whole log.
+
+Compaction sorts only the tail and merges it into the segment found by
+binary search; the segment between the merged records is copied as
+bytes. It costs work in Python and memory of the size of the tail plus
+copying the file, not sorting the whole log again.
+
+Usage: python history.py history.log median [--status reviewing]
+       python history.py history.log transitions --tenant ID
+       python history.py history.log compact
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import os
+import statistics
+import struct
+import threading
+import time
+from array import array
+from typing import (
+    BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple
+)
+
+from slo import parse_date
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HWHIST1\n'
+# Magic and generation of the log, the index is valid for one generation.
+HEADER = struct.Struct('<8sQ')
+# Tenant, homework id, lesson, from and to statuses (numbers of strings),
+# date_updated and time of detection.
+RECORD = struct.Struct('<IqIIIdd')
+COMPACT_EVERY: int = 100000
+CHUNK: int = 65536
+BLOCK: int = 128
+
+
+class Transition(NamedTuple):
+    """One detected change of status."""
+
+    tenant_id: str
+    homework_id: int
+    lesson: str
+    from_status: str
+    to_status: str
+    updated_at: float
+    detected_at: float
+
+
+def _sort_key(record: tuple) -> tuple:
+    return record[2], record[0], record[1], record[5], record[6]
+
+
+def _offset(number: int) -> int:
+    return HEADER.size + number * RECORD.size
+
+
+def _read_records(file: BinaryIO, start: int, end: int) -> List[tuple]:
+    file.seek(_offset(start))
+    return list(RECORD.iter_unpack(file.read((end - start) * RECORD.size)))
+
+
+def _copy(source: BinaryIO, target: BinaryIO, start: int, end: int) -> None:
+    source.seek(_offset(start))
+    while start < end:
+        size = min(CHUNK, end - start)
+        target.write(source.read(size * RECORD.size))
+        start += size
+
+
+class _Segment:
+    """Binary search over the compacted records in the file.
+
+    Sort keys of the first records of blocks of BLOCK records are read
+    once, then a search reads one block.
+    """
+
+    def __init__(self, file: BinaryIO, length: int):
+        self.file = file
+        self.length = length
+        self._first_keys: Optional[List[tuple]] = None
+        self._block: Optional[int] = None
+        self._keys: List[tuple] = []
+
+    def _block_keys(self, block: int) -> List[tuple]:
+        if block != self._block:
+            start = block * BLOCK
+            self._keys = [
+                _sort_key(record) for record in _read_records(
+                    self.file, start, min(start + BLOCK, self.length)
+                )
+            ]
+            self._block = block
+        return self._keys
+
+    def bisect(self, key: tuple, right: bool = False) -> int:
+        """Position of the key in the segment like bisect.bisect_*."""
+        search = bisect.bisect_right if right else bisect.bisect_left
+        if self._first_keys is None:
+            self._first_keys = [
+                _sort_key(_read_records(self.file, number, number + 1)[0])
+                for number in range(0, self.length, BLOCK)
+            ]
+        block = search(self._first_keys, key) - 1
+        if block < 0:
+            return 0
+        return block * BLOCK + search(self._block_keys(block), key)
+
+    def find(self, prefix: tuple) -> Tuple[int, int]:
+        """Range of records whose sort key starts with the prefix."""
+        following = prefix[:-1] + (prefix[-1] + 1,)
+        return self.bisect(prefix), self.bisect(following)
+
+
+def durations(records: Iterable[tuple], status: int) -> List[float]:
+    """Seconds every homework spent in the status, by date_updated."""
+    result = []
+    homework = entered = None
+    for record in sorted(records, key=lambda record: record[:2] + record[5:]):
+        if record[:2] != homework:
+            homework, entered = record[:2], None
+        if record[4] == status:
+            if entered is None:
+                entered = record[5]
+        elif entered is not None:
+            result.append(record[5] - entered)
+            entered = None
+    return result
+
+
+class TransitionLog:
+    """Log of transitions at `path`, compacted every `compact_every` records.
+
+    Only one process may write to the log; `readonly` logs see the records
+    written before they were opened.
+    """
+
+    def __init__(self, path: str, compact_every: int = COMPACT_EVERY,
+                 readonly: bool = False):
+        self.path = path
+        self.compact_every = compact_every
+        self.readonly = readonly
+        self.records_read = 0
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._strings_file = None
+        self._writer = None
+        # Last status of every homework seen since opening.
+        self._last: Dict[Tuple[int, int], int] = {}
+        self._load_strings()
+        self._open()
+
+    @property
+    def _index_path(self) -> str:
+        return f'{self.path}.index'
+
+    def _load_strings(self) -> None:
+        if not os.path.exists(f'{self.path}.strings'):
+            return
+        with open(f'{self.path}.strings', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    string = json.loads(line)
+                except ValueError:
+                    # The line was cut by a crash, records never refer to it.
+                    break
+                self._string_ids[string] = len(self._strings)
+                self._strings.append(string)
+
+    def _intern(self, string: str) -> int:
+        number = self._string_ids.get(string)
+        if number is None:
+            if self._strings_file is None:
+                self._strings_file = open(
+                    f'{self.path}.strings', 'a', encoding='utf-8'
+                )
+            self._strings_file.write(json.dumps(string) + '\n')
+            self._strings_file.flush()
+            number = self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+        return number
+
+    def _open(self) -> None:
+        if not self.readonly and not os.path.exists(self.path):
+            with open(self.path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, 0))
+        self._reader = open(self.path, 'rb')
+        header = self._reader.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a log of transitions')
+        self._generation = HEADER.unpack(header)[1]
+        size = os.fstat(self._reader.fileno()).st_size
+        self._count = (size - HEADER.size) // RECORD.size
+        if not self.readonly:
+            if size != _offset(self._count):
+                # The last record was cut by a crash.
+                os.truncate(self.path, _offset(self._count))
+            self._writer = open(self.path, 'ab')
+        # [start, end) of every lesson in the segment.
+        self._ranges: Dict[int, Tuple[int, int]] = {}
+        self._tail_homeworks: Dict[int, Dict[int, array]] = {}
+        self._tail_lessons: Dict[int, array] = {}
+        self._compacted = self._load_index()
+        self._segment = _Segment(self._reader, self._compacted)
+        self._index_tail()
+
+    def _load_index(self) -> int:
+        try:
+            with open(self._index_path, encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if (
+            index.get('generation') != self._generation
+            or index.get('records', 0) > self._count
+        ):
+            logger.warning(f'{self._index_path} is stale, reading the log')
+            return 0
+        self._ranges = {
+            int(lesson): tuple(bounds)
+            for lesson, bounds in index['lessons'].items()
+        }
+        return index['records']
+
+    def _index_tail(self) -> None:
+        number = self._compacted
+        while number < self._count:
+            end = min(number + CHUNK, self._count)
+            for record in _read_records(self._reader, number, end):
+                self._index(number, record)
+                number += 1
+
+    def _index(self, number: int, record: tuple) -> None:
+        tenant, homework_id, lesson, _, to_status, _, _ = record
+        homeworks = self._tail_homeworks.setdefault(tenant, {})
+        if homework_id not in homeworks:
+            homeworks[homework_id] = array('I')
+        homeworks[homework_id].append(number)
+        if lesson not in self._tail_lessons:
+            self._tail_lessons[lesson] = array('I')
+        self._tail_lessons[lesson].append(number)
+        self._last[tenant, homework_id] = to_status
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def _last_status(self, tenant: int, homework_id: int,
+                     lesson: int) -> Optional[int]:
+        key = (tenant, homework_id)
+        if key not in self._last:
+            records = [] if lesson not in self._ranges else _read_records(
+                self._reader,
+                *self._segment.find((lesson, tenant, homework_id))
+            )
+            self._last[key] = records[-1][4] if records else None
+        return self._last[key]
+
+    def observe(self, tenant_id: str, homework: dict,
+                detected_at: float) -> bool:
+        """Append the transition if the status of the homework changed.
+
+        Return False if the status is the last one recorded for the
+        homework or the homework has no numeric id.
+        """
+        try:
+            homework_id = int(homework.get('id'))
+        except (TypeError, ValueError):
+            return False
+        with self._lock:
+            tenant = self._intern(str(tenant_id))
+            to_status = self._intern(str(homework.get('status')))
+            lesson = self._intern(str(homework.get('lesson_name', '')))
+            last = self._last_status(tenant, homework_id, lesson)
+            if last == to_status:
+                return False
+            record = (
+                tenant,
+                homework_id,
+                lesson,
+                self._intern('') if last is None else last,
+                to_status,
+                parse_date(homework.get('date_updated')) or detected_at,
+                detected_at,
+            )
+            self._writer.write(RECORD.pack(*record))
+            self._writer.flush()
+            self._index(self._count, record)
+            self._count += 1
+        return True
+
+    def _read(self, ranges: Iterable[Tuple[int, int]],
+              tail: Iterable[int]) -> List[tuple]:
+        records = []
+        for start, end in ranges:
+            records.extend(_read_records(self._reader, start, end))
+        for number in tail:
+            records.extend(_read_records(self._reader, number, number + 1))
+        self.records_read += len(records)
+        return records
+
+    def _transition(self, record: tuple) -> Transition:
+        strings = self._strings
+        return Transition(
+            strings[record[0]], record[1], strings[record[2]],
+            strings[record[3]], strings[record[4]], record[5], record[6],
+        )
+
+    def transitions(self, tenant_id: str,
+                    homework_id: Optional[int] = None) -> List[Transition]:
+        """Transitions of homeworks of the tenant, oldest first."""
+        with self._lock:
+            tenant = self._string_ids.get(str(tenant_id))
+            if tenant is None:
+                return []
+            prefix = (tenant,) if homework_id is None else (
+                tenant, homework_id
+            )
+            ranges = [
+                self._segment.find((lesson,) + prefix)
+                for lesson in self._ranges
+            ]
+            tail = [
+                number
+                for key, numbers in self._tail_homeworks.get(
+                    tenant, {}
+                ).items()
+                if homework_id is None or key == homework_id
+                for number in numbers
+            ]
+            records = self._read(ranges, tail)
+            records.sort(key=lambda record: record[1:2] + record[5:])
+            return [self._transition(record) for record in records]
+
+    def lessons(self) -> List[str]:
+        """Lessons there are transitions of."""
+        with self._lock:
+            return sorted(
+                self._strings[lesson]
+                for lesson in set(self._ranges) | set(self._tail_lessons)
+            )
+
+    def time_in_status(self, lesson: str,
+                       status: str = 'reviewing') -> List[float]:
+        """Seconds homeworks of the lesson spent in the status."""
+        with self._lock:
+            lesson_id = self._string_ids.get(lesson)
+            status_id = self._string_ids.get(status)
+            if lesson_id is None or status_id is None:
+                return []
+            bounds = self._ranges.get(lesson_id)
+            records = self._read(
+                [bounds] if bounds else [],
+                self._tail_lessons.get(lesson_id, ()),
+            )
+        return durations(records, status_id)
+
+    def median_times(self, status: str = 'reviewing',
+                     lessons: Optional[Iterable[str]] = None
+                     ) -> Dict[str, Tuple[int, float]]:
+        """Number of homeworks and median time in the status by lesson."""
+        result = {}
+        for lesson in lessons or self.lessons():
+            times = self.time_in_status(lesson, status)
+            if times:
+                result[lesson] = (len(times), statistics.median(times))
+        return result
+
+    def maybe_compact(self) -> bool:
+        """Start compaction in background if the tail is long enough."""
+        with self._lock:
+            if (
+                self.readonly or self._compacting
+                or self._count - self._compacted < self.compact_every
+            ):
+                return False
+            self._compacting = True
+        threading.Thread(
+            target=self.compact, name='history-compact', daemon=True
+        ).start()
+        return True
+
+    def compact(self) -> None:
+        """Merge the tail into the sorted segment and write the index.
+
+        Duplicates of records are dropped. Records appended meanwhile stay
+        in the tail of the new log.
+        """
+        if self.readonly:
+            raise ValueError(f'{self.path} is opened read-only')
+        with self._compact_lock:
+            with self._lock:
+                self._compacting = True
+                count = self._count
+                compacted = self._compacted
+                generation = self._generation + 1
+                ranges = dict(self._ranges)
+            try:
+                self._compact(count, compacted, generation, ranges)
+            finally:
+                with self._lock:
+                    self._compacting = False
+
+    def _compact(self, count: int, compacted: int, generation: int,
+                 ranges: Dict[int, Tuple[int, int]]) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target:
+            tail = sorted(
+                _read_records(source, compacted, count), key=_sort_key
+            )
+            target.write(HEADER.pack(MAGIC, generation))
+            added = _merge(source, _Segment(source, compacted), tail, target)
+            with self._lock:
+                _copy(self._reader, target, count, self._count)
+                target.flush()
+                os.fsync(target.fileno())
+                self._replace(tmp_path, generation, _lesson_ranges(
+                    ranges, added
+                ))
+        logger.debug(
+            f'{self.path} compacted: {count - compacted} records merged '
+            f'into {compacted}, {sum(added.values())} kept'
+        )
+
+    def _replace(self, tmp_path: str, generation: int,
+                 ranges: Dict[int, Tuple[int, int]]) -> None:
+        index = {
+            'generation': generation,
+            'records': max((end for _, end in ranges.values()), default=0),
+            'lessons': ranges,
+        }
+        with open(f'{self._index_path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(index, file)
+        self._reader.close()
+        self._writer.close()
+        os.replace(tmp_path, self.path)
+        os.replace(f'{self._index_path}.tmp', self._index_path)
+        self._open()
+
+    def close(self) -> None:
+        """Close the files of the log."""
+        with self._lock:
+            for file in (self._reader, self._writer, self._strings_file):
+                if file is not None:
+                    file.close()
+
+
+def _is_duplicate(record: tuple, neighbours: Iterable[tuple]) -> bool:
+    return any(
+        other[:3] == record[:3] and other[4:6] == record[4:6]
+        for other in neighbours
+    )
+
+
+def _merge(source: BinaryIO, segment: _Segment, tail: List[tuple],
+           target: BinaryIO) -> Dict[int, int]:
+    """Write the segment with the sorted tail merged into it.
+
+    Return the number of tail records written by lesson.
+    """
+    added: Dict[int, int] = {}
+    position = 0
+    previous: List[tuple] = []
+    for record in tail:
+        key = _sort_key(record)
+        insert = segment.bisect(key, right=True)
+        start, end = segment.find(key[:4])
+        if previous and previous[-1][:3] + previous[-1][5:6] != (
+            record[:3] + record[5:6]
+        ):
+            previous = []
+        if _is_duplicate(record, previous) or _is_duplicate(
+            record, _read_records(source, start, end)
+        ):
+            continue
+        previous.append(record)
+        _copy(source, target, position, insert)
+        target.write(RECORD.pack(*record))
+        position = insert
+        added[record[2]] = added.get(record[2], 0) + 1
+    _copy(source, target, position, segment.length)
+    return added
+
+
+def _lesson_ranges(ranges: Dict[int, Tuple[int, int]],
+                   added: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
+    """Ranges of lessons after `added` records were merged into them."""
+    result = {}
+    start = 0
+    for lesson in sorted(set(ranges) | set(added)):
+        old_start, old_end = ranges.get(lesson, (0, 0))
+        end = start + old_end - old_start + added.get(lesson, 0)
+        result[lesson] = (start, end)
+        start = end
+    return result
+
+
+def main():
+    """Answer questions about the history from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='HISTORY_FILE of the bot')
+    commands = parser.add_subparsers(dest='command', required=True)
+    median = commands.add_parser(
+        'median', help='median time in the status by lesson'
+    )
+    median.add_argument('--status', default='reviewing')
+    median.add_argument('--lesson', action='append')
+    transitions = commands.add_parser(
+        'transitions', help='transitions of homeworks of the tenant'
+    )
+    transitions.add_argument('--tenant', required=True)
+    transitions.add_argument('--homework', type=int)
+    commands.add_parser('compact', help='compact the log of a stopped bot')
+    args = parser.parse_args()
+    if args.command == 'compact':
+        log = TransitionLog(args.path)
+        log.compact()
+        print(f'{len(log)} records')
+        log.close()
+        return
+    log = TransitionLog(args.path, readonly=True)
+    if args.command == 'median':
+        medians = log.median_times(args.status, args.lesson)
+        for lesson, (count, median) in sorted(medians.items()):
+            print(f'{lesson}\t{count} homeworks\t{median / 3600:.1f} h')
+    else:
+        for transition in log.transitions(args.tenant, args.homework):
+            detected = time.strftime(
+                '%Y-%m-%d %H:%M:%S', time.gmtime(transition.detected_at)
+            )
+            print(
+                f'{detected}\t{transition.homework_id}\t{transition.lesson}\t'
+                f'{transition.from_status or "-"} -> {transition.to_status}'
+            )
+    log.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,54 @@ Checks the status of homework code review and sends a message in telegram if
 status has changed.
 """
 
+import itertools
+import json
 import os
-import time
+import signal
+import threading
+import tracemalloc
 import sys
 import requests
 import logging
 from http import HTTPStatus
-from typing import Dict, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
+from functools import partial
+from typing import Dict, List, Union
+from urllib.parse import urlparse
 
 import telegram
 from dotenv import load_dotenv
 
+from admission import COMMAND, IDLE, AdmissionController, priority_of
+from bots import BotPool, bot_name
+from cards import CardStore, send_card
+from concurrency import AIMDLimiter, Flight
+from conditional import ConditionalCache
+from clock import SystemClock
+from config import ConfigWatcher, Tenant
+from digest import DigestBuffer
 from exceptions import (
-    ResponseError, SendMessageError
+    CredentialsError,
+    ConfigError, ResponseError, SendMessageError, TransportError
 )
+from history import TransitionLog
+from lag_watchdog import LagWatchdog
+from lanes import DEFAULT_LIMITS, Lane, PriorityOutbox
+from metrics import REGISTRY, serve_metrics, timed
+from polling_calendar import PollingCalendar
+from profiling import CycleProfiler
+from recording import ApiRecorder
+from shadow import ShadowBot, write_stages
+from slo import LatencyTracker
+from sinks import JsonlSink, SinkHub, StdoutSink, build_sinks
+from status_cache import StatusCache
+from tenants import TenantRegistry, TenantState
+from transport import RequestsTransport, make_transport
+from updates import CommandDispatcher, start_polling
+from verdicts import VerdictCatalog
+from webhook import WebhookServer
 
 load_dotenv()
 
@@ -33,6 +67,159 @@ HOMEWORK_VERDICTS: Dict[str, str] = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+# Messages are rendered from the catalog of verdicts in the LOCALE of the
+# chat. VERDICTS_FILE (JSON, see verdicts.py) adds or overrides locales.
+LOCALE: str = os.getenv('LOCALE', 'ru')
+VERDICTS_FILE: str = os.getenv('VERDICTS_FILE', '')
+VERDICTS = VerdictCatalog.build(HOMEWORK_VERDICTS)
+# 'requests' - new connection per request, 'pooled' - HTTP/1.1 keep-alive
+# pool of HTTP_POOL_SIZE connections, 'http2' - requests are multiplexed
+# over HTTP/2 (needs httpx[http2]).
+HTTP_TRANSPORT: str = os.getenv('HTTP_TRANSPORT', 'requests')
+HTTP_POOL_SIZE: int = int(os.getenv('HTTP_POOL_SIZE', 10))
+TRANSPORT = RequestsTransport()
+# Time of polling and delivery; tests replace it with clock.VirtualClock.
+CLOCK = SystemClock()
+# CONDITIONAL_REQUESTS=1 sends validators of the last answer (ETag,
+# Last-Modified) with requests and does not decode an unchanged answer.
+CONDITIONAL_REQUESTS: bool = os.getenv('CONDITIONAL_REQUESTS', '') == '1'
+HTTP_CACHE = ConditionalCache() if CONDITIONAL_REQUESTS else None
+# Budget of requests per second to API of all tenants together, 0 - no
+# limit. Waiting requests are admitted by weights of their priority class
+# (API_WEIGHTS, JSON): tenants with homework in review are polled first.
+API_RATE: float = float(os.getenv('API_RATE', 0))
+API_BURST: float = float(os.getenv('API_BURST', 1))
+API_WEIGHTS: str = os.getenv('API_WEIGHTS', '')
+ADMISSION = AdmissionController(
+    0, clock=lambda: CLOCK.monotonic(),
+    sleep=lambda seconds: CLOCK.sleep(seconds),
+)
+# Requests to API in flight are limited adaptively (AIMD) up to
+# API_MAX_CONCURRENCY: the limit grows while latency is steady and is
+# halved on timeouts, 429 answers and latency spikes. 0 - no limit.
+API_MAX_CONCURRENCY: int = int(os.getenv('API_MAX_CONCURRENCY', 0))
+LIMITER = (
+    AIMDLimiter(API_MAX_CONCURRENCY, clock=lambda: CLOCK.monotonic())
+    if API_MAX_CONCURRENCY else None
+)
+# '' - bot only sends messages, 'polling' or 'webhook' - bot also answers
+# commands getting them with getUpdates or from telegram webhook.
+UPDATES_MODE: str = os.getenv('UPDATES_MODE', '')
+WEBHOOK_URL: str = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_HOST: str = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT: int = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8443)))
+STATUS_CACHE_TTL: int = int(os.getenv('STATUS_CACHE_TTL', RETRY_PERIOD))
+STATUS_CACHE = StatusCache(
+    ttl=STATUS_CACHE_TTL, clock=lambda: CLOCK.monotonic()
+)
+# JSON file with tenants and polling policy (see config.py). If it is set,
+# PRACTICUM_TOKEN and TELEGRAM_CHAT_ID are not used. The file is reloaded
+# when it changes or on SIGHUP.
+TENANTS_FILE: str = os.getenv('TENANTS_FILE', '')
+POLL_WORKERS: int = int(os.getenv('POLL_WORKERS', 10))
+TENANTS = TenantRegistry(
+    cache_ttl=STATUS_CACHE_TTL, conditional=CONDITIONAL_REQUESTS,
+    clock=lambda: CLOCK.monotonic(),
+)
+# JSON spec of quiet hours of PRACTICUM_TOKEN (see polling_calendar.py).
+# With TENANTS_FILE calendars are set in the file.
+POLL_CALENDAR: str = os.getenv('POLL_CALENDAR', '')
+CALENDAR = None
+# Metrics are served at http://METRICS_HOST:METRICS_PORT/metrics.
+METRICS_HOST: str = os.getenv('METRICS_HOST', '0.0.0.0')
+METRICS_PORT: int = int(os.getenv('METRICS_PORT', 0))
+POLLS_SAVED = REGISTRY.counter(
+    'quiet_polls_saved_total',
+    'Requests to API not sent because of quiet hours',
+)
+# 'messages' - new message on every change of the status, 'cards' - one
+# message per homework edited on every change, 'digest' - changes are sent
+# together once in DIGEST_INTERVAL or after DIGEST_MAX_MESSAGES changes.
+DELIVERY_MODE: str = os.getenv('DELIVERY_MODE', 'messages')
+CARDS_FILE: str = os.getenv('CARDS_FILE', '')
+CARD_STORE = CardStore(CARDS_FILE or None)
+DIGEST_INTERVAL: int = int(os.getenv('DIGEST_INTERVAL', 3600))
+DIGEST_MAX_MESSAGES: int = int(os.getenv('DIGEST_MAX_MESSAGES', 20))
+DIGEST = DigestBuffer(
+    DIGEST_INTERVAL, DIGEST_MAX_MESSAGES, clock=lambda: CLOCK.monotonic()
+)
+# With PRIORITY_LANES=1 messages are sent by a background worker through
+# lanes: status changes > recovery notices > errors > digests. OUTBOX_RATE
+# limits messages per second of all lanes, LANE_LIMITS (JSON) sets limits
+# of lanes, e.g. '{"error": {"max_pending": 100, "rate": 1}}'.
+PRIORITY_LANES: bool = os.getenv('PRIORITY_LANES', '') == '1'
+OUTBOX_RATE: float = float(os.getenv('OUTBOX_RATE', 25))
+# More bots delivering messages, comma separated tokens. Chats are spread
+# over TELEGRAM_TOKEN and these bots, every bot sends up to BOT_RATE
+# messages per second. OUTBOX_RATE is per bot then.
+TELEGRAM_TOKENS: List[str] = [
+    token.strip() for token in os.getenv('TELEGRAM_TOKENS', '').split(',')
+    if token.strip()
+]
+BOT_RATE: float = float(os.getenv('BOT_RATE', 25))
+LANE_LIMITS: str = os.getenv('LANE_LIMITS', '')
+OUTBOX = None
+# Objective of latency from date_updated of a homework to the message
+# about it, seconds. NOTIFY_SLO_PERCENTILE of notifications must be sent
+# in time, otherwise notification_slo_breached metric is 1.
+NOTIFY_SLO: float = float(os.getenv('NOTIFY_SLO', 2 * RETRY_PERIOD))
+NOTIFY_SLO_PERCENTILE: float = float(os.getenv('NOTIFY_SLO_PERCENTILE', 0.9))
+NOTIFY_LATENCY = LatencyTracker(
+    NOTIFY_SLO, NOTIFY_SLO_PERCENTILE, clock=lambda: CLOCK.time()
+)
+# Tenants whose token API rejects (401, 403) are quarantined: the chat is
+# notified once and the tenant is polled once in QUARANTINE_RETRY_PERIOD
+# seconds (0 - only after the token is changed in TENANTS_FILE).
+QUARANTINE_RETRY_PERIOD: int = int(
+    os.getenv('QUARANTINE_RETRY_PERIOD', 24 * 60 * 60)
+)
+QUARANTINED = REGISTRY.gauge(
+    'tenants_quarantined', 'Tenants with tokens rejected by API'
+)
+# Comma separated sinks status changes also go to, e.g.
+# 'stdout,jsonl:events.jsonl,https://example.com/hook'.
+EVENT_SINKS: str = os.getenv('EVENT_SINKS', '')
+SINKS = SinkHub()
+# DRY_RUN=1 runs the whole pipeline but writes messages which would have
+# been sent to DRY_RUN_FILE (JSONL) or stdout instead of telegram. Report:
+# python shadow.py DRY_RUN_FILE --baseline <events of the live worker>.
+DRY_RUN: bool = os.getenv('DRY_RUN', '') == '1'
+DRY_RUN_FILE: str = os.getenv('DRY_RUN_FILE', '')
+DRY_RUN_SINK = None
+# Sanitized answers of API are appended to this file to be replayed later
+# with replay.py.
+API_RECORD_FILE: str = os.getenv('API_RECORD_FILE', '')
+RECORDER = (
+    ApiRecorder(API_RECORD_FILE, secrets=[PRACTICUM_TOKEN])
+    if API_RECORD_FILE else None
+)
+# Every detected change of status is appended to HISTORY_FILE, the log is
+# compacted in background every HISTORY_COMPACT_EVERY records. Queries:
+# python history.py HISTORY_FILE median.
+HISTORY_FILE: str = os.getenv('HISTORY_FILE', '')
+HISTORY_COMPACT_EVERY: int = int(os.getenv('HISTORY_COMPACT_EVERY', 100000))
+HISTORY = None
+# Profile the first PROFILE_CYCLES cycles of main(). SIGUSR1 profiles the
+# next PROFILE_SIGNAL_CYCLES cycles, SIGUSR2 takes a tracemalloc snapshot
+# or compares a new one with the previous. TRACEMALLOC=1 starts tracing
+# allocations at start-up, so the first snapshot shows them all.
+PROFILE_CYCLES: int = int(os.getenv('PROFILE_CYCLES', 0))
+PROFILE_SIGNAL_CYCLES: int = int(os.getenv('PROFILE_SIGNAL_CYCLES', 10))
+PROFILE_DIR: str = os.getenv('PROFILE_DIR', '')
+TRACEMALLOC: bool = os.getenv('TRACEMALLOC', '') == '1'
+# WATCHDOG_THRESHOLD > 0 starts a watchdog measuring scheduler lag every
+# WATCHDOG_INTERVAL seconds. Polls running longer than the threshold are
+# logged with their stacks.
+WATCHDOG_THRESHOLD: float = float(os.getenv('WATCHDOG_THRESHOLD', 0))
+WATCHDOG_INTERVAL: float = float(os.getenv('WATCHDOG_INTERVAL', 0.1))
+WATCHDOG = LagWatchdog(WATCHDOG_THRESHOLD, WATCHDOG_INTERVAL)
+PROFILER = CycleProfiler(
+    watched=(
+        'get_api_answer', 'fetch_answer', 'check_response', 'parse_status',
+        'render_status', 'send_message', 'send_message_to',
+    ),
+    dump_dir=PROFILE_DIR or None,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,12 +229,15 @@ def check_tokens():
 
     By default nesessary tokens are:
     PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    With TENANTS_FILE only TELEGRAM_TOKEN is nesessary.
     """
     logger.debug('check_tokens started')
     expected_variables = {
         'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
         'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
         'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID}
+    if TENANTS_FILE:
+        expected_variables = {'TELEGRAM_TOKEN': TELEGRAM_TOKEN}
     for variable in expected_variables:
         if not expected_variables[variable]:
             logger.critical(f'{variable} not found. Program stopped')
@@ -57,35 +247,66 @@ def check_tokens():
 def send_message(bot, message):
     """Send message to the chat with id == TELEGRAM_CHAT_ID."""
     logger.debug('send_message started')
+    send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+@timed('deliver')
+def send_message_to(bot, chat_id, message):
+    """Send message to the chat with the given id."""
     try:
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message)
-    except telegram.error.TelegramError:
+    except telegram.error.TelegramError as error:
         logger.exception('Failed to send a message in telegram')
         raise SendMessageError(
             'Failed to send a message in telegram'
-        )
+        ) from error
     except Exception:
         logger.exception("Couldn't send a message in telegram.")
         raise Exception(
             "Couldn't send a message in telegram."
         )
     else:
-        logger.debug(f'Message "{message}" sent in chat {TELEGRAM_CHAT_ID}')
+        logger.debug(f'Message "{message}" sent in chat {chat_id}')
 
 
 def get_api_answer(timestamp):
     """Get info about homeworks since the date in the timestamp."""
     logger.debug('get_api_answer started')
+    return fetch_answer(
+        timestamp, HEADERS, HTTP_CACHE, priority_of(STATUS_CACHE.peek())
+    )
+
+
+@timed('fetch')
+def fetch_answer(timestamp, headers, cache=None, priority=IDLE,
+                 tenant=None):
+    """Get info about homeworks of the token in the headers.
+
+    With ConditionalCache the request is conditional and an unchanged
+    answer is taken from the cache. The request waits for ADMISSION in
+    the priority class. The answer is recorded with the id of the tenant
+    and without its token.
+    """
+    params = {'from_date': timestamp}
+    ADMISSION.acquire(headers.get('Authorization', ''), priority)
+    if cache is not None:
+        headers = {**headers, **cache.request_headers(params)}
     request_args: Dict[str, Union[str, dict]] = {
         'url': ENDPOINT,
-        'headers': HEADERS,
-        'params': {'from_date': timestamp}
+        'headers': headers,
+        'params': params
     }
     try:
-        response: requests.models.Response = requests.get(**request_args)
-    except requests.RequestException:
+        with LIMITER.flight() if LIMITER else nullcontext(Flight()) as flight:
+            response: requests.models.Response = TRANSPORT.get(
+                **request_args
+            )
+            flight.overloaded = (
+                response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+            )
+    except (requests.RequestException, TransportError):
         logger.exception('Unexpected answer from API.')
         raise ResponseError(
             'Unexpected answer from API.'
@@ -95,7 +316,18 @@ def get_api_answer(timestamp):
         raise Exception(
             'Something went wrong during request to API.'
         )
-    if response.status_code != HTTPStatus.OK:
+    not_modified = cache is not None and cache.is_not_modified(
+        params, response
+    )
+    if response.status_code in (HTTPStatus.UNAUTHORIZED,
+                                HTTPStatus.FORBIDDEN):
+        record_answer(timestamp, response.status_code, None, tenant=tenant)
+        logger.error(f'API rejected the token: {response.status_code}')
+        raise CredentialsError(
+            f'Token is rejected by API ({response.status_code})'
+        )
+    if response.status_code != HTTPStatus.OK and not not_modified:
+        record_answer(timestamp, response.status_code, None, tenant=tenant)
         logger.exception(
             f'Unexpected status code in response: {response.status_code}\n'
             f'  Request url: {request_args.get("url")}\n'
@@ -105,9 +337,256 @@ def get_api_answer(timestamp):
         raise ResponseError(
             'Unexpected status code in response'
         )
-    return response.json()
+    api_answer = (
+        response.json() if cache is None else cache.answer(params, response)
+    )
+    record_answer(
+        timestamp, HTTPStatus.OK if not_modified else response.status_code,
+        api_answer, not_modified, tenant
+    )
+    return api_answer
+
+
+def record_answer(timestamp, status_code, api_answer, not_modified=False,
+                  tenant=None):
+    """Write the answer to API_RECORD_FILE if recording is on.
+
+    Answers to a tenant are recorded with its id, its token is hidden.
+    """
+    if RECORDER is None:
+        return
+    try:
+        RECORDER.record(
+            timestamp, int(status_code), api_answer, not_modified,
+            tenant=tenant and tenant.id,
+            secrets=[tenant.practicum_token] if tenant else (),
+        )
+    except (OSError, TypeError, ValueError):
+        logger.exception('Failed to record the answer of API')
+
+
+def start_admission():
+    """Create ADMISSION limiting requests to API to API_RATE."""
+    global ADMISSION
+    try:
+        weights = json.loads(API_WEIGHTS) if API_WEIGHTS else {}
+        ADMISSION = AdmissionController(
+            API_RATE, API_BURST, weights, clock=lambda: CLOCK.monotonic(),
+            sleep=lambda seconds: CLOCK.sleep(seconds),
+        )
+    except (TypeError, ValueError) as error:
+        logger.critical(f'API_WEIGHTS: {error}. Program stopped')
+        sys.exit()
+
+
+def start_transport():
+    """Create the transport chosen in HTTP_TRANSPORT."""
+    global TRANSPORT
+    try:
+        TRANSPORT = make_transport(HTTP_TRANSPORT, HTTP_POOL_SIZE)
+    except (ValueError, TransportError) as error:
+        logger.critical(f'{error}. Program stopped')
+        sys.exit()
+
+
+def start_calendar():
+    """Create the calendar from POLL_CALENDAR."""
+    global CALENDAR
+    if not POLL_CALENDAR:
+        return
+    try:
+        CALENDAR = PollingCalendar.from_dict(json.loads(POLL_CALENDAR))
+    except ValueError as error:
+        logger.critical(f'POLL_CALENDAR: {error}. Program stopped')
+        sys.exit()
+
+
+def start_metrics():
+    """Serve metrics if METRICS_PORT is set."""
+    if METRICS_PORT:
+        serve_metrics(METRICS_HOST, METRICS_PORT)
+
+
+def is_quiet_cycle(calendar, last_poll):
+    """Check that the calendar skips the poll of the cycle starting now."""
+    if calendar is None or calendar.should_poll(CLOCK.time(), last_poll):
+        return False
+    POLLS_SAVED.inc()
+    logger.debug('Quiet hours, poll skipped')
+    return True
+
+
+def start_sinks():
+    """Create the sinks listed in EVENT_SINKS.
+
+    Dry run writes status events to its own sink instead.
+    """
+    global SINKS
+    if DRY_RUN:
+        SINKS = SinkHub([DRY_RUN_SINK])
+        return
+    try:
+        SINKS = build_sinks(EVENT_SINKS)
+    except ValueError as error:
+        logger.critical(f'{error}. Program stopped')
+        sys.exit()
+
+
+def status_event(homework, message, chat_id):
+    """Make the event about changed status of the homework."""
+    return {
+        'event': 'status_changed',
+        'chat_id': chat_id,
+        'homework_id': homework.get('id'),
+        'homework_name': homework.get('homework_name'),
+        'status': homework.get('status'),
+        'date_updated': homework.get('date_updated'),
+        'detected_at': int(CLOCK.time()),
+        'message': message,
+    }
+
+
+def start_outbox():
+    """Start OUTBOX worker if PRIORITY_LANES is on."""
+    global OUTBOX
+    if not PRIORITY_LANES:
+        return
+    try:
+        limits = {
+            Lane[name.upper()]: replace(
+                DEFAULT_LIMITS[Lane[name.upper()]], **values
+            )
+            for name, values in json.loads(LANE_LIMITS or '{}').items()
+        }
+    except (KeyError, TypeError, ValueError) as error:
+        logger.critical(f'Invalid LANE_LIMITS: {error!r}. Program stopped')
+        sys.exit()
+    OUTBOX = PriorityOutbox(
+        limits, rate=OUTBOX_RATE * (1 + len(TELEGRAM_TOKENS)),
+        clock=lambda: CLOCK.monotonic(),
+    )
+    OUTBOX.start()
+
+
+def deliver(lane, delivery):
+    """Call the delivery now or queue it in its lane of OUTBOX.
+
+    SendMessageError if the lane is full, like a failed delivery.
+    """
+    if OUTBOX is None:
+        delivery()
+    elif not OUTBOX.submit(lane, delivery):
+        raise SendMessageError(f'Lane {lane.name} is full')
+
+
+def deliver_notice(lane, delivery):
+    """deliver() a notice about an error, True if it is delivered or queued.
+
+    A failure is only logged: the notice is tried again next cycle.
+    """
+    try:
+        deliver(lane, delivery)
+    except Exception:
+        logger.exception('Failed to deliver the notice')
+        return False
+    return True
+
+
+def send_status(bot, homework, message, chat_id=None, lane=Lane.STATUS):
+    """Deliver changed status of the homework according to DELIVERY_MODE.
+
+    The status goes to TELEGRAM_CHAT_ID unless chat_id is given. The event
+    about the change also goes to SINKS. Latency of the notification is
+    measured by NOTIFY_LATENCY (only detection of it in digests).
+    """
+    SINKS.emit(status_event(homework, message, chat_id or TELEGRAM_CHAT_ID))
+    detection = NOTIFY_LATENCY.detected(homework, chat_id or TELEGRAM_CHAT_ID)
+    if DELIVERY_MODE == 'cards':
+        homework_id = homework.get('id', homework.get('homework_name'))
+        delivery = partial(
+            send_card,
+            bot, CARD_STORE, chat_id or TELEGRAM_CHAT_ID, homework_id, message
+        )
+    elif DELIVERY_MODE == 'digest':
+        DIGEST.add(chat_id or TELEGRAM_CHAT_ID, message)
+        return
+    elif chat_id:
+        delivery = partial(send_message_to, bot, chat_id, message)
+    else:
+        delivery = partial(send_message, bot, message)
+    deliver(lane, NOTIFY_LATENCY.tracked(detection, delivery))
+
+
+def flush_digest(bot):
+    """Send digests which are due. Does nothing if there are none."""
+    DIGEST.flush_due(
+        lambda chat_id, text: deliver(
+            Lane.DIGEST, partial(send_message_to, bot, chat_id, text)
+        )
+    )
+
+
+def end_cycle(bot):
+    """Work done after every cycle of polling."""
+    flush_digest(bot)
+    if DRY_RUN_SINK is not None:
+        write_stages(DRY_RUN_SINK)
+    if HISTORY is not None:
+        HISTORY.maybe_compact()
+
+
+def start_bot_pool(bot):
+    """Return BotPool of the bot and TELEGRAM_TOKENS bots if there are any."""
+    if not TELEGRAM_TOKENS:
+        return bot
+    bots = {bot_name(TELEGRAM_TOKEN): bot}
+    for token in TELEGRAM_TOKENS:
+        bots[bot_name(token)] = telegram.Bot(token=token)
+    logger.debug(f'{len(bots)} bots deliver messages')
+    return BotPool(bots, rate=BOT_RATE)
 
 
+def start_history():
+    """Open the log of transitions HISTORY_FILE."""
+    global HISTORY
+    if not HISTORY_FILE:
+        return
+    if DRY_RUN:
+        logger.warning('Dry run: HISTORY_FILE is not written')
+        return
+    try:
+        HISTORY = TransitionLog(HISTORY_FILE, HISTORY_COMPACT_EVERY)
+    except (OSError, ValueError) as error:
+        logger.critical(f'HISTORY_FILE: {error}. Program stopped')
+        sys.exit()
+
+
+def record_history(tenant_id, api_answer):
+    """Append changes of statuses of the homeworks to HISTORY."""
+    if HISTORY is None:
+        return
+    detected_at = CLOCK.time()
+    for homework in api_answer['homeworks']:
+        HISTORY.observe(tenant_id, homework, detected_at)
+
+
+def start_dry_run(bot):
+    """Return ShadowBot standing in for the bot if DRY_RUN is on.
+
+    Files of the live worker are not touched: cards are kept in memory,
+    answers of API are not recorded.
+    """
+    global DRY_RUN_SINK, CARD_STORE, RECORDER
+    if not DRY_RUN:
+        return bot
+    DRY_RUN_SINK = JsonlSink(DRY_RUN_FILE) if DRY_RUN_FILE else StdoutSink()
+    CARD_STORE = CardStore(None)
+    RECORDER = None
+    logger.warning('Dry run: messages are not sent to telegram')
+    return ShadowBot(DRY_RUN_SINK)
+
+
+@timed('check')
 def check_response(response):
     """Ensure that response from Практикум.Домашка has nesessary info."""
     logger.debug('check_response started')
@@ -143,8 +622,7 @@ def parse_status(homework):
     try:
         homework_name: str = homework['homework_name']
         status: str = homework['status']
-        verdict = HOMEWORK_VERDICTS[status]
-        return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+        return VERDICTS.render(homework_name, status, LOCALE, strict=True)
     except KeyError as error:
         logger.exception(
             'Unexpected key. Probably unexpected status of the homework.\n'
@@ -154,48 +632,355 @@ def parse_status(homework):
         )
 
 
-def main():
+@timed('render')
+def render_status(homework, locale=None):
+    """Make the message about the status in the locale of the chat.
+
+    Unlike parse_status an unknown status is not an error: the message
+    just names the status.
     """
-    Ask Практикум.Домашка for status of homework (every 10 mins by default).
-    If status has changed from the last request - sends a message in
-    telegram.
+    try:
+        homework_name: str = homework['homework_name']
+        status: str = homework['status']
+    except KeyError as error:
+        logger.exception(f'Unexpected homework in API response: {error}')
+        raise KeyError('Unexpected homework in API response.')
+    return VERDICTS.render(homework_name, status, locale or LOCALE)
+
+
+def start_verdicts():
+    """Build the catalog of verdicts with VERDICTS_FILE."""
+    global VERDICTS
+    try:
+        VERDICTS = VerdictCatalog.build(
+            HOMEWORK_VERDICTS, VERDICTS_FILE or None, LOCALE
+        )
+    except ValueError as error:
+        logger.critical(f'{error}. Program stopped')
+        sys.exit()
+
+
+def fetch_status(headers=None, tenant=None):
+    """Get all homeworks from Практикум.Домашка for the /status command."""
+    api_answer = fetch_answer(
+        0, headers or HEADERS, priority=COMMAND, tenant=tenant
+    )
+    check_response(api_answer)
+    return api_answer
+
+
+def status_command(bot, update):
+    """Answer /status with the last known status of the homework.
+
+    The answer is taken from the cache of the chat (STATUS_CACHE or the one
+    of the tenant), API is asked only if the cached answer is older than
+    STATUS_CACHE_TTL.
     """
-    logger.debug('main started')
-    check_tokens()
-    bot: telegram.Bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp: int = int(time.time())
-    current_report = {
-        'homework': None,
-        'message': None,
-    }
-    previous_report = {
-        'homework': None,
-        'message': None,
-    }
-    while True:
+    logger.debug('status_command started')
+    chat_id = str(update.effective_chat.id)
+    state = TENANTS.by_chat(chat_id)
+    locale = None
+    if state is not None:
+        cache, locale = state.cache, state.tenant.locale
+        fetch = lambda: fetch_status(  # noqa: E731
+            state.headers, state.tenant
+        )
+    elif not TENANTS_FILE and chat_id == str(TELEGRAM_CHAT_ID):
+        cache, fetch = STATUS_CACHE, fetch_status
+    else:
+        logger.warning(f'/status from unknown chat {chat_id}')
+        return
+    try:
+        api_answer = cache.get(fetch)
+        message = render_status(api_answer['homeworks'][0], locale)
+    except Exception as error:
+        message = f'Failed to get status: {error}'
+    send_message_to(bot, chat_id, message)
+
+
+def start_webhook(bot, dispatcher):
+    """Serve updates at WEBHOOK_HOST:WEBHOOK_PORT and register WEBHOOK_URL.
+
+    Path of WEBHOOK_URL is used as the secret path the server accepts
+    updates at.
+    """
+    path = urlparse(WEBHOOK_URL).path or '/'
+    server = WebhookServer((WEBHOOK_HOST, WEBHOOK_PORT), path, bot, dispatcher)
+    try:
+        bot.set_webhook(url=WEBHOOK_URL)
+    except telegram.error.TelegramError:
+        server.server_close()
+        raise
+    server.serve_in_thread()
+    logger.debug(f'Webhook server started on {WEBHOOK_HOST}:{WEBHOOK_PORT}')
+    return server
+
+
+def start_updates(bot):
+    """Start handling of inbound commands according to UPDATES_MODE.
+
+    Dry run does not handle commands: they belong to the live worker.
+    """
+    if not UPDATES_MODE or DRY_RUN:
+        return None
+    dispatcher = CommandDispatcher()
+    dispatcher.add_handler('status', status_command)
+    if UPDATES_MODE == 'webhook':
         try:
-            api_answer = get_api_answer(timestamp)
-            check_response(api_answer)
-            current_report['homework'] = api_answer
-            current_report['message'] = parse_status(
-                api_answer['homeworks'][0]
+            return start_webhook(bot, dispatcher)
+        except (telegram.error.TelegramError, OSError):
+            logger.exception('Failed to start webhook, fall back to polling')
+            try:
+                bot.delete_webhook()
+            except telegram.error.TelegramError:
+                # getUpdates is retried until the webhook is gone.
+                logger.exception('Failed to delete webhook')
+            return start_polling(bot, dispatcher)
+    if UPDATES_MODE == 'polling':
+        return start_polling(bot, dispatcher)
+    logger.critical(f'Unknown UPDATES_MODE: {UPDATES_MODE}. Program stopped')
+    sys.exit()
+
+
+def start_watchdog():
+    """Start WATCHDOG if WATCHDOG_THRESHOLD is set."""
+    if WATCHDOG_THRESHOLD:
+        WATCHDOG.start()
+
+
+def start_profiling():
+    """Arm PROFILER according to the settings and its signal handlers."""
+    if PROFILE_CYCLES:
+        PROFILER.request(PROFILE_CYCLES)
+    if TRACEMALLOC:
+        tracemalloc.start()
+        PROFILER.request_memory_diff()
+    is_main_thread = threading.current_thread() is threading.main_thread()
+    if hasattr(signal, 'SIGUSR1') and is_main_thread:
+        signal.signal(
+            signal.SIGUSR1,
+            lambda signum, frame: PROFILER.request(PROFILE_SIGNAL_CYCLES)
+        )
+        signal.signal(
+            signal.SIGUSR2,
+            lambda signum, frame: PROFILER.request_memory_diff()
+        )
+
+
+def in_quarantine(state):
+    """Check that the tenant is quarantined and its poll is not due."""
+    if state.quarantined_at is None:
+        return False
+    return (
+        not QUARANTINE_RETRY_PERIOD
+        or CLOCK.time() - state.last_poll < QUARANTINE_RETRY_PERIOD
+    )
+
+
+def quarantine(state, error, send):
+    """Quarantine the tenant with rejected token, `send` the notice once."""
+    if state.quarantined_at is not None:
+        return
+    if QUARANTINE_RETRY_PERIOD:
+        message = (
+            f'Program failure: {error}. The token is checked again every '
+            f'{QUARANTINE_RETRY_PERIOD / 3600:g} hours until it is changed.'
+        )
+    else:
+        message = (
+            f'Program failure: {error}. Statuses are not checked until the '
+            f'token is changed.'
+        )
+    if not deliver_notice(Lane.ERROR, partial(send, message)):
+        return
+    state.quarantined_at = CLOCK.time()
+    logger.error(f'Tenant {state.tenant.id} is quarantined: {error}')
+    state.remember(message)
+
+
+def poll_tenant(bot, state):
+    """One cycle of main() for one tenant.
+
+    Status (or error) is sent only if it differs from the previous one.
+    """
+    chat_id = state.tenant.chat_id
+    if in_quarantine(state) or is_quiet_cycle(
+        state.tenant.calendar, state.last_poll
+    ):
+        return
+    state.last_poll = CLOCK.time()
+    try:
+        api_answer = fetch_answer(
+            state.timestamp, state.headers, state.http_cache,
+            state.priority, state.tenant,
+        )
+        check_response(api_answer)
+        state.observe(api_answer)
+        state.quarantined_at = None
+        record_history(state.tenant.id, api_answer)
+        homework = api_answer['homeworks'][0]
+        message = render_status(homework, state.tenant.locale)
+        if state.is_new(message):
+            # The same status after a failure only says the bot is fine again.
+            lane = (
+                Lane.RECOVERY if state.is_last_status(message)
+                else Lane.STATUS
             )
-            message = current_report['message']
-            if current_report['message'] != previous_report['message']:
-                logger.debug(f'current_report: {current_report}\n'
-                             f'previous_report: {previous_report}')
-                send_message(bot, message)
-                previous_report = current_report.copy()
+            send_status(bot, homework, message, chat_id, lane)
+            state.remember(message, status=True)
+    except CredentialsError as error:
+        quarantine(state, error, partial(send_message_to, bot, chat_id))
+    except Exception as error:
+        error_message = f'Program failure: {error}'
+        if state.is_new(error_message) and deliver_notice(
+            Lane.ERROR, partial(send_message_to, bot, chat_id, error_message)
+        ):
+            state.remember(error_message)
+
+
+def default_state():
+    """State of the tenant of PRACTICUM_TOKEN and TELEGRAM_CHAT_ID."""
+    tenant = Tenant(
+        id='default',
+        practicum_token=PRACTICUM_TOKEN or '',
+        chat_id=str(TELEGRAM_CHAT_ID),
+    )
+    return TenantState(
+        tenant, int(CLOCK.time()), STATUS_CACHE_TTL, cache=STATUS_CACHE
+    )
+
+
+def poll_default(bot, state):
+    """One cycle of main() without TENANTS_FILE.
+
+    Status (or error) is sent only if it differs from the previous one.
+    """
+    if in_quarantine(state) or is_quiet_cycle(CALENDAR, state.last_poll):
+        return
+    state.last_poll = CLOCK.time()
+    with WATCHDOG.watch('poll_default'), PROFILER.cycle():
+        try:
+            api_answer = get_api_answer(state.timestamp)
+            check_response(api_answer)
+            state.observe(api_answer)
+            state.quarantined_at = None
+            record_history(state.tenant.id, api_answer)
+            homework = api_answer['homeworks'][0]
+            message = render_status(homework)
+            if state.is_new(message):
+                logger.debug(f'Status changed: {message}')
+                send_status(bot, homework, message)
+                state.remember(message, status=True)
             else:
                 logger.debug('Homework status did not change')
+        except CredentialsError as error:
+            quarantine(state, error, partial(send_message, bot))
         except Exception as error:
             error_message = f'Program failure: {error}'
-            current_report['message'] = error_message
-            if previous_report != current_report:
-                send_message(bot, error_message)
-                previous_report = current_report.copy()
+            if state.is_new(error_message) and deliver_notice(
+                Lane.ERROR, partial(send_message, bot, error_message)
+            ):
+                state.remember(error_message)
         finally:
-            time.sleep(RETRY_PERIOD)
+            QUARANTINED.set(int(state.quarantined_at is not None))
+            end_cycle(bot)
+
+
+def poll_watched(bot, state):
+    """poll_tenant as a unit of work watched by WATCHDOG and PROFILER."""
+    with WATCHDOG.watch(f'poll_tenant {state.tenant.id}'), PROFILER.task():
+        poll_tenant(bot, state)
+
+
+def poll_tenants(bot):
+    """Poll all the tenants from TENANTS_FILE concurrently, forever.
+
+    Changes of the file are applied between cycles; state of tenants which
+    stay in the file is kept. A change or SIGHUP interrupts the pause
+    between cycles to poll new tenants (and changed tokens) right away,
+    the rest are polled when the pause ends.
+    """
+    logger.debug('poll_tenants started')
+    watcher = ConfigWatcher(TENANTS_FILE)
+    try:
+        config = watcher.reload()
+    except ConfigError as error:
+        logger.critical(f'{error}. Program stopped')
+        sys.exit()
+    is_main_thread = threading.current_thread() is threading.main_thread()
+    if hasattr(signal, 'SIGHUP') and is_main_thread:
+        signal.signal(
+            signal.SIGHUP, lambda signum, frame: watcher.request_reload()
+        )
+    watcher.start()
+    executor = ThreadPoolExecutor(
+        max_workers=POLL_WORKERS, thread_name_prefix='poll'
+    )
+    next_cycle = CLOCK.monotonic()
+    while True:
+        config = watcher.reload(config) or config
+        TENANTS.apply(config.tenants.values(), int(CLOCK.time()))
+        if CLOCK.monotonic() >= next_cycle:
+            states = TENANTS.states()
+            next_cycle = CLOCK.monotonic() + config.policy.retry_period
+        else:
+            states = TENANTS.unpolled()
+        with PROFILER.cycle():
+            list(executor.map(lambda state: poll_watched(bot, state), states))
+            end_cycle(bot)
+        QUARANTINED.set(TENANTS.quarantined())
+        watcher.changed.wait(max(next_cycle - CLOCK.monotonic(), 0))
+
+
+def run(bot, clock=None, transport=None, poll=None, cycles=None):
+    """Poll with the bot, pausing for RETRY_PERIOD of the clock.
+
+    The clock and the transport replace CLOCK and TRANSPORT until it
+    returns. A cycle is `poll(bot)`, poll_default() of default_state() if
+    it is None. Without `cycles` it polls forever.
+    """
+    global CLOCK, TRANSPORT
+    previous = CLOCK, TRANSPORT
+    CLOCK, TRANSPORT = clock or CLOCK, transport or TRANSPORT
+    try:
+        if poll is None:
+            poll = partial(poll_default, state=default_state())
+        for _ in itertools.count() if cycles is None else range(cycles):
+            poll(bot)
+            CLOCK.sleep(RETRY_PERIOD)
+    finally:
+        CLOCK, TRANSPORT = previous
+
+
+def main():
+    """
+    Ask Практикум.Домашка for status of homework (every 10 mins by default).
+    If status has changed from the last request - sends a message in
+    telegram.
+
+    Production dependencies are made here and passed to run(): the bot of
+    TELEGRAM_TOKEN, TRANSPORT and SystemClock, whose pause between cycles
+    is time.sleep(RETRY_PERIOD).
+    """
+    logger.debug('main started')
+    check_tokens()
+    bot: telegram.Bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    bot = start_bot_pool(bot)
+    bot = start_dry_run(bot)
+    start_updates(bot)
+    start_transport()
+    start_admission()
+    start_sinks()
+    start_profiling()
+    start_watchdog()
+    start_calendar()
+    start_history()
+    start_metrics()
+    start_outbox()
+    start_verdicts()
+    if TENANTS_FILE:
+        poll_tenants(bot)
+    run(bot, clock=SystemClock(), transport=TRANSPORT)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,114 @@
+"""Watchdog of scheduler lag and tasks blocked for too long.
+
+A daemon thread wakes up every `interval` seconds. How late it wakes up is
+the scheduler lag: a thread holding the GIL (e.g. decoding a huge JSON)
+delays everybody, the watchdog included. Lag is exported as a histogram.
+
+Units of work run inside watch(name). A unit running longer than
+`threshold` (a synchronous request or send_message left on the hot path)
+is logged once with the stack of its thread. If the lag itself exceeds
+`threshold`, stacks of all the watched units are logged.
+"""
+
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LAG = REGISTRY.histogram(
+    'scheduler_lag_seconds', 'How late the watchdog thread wakes up'
+)
+BLOCKED = REGISTRY.counter(
+    'blocked_tasks_total', 'Units of work running longer than the threshold'
+)
+
+
+def thread_stack(ident: int) -> str:
+    """Current stack of the thread, '' if it has finished."""
+    frame = sys._current_frames().get(ident)
+    if frame is None:
+        return ''
+    return ''.join(traceback.format_stack(frame))
+
+
+class LagWatchdog:
+    """Measure scheduler lag and report blocked units of work.
+
+    threshold == 0 turns the watchdog off.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Thread ident -> (name of the unit, started at, reported).
+        self._units: Dict[int, Tuple[str, float, bool]] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def watch(self, name: str):
+        """Run the block as a watched unit of work of this thread."""
+        if not self.threshold:
+            yield
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            self._units[ident] = (name, self._clock(), False)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._units.pop(ident, None)
+
+    def tick(self, lag: float) -> None:
+        """Record the lag and report blocked units."""
+        LAG.observe(lag)
+        now = self._clock()
+        with self._lock:
+            units = list(self._units.items())
+            for ident, (name, started, reported) in units:
+                if not reported and now - started > self.threshold:
+                    self._units[ident] = (name, started, True)
+        for ident, (name, started, reported) in units:
+            if not reported and now - started > self.threshold:
+                BLOCKED.inc()
+                logger.warning(
+                    f'{name} is running for {now - started:.1f}s:\n'
+                    f'{thread_stack(ident)}'
+                )
+        if lag > self.threshold:
+            stacks = '\n'.join(
+                f'{name}:\n{thread_stack(ident)}'
+                for ident, (name, _, _) in units
+            )
+            logger.warning(f'Scheduler lag {lag:.2f}s. Running:\n{stacks}')
+
+    def start(self) -> None:
+        """Watch in a daemon thread until stop()."""
+        self._thread = threading.Thread(
+            target=self._work, name='watchdog', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watchdog thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _work(self) -> None:
+        while True:
+            expected = self._clock() + self.interval
+            if self._stopped.wait(self.interval):
+                return
+            self.tick(max(self._clock() - expected, 0.0))
@@ -0,0 +1,229 @@
+"""Outbound delivery through prioritized lanes.
+
+Deliveries are callables queued in lanes. A single worker always takes the
+next delivery from the most important lane which is not over its own rate
+limit, so under telegram throttling an "approved" status goes out before a
+burst of error messages. Every lane has a limit of pending deliveries:
+when it is full new deliveries of that lane are refused. A failed delivery
+goes back to the head of its lane and is retried after a growing pause,
+up to MAX_ATTEMPTS times.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+import telegram
+
+from metrics import REGISTRY
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+IDLE_WAIT: float = 1.0
+MAX_ATTEMPTS: int = 5
+# Pause before the second attempt, doubled before every next one.
+RETRY_BACKOFF: float = 1.0
+
+
+class Lane(IntEnum):
+    """Lanes from the most important to the least important one."""
+
+    STATUS = 0
+    RECOVERY = 1
+    ERROR = 2
+    DIGEST = 3
+
+
+@dataclass(frozen=True)
+class LaneLimits:
+    """Limits of one lane. rate is deliveries per second, 0 - no limit."""
+
+    max_pending: int = 1000
+    rate: float = 0
+
+
+DEFAULT_LIMITS: Dict[Lane, LaneLimits] = {
+    Lane.STATUS: LaneLimits(max_pending=10000),
+    Lane.RECOVERY: LaneLimits(max_pending=1000),
+    Lane.ERROR: LaneLimits(max_pending=100, rate=1),
+    Lane.DIGEST: LaneLimits(max_pending=1000, rate=1),
+}
+
+PENDING = REGISTRY.gauge(
+    'outbox_pending', 'Deliveries waiting in the lane'
+)
+DROPPED = REGISTRY.counter(
+    'outbox_dropped_total', 'Deliveries dropped because the lane was full'
+)
+FAILED = REGISTRY.counter(
+    'outbox_failed_total', 'Deliveries given up after MAX_ATTEMPTS'
+)
+QUEUE_DELAY = REGISTRY.histogram(
+    'outbox_queue_delay_seconds', 'Time from submit to delivery'
+)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds telegram asks to wait if the error is flood control."""
+    while error is not None:
+        if isinstance(error, telegram.error.RetryAfter):
+            return float(error.retry_after)
+        error = error.__cause__
+    return None
+
+
+class Pending(NamedTuple):
+    """Delivery waiting in a lane."""
+
+    submitted_at: float
+    deliver: Callable[[], None]
+    attempts: int = 0
+    ready_at: float = 0.0
+
+
+class PriorityOutbox:
+    """Lanes of pending deliveries and the worker delivering them.
+
+    `rate` limits all the lanes together (telegram allows about 30
+    messages per second per bot).
+    """
+
+    def __init__(self, limits: Optional[Dict[Lane, LaneLimits]] = None,
+                 rate: float = 25,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._clock = clock
+        self._bucket = TokenBucket(rate, burst=rate, clock=clock)
+        self._lane_buckets = {
+            lane: TokenBucket(limits.rate, burst=1, clock=clock)
+            for lane, limits in self.limits.items()
+        }
+        self._lanes: Dict[Lane, Deque[Pending]] = {
+            lane: deque() for lane in Lane
+        }
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, lane: Lane, deliver: Callable[[], None]) -> bool:
+        """Queue the delivery. Return False if the lane is full."""
+        with self._condition:
+            queue = self._lanes[lane]
+            if len(queue) >= self.limits[lane].max_pending:
+                DROPPED.inc(labels={'lane': lane.name.lower()})
+                logger.warning(f'Lane {lane.name} is full, delivery dropped')
+                return False
+            queue.append(Pending(self._clock(), deliver))
+            PENDING.set(len(queue), labels={'lane': lane.name.lower()})
+            self._condition.notify()
+        return True
+
+    def pending(self, lane: Lane) -> int:
+        """Number of deliveries waiting in the lane."""
+        with self._condition:
+            return len(self._lanes[lane])
+
+    def take(self) -> Tuple[Optional[Lane], Optional[Pending], float]:
+        """Take the next delivery allowed by the limits.
+
+        Returns (lane, pending delivery, 0) or (None, None, seconds to wait).
+        """
+        with self._condition:
+            if self._is_empty():
+                return None, None, IDLE_WAIT
+            wait = self._bucket.wait_time()
+            if wait:
+                return None, None, wait
+            wait = IDLE_WAIT
+            now = self._clock()
+            for lane in Lane:
+                queue = self._lanes[lane]
+                if not queue:
+                    continue
+                if queue[0].ready_at > now:
+                    wait = min(wait, queue[0].ready_at - now)
+                    continue
+                bucket = self._lane_buckets[lane]
+                if not bucket.try_take():
+                    wait = min(wait, bucket.wait_time())
+                    continue
+                self._bucket.try_take()
+                pending = queue.popleft()
+                PENDING.set(len(queue), labels={'lane': lane.name.lower()})
+                if not pending.attempts:
+                    QUEUE_DELAY.observe(
+                        now - pending.submitted_at,
+                        labels={'lane': lane.name.lower()},
+                    )
+                return lane, pending, 0
+            return None, None, wait
+
+    def requeue(self, lane: Lane, pending: Pending,
+                delay: float = 0.0) -> None:
+        """Put the delivery back to the head of its lane for `delay`."""
+        with self._condition:
+            self._lanes[lane].appendleft(pending._replace(
+                ready_at=self._clock() + delay
+            ))
+            self._condition.notify()
+
+    def run_once(self) -> float:
+        """Deliver one delivery. Return seconds to wait before the next."""
+        lane, pending, wait = self.take()
+        if pending is None:
+            return wait
+        try:
+            pending.deliver()
+        except Exception as error:
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                logger.warning(f'Telegram asks to wait {retry_after}s')
+                self.requeue(lane, pending)
+                return retry_after
+            attempts = pending.attempts + 1
+            if attempts >= MAX_ATTEMPTS:
+                FAILED.inc(labels={'lane': lane.name.lower()})
+                logger.exception(
+                    f'Delivery in lane {lane.name} failed {attempts} times, '
+                    f'given up'
+                )
+                return 0.0
+            delay = RETRY_BACKOFF * 2 ** (attempts - 1)
+            logger.warning(
+                f'Delivery in lane {lane.name} failed: {error!r}, '
+                f'retry in {delay:g}s'
+            )
+            self.requeue(lane, pending._replace(attempts=attempts), delay)
+        return 0.0
+
+    def start(self) -> None:
+        """Deliver in a daemon thread until close()."""
+        self._thread = threading.Thread(
+            target=self._work, name='outbox', daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after the pending deliveries."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _is_empty(self) -> bool:
+        return not any(self._lanes.values())
+
+    def _work(self) -> None:
+        while True:
+            wait = self.run_once()
+            with self._condition:
+                if self._stopped and self._is_empty():
+                    return
+                if wait:
+                    self._condition.wait(wait)
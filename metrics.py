@@ -0,0 +1,229 @@
+"""In-process metrics exported in Prometheus text format.
+
+Histograms keep the last RESERVOIR_SIZE observations only, so memory does
+not grow with uptime; percentiles are computed over them.
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESERVOIR_SIZE: int = 1024
+PERCENTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+def percentile(values: Iterable[float], fraction: float) -> float:
+    """Return the percentile of values (nearest rank), nan if empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return math.nan
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+class Counter:
+    """Value which only grows."""
+
+    kind = 'counter'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, labels: Dict[str, str] = None) -> None:
+        """Add amount to the counter."""
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, labels: Dict[str, str] = None) -> float:
+        """Return the current value."""
+        with self._lock:
+            return self._values.get(_labels(labels), 0)
+
+    def samples(self, name: str):
+        """Yield (name, labels, value) for export."""
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield name, labels, value
+
+
+class Gauge(Counter):
+    """Value which goes up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, labels: Dict[str, str] = None) -> None:
+        """Set the value."""
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+
+class Histogram:
+    """Observations summarized with count, sum and percentiles."""
+
+    kind = 'summary'
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Dict[str, str] = None) -> None:
+        """Record one observation."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [
+                    0, 0.0, deque(maxlen=self.reservoir_size)
+                ]
+            series[0] += 1
+            series[1] += value
+            series[2].append(value)
+
+    def percentile(self, fraction: float,
+                   labels: Dict[str, str] = None) -> float:
+        """Return the percentile of the recent observations."""
+        with self._lock:
+            series = self._series.get(_labels(labels))
+            values = list(series[2]) if series else []
+        return percentile(values, fraction)
+
+    def count(self, labels: Dict[str, str] = None) -> int:
+        """Return the number of observations."""
+        with self._lock:
+            series = self._series.get(_labels(labels))
+            return series[0] if series else 0
+
+    def samples(self, name: str):
+        """Yield (name, labels, value) for export."""
+        with self._lock:
+            items = [
+                (labels, count, total, list(values))
+                for labels, (count, total, values) in self._series.items()
+            ]
+        for labels, count, total, values in items:
+            for fraction in PERCENTILES:
+                yield (
+                    name, labels + (('quantile', str(fraction)),),
+                    percentile(values, fraction)
+                )
+            yield f'{name}_count', labels, count
+            yield f'{name}_sum', labels, total
+
+
+class Registry:
+    """Named metrics of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self._help: Dict[str, str] = {}
+
+    def _get(self, name: str, cls, help_text: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls()
+                self._help[name] = help_text
+            elif not isinstance(metric, cls):
+                raise TypeError(f'Metric {name} is a {metric.kind}')
+            return metric
+
+    def counter(self, name: str, help_text: str = '') -> Counter:
+        """Return the counter, creating it on the first call."""
+        return self._get(name, Counter, help_text)
+
+    def gauge(self, name: str, help_text: str = '') -> Gauge:
+        """Return the gauge, creating it on the first call."""
+        return self._get(name, Gauge, help_text)
+
+    def histogram(self, name: str, help_text: str = '') -> Histogram:
+        """Return the histogram, creating it on the first call."""
+        return self._get(name, Histogram, help_text)
+
+    def render(self) -> str:
+        """Render all the metrics in Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            if self._help[name]:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for sample, labels, value in metric.samples(name):
+                lines.append(f'{sample}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_seconds', 'Duration of the stages of the pipeline'
+)
+
+
+def timed(stage: str):
+    """Decorate a function to observe its duration in STAGE_SECONDS."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(
+                    time.perf_counter() - started, labels={'stage': stage}
+                )
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        data = self.server.registry.render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_metrics(host: str, port: int,
+                  registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve GET /metrics in a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
@@ -0,0 +1,310 @@
+"""Local fakes of Практикум.Домашка API for tests and benchmarks."""
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http import HTTPStatus
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+HOMEWORK_PATH = '/api/user_api/homework_statuses/'
+
+
+class FakePracticumAPI:
+    """HTTP/1.1 fake of the API answering by the OAuth token.
+
+    Homeworks of every token are set with set_status(), homeworks of
+    different tokens have different ids. Every answer is
+    delayed by `delay` seconds; `status_code` forces an error answer.
+    With `conditional` answers have ETag and Last-Modified and requests
+    with matching validators get 304; with `compress` bodies are gzipped
+    for clients accepting it. With `max_homeworks` only that many latest
+    homeworks of a token are kept.
+    """
+
+    def __init__(self, delay: float = 0.0, conditional: bool = False,
+                 compress: bool = False, max_homeworks: int = None):
+        self.delay = delay
+        self.conditional = conditional
+        self.compress = compress
+        self.max_homeworks = max_homeworks
+        self.status_code = None
+        self.homeworks = {}
+        self.versions = {}
+        self.modified = {}
+        self.last_id = 0
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{HOMEWORK_PATH}'
+
+    def set_status(self, token, status, homework_id=None,
+                   homework_name='hw.zip', date_updated=None):
+        """Set status of the homework of the token.
+
+        Without `homework_id` it is the latest homework of the token, a
+        new one if the token has none.
+        """
+        with self._lock:
+            if homework_id is None and self.homeworks.get(token):
+                homework_id = self.homeworks[token][0]['id']
+            elif homework_id is None:
+                self.last_id += 1
+                homework_id = self.last_id
+        homework = {
+            'id': homework_id,
+            'homework_name': homework_name,
+            'lesson_name': 'lesson',
+            'status': status,
+            'reviewer_comment': '',
+            'date_updated': date_updated or time.strftime(
+                '%Y-%m-%dT%H:%M:%SZ', time.gmtime()
+            ),
+        }
+        with self._lock:
+            homeworks = [
+                item for item in self.homeworks.get(token, [])
+                if item['id'] != homework_id
+            ]
+            self.homeworks[token] = ([homework] + homeworks)[
+                :self.max_homeworks
+            ]
+            self.versions[token] = self.versions.get(token, 0) + 1
+            self.modified[token] = int(time.time())
+
+    def remove(self, token):
+        """Forget the token: its requests get 401."""
+        with self._lock:
+            self.homeworks.pop(token, None)
+            self.versions.pop(token, None)
+            self.modified.pop(token, None)
+
+    def is_not_modified(self, authorization, if_none_match,
+                        if_modified_since):
+        """Check the validators of a conditional request."""
+        if not self.conditional:
+            return False
+        token = (authorization or '').replace('OAuth ', '', 1)
+        with self._lock:
+            if token not in self.versions or self.status_code:
+                return False
+            if if_none_match:
+                return if_none_match == f'"{self.versions[token]}"'
+            if if_modified_since:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+                return self.modified[token] <= since
+            return False
+
+    def validators(self, authorization):
+        """Return headers with ETag and Last-Modified of the answer."""
+        token = (authorization or '').replace('OAuth ', '', 1)
+        with self._lock:
+            if not self.conditional or token not in self.versions:
+                return {}
+            return {
+                'ETag': f'"{self.versions[token]}"',
+                'Last-Modified': formatdate(
+                    self.modified[token], usegmt=True
+                ),
+            }
+
+    def answer(self, authorization, from_date):
+        """Return status code and body of the answer."""
+        with self._lock:
+            self.requests += 1
+            if self.status_code:
+                return self.status_code, {'code': 'error'}
+            token = (authorization or '').replace('OAuth ', '', 1)
+            if token not in self.homeworks:
+                return HTTPStatus.UNAUTHORIZED, {
+                    'code': 'not_authenticated',
+                    'message': 'Учетные данные не были предоставлены.',
+                }
+            return HTTPStatus.OK, {
+                'homeworks': list(self.homeworks[token]),
+                'current_date': int(time.time()),
+            }
+
+    def start(self):
+        """Serve in a daemon thread, return the url of the endpoint."""
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        ).start()
+        return self.url
+
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeResponse:
+    """Response of InProcessTransport."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        """Return the body."""
+        return self._body
+
+
+class InProcessTransport:
+    """Transport asking the fake directly, without sockets and JSON.
+
+    For runs of millions of requests, e.g. the soak test.
+    """
+
+    def __init__(self, api):
+        self.api = api
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        """Return the answer of the fake."""
+        status_code, body = self.api.answer(
+            (headers or {}).get('Authorization'),
+            (params or {}).get('from_date', 0),
+        )
+        return FakeResponse(status_code, body)
+
+    def close(self):
+        """Nothing to close."""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.api._lock:
+            self.server.api.connections += 1
+
+    def do_GET(self):
+        api = self.server.api
+        if api.delay:
+            time.sleep(api.delay)
+        authorization = self.headers.get('Authorization')
+        if api.is_not_modified(authorization,
+                               self.headers.get('If-None-Match'),
+                               self.headers.get('If-Modified-Since')):
+            with api._lock:
+                api.requests += 1
+                api.not_modified += 1
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in api.validators(authorization).items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        query = parse_qs(urlparse(self.path).query)
+        status_code, body = api.answer(
+            authorization, query.get('from_date', ['0'])[0],
+        )
+        data = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        if status_code == HTTPStatus.OK:
+            for name, value in api.validators(authorization).items():
+                self.send_header(name, value)
+        accept_encoding = self.headers.get('Accept-Encoding') or ''
+        if api.compress and 'gzip' in accept_encoding:
+            data = gzip.compress(data)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with api._lock:
+            api.bytes_sent += len(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeHTTP2PracticumAPI(FakePracticumAPI):
+    """The same fake speaking cleartext HTTP/2 (h2c, prior knowledge).
+
+    Needs the `h2` package.
+    """
+
+    def start(self):
+        """Serve in a thread with its own event loop."""
+        if h2 is None:
+            raise RuntimeError('FakeHTTP2PracticumAPI needs h2 package')
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            self._loop.create_server(
+                lambda: _H2Protocol(self), '127.0.0.1', 0
+            )
+        )
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}{HOMEWORK_PATH}'
+
+    def stop(self):
+        """Stop serving and the event loop."""
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class _H2Protocol(asyncio.Protocol):
+    def __init__(self, api):
+        self.api = api
+        self.connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+
+    def connection_made(self, transport):
+        self.api.connections += 1
+        self.transport = transport
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data):
+        for event in self.connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                headers = {
+                    key.decode() if isinstance(key, bytes) else key:
+                    value.decode() if isinstance(value, bytes) else value
+                    for key, value in event.headers
+                }
+                asyncio.ensure_future(self.respond(event.stream_id, headers))
+        self.transport.write(self.connection.data_to_send())
+
+    async def respond(self, stream_id, headers):
+        if self.api.delay:
+            await asyncio.sleep(self.api.delay)
+        query = parse_qs(urlparse(headers[':path']).query)
+        status_code, body = self.api.answer(
+            headers.get('authorization'), query.get('from_date', ['0'])[0]
+        )
+        data = json.dumps(body).encode()
+        self.connection.send_headers(stream_id, [
+            (':status', str(int(status_code))),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(data))),
+        ])
+        self.connection.send_data(stream_id, data, end_stream=True)
+        self.transport.write(self.connection.data_to_send())
@@ -0,0 +1,156 @@
+"""Time-compressed simulation of the bot against the fake API.
+
+homework.run() polls with ShadowBot, a VirtualClock and the in-process
+transport of the fake API, so days of polling every RETRY_PERIOD take
+milliseconds. Status changes are scheduled at virtual moments.
+
+    simulation = Simulation()
+    simulation.schedule(DAY, 'token', 'approved')
+    simulation.run(30 * DAY)
+    simulation.messages()  # [(virtual time, chat id, text), ...]
+"""
+
+import heapq
+import itertools
+import math
+import time
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
+from unittest import mock
+
+import homework
+from clock import VirtualClock
+from config import Tenant
+from digest import DigestBuffer
+from metrics import Registry
+from my_unittests.fakes import FakePracticumAPI, InProcessTransport
+from shadow import ShadowBot
+from slo import LatencyTracker
+from tenants import TenantRegistry
+
+DAY: int = 24 * 60 * 60
+# 2024-01-01 00:00 UTC, a Monday.
+START: float = 1704067200.0
+
+
+class ListSink:
+    """Sink keeping the events of ShadowBot."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        """Keep the event."""
+        self.events.append(event)
+
+
+class Simulation:
+    """Virtual time, the fake API and the bot recording what it sends.
+
+    Without `tenants` the bot polls like main() without TENANTS_FILE,
+    with `token` and `chat_id`. The settings of the default tenant and
+    the state homework keeps per process (cache, digest, latency) are
+    replaced while the simulation runs, so simulations do not share them.
+    """
+
+    def __init__(self, tenants: Optional[Sequence[Tenant]] = None,
+                 token: str = 'sometoken', chat_id: str = '1',
+                 start: float = START):
+        self.clock = VirtualClock(start)
+        self.start = start
+        self.api = FakePracticumAPI()
+        self.sink = ListSink()
+        self.bot = ShadowBot(self.sink, clock=self.clock.time)
+        self.tenants = list(tenants or [])
+        self.token = token
+        self.chat_id = chat_id
+        self.cycles = 0
+        self.status_cache = homework.StatusCache(
+            homework.STATUS_CACHE_TTL, clock=self.clock.monotonic
+        )
+        # Buffered digests and measured changes of this simulation, on its
+        # clock: the globals of homework started with the real time.
+        self.digest = DigestBuffer(
+            homework.DIGEST_INTERVAL, homework.DIGEST_MAX_MESSAGES,
+            clock=self.clock.monotonic,
+        )
+        self.latency = LatencyTracker(
+            homework.NOTIFY_SLO, homework.NOTIFY_SLO_PERCENTILE,
+            clock=self.clock.time, registry=Registry(),
+        )
+        self.registry = TenantRegistry(clock=self.clock.monotonic)
+        self._poll = None
+        self._events: List[Tuple[float, int, tuple]] = []
+        self._sequence = itertools.count()
+
+    def schedule(self, at: float, token: str, status: str,
+                 homework_id: Optional[int] = None) -> None:
+        """Change status of the homework `at` seconds after the start.
+
+        Without `homework_id` it is the latest homework of the token.
+        """
+        heapq.heappush(self._events, (
+            self.start + at, next(self._sequence),
+            (token, status, homework_id),
+        ))
+
+    def _apply_due(self) -> None:
+        while self._events and self._events[0][0] <= self.clock.time():
+            at, _, (token, status, homework_id) = heapq.heappop(
+                self._events
+            )
+            self.api.set_status(
+                token, status, homework_id,
+                date_updated=time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ', time.gmtime(at)
+                ),
+            )
+
+    def run(self, seconds: float, **patches) -> None:
+        """Poll for `seconds` of virtual time.
+
+        `patches` replace more globals of homework, e.g. CALENDAR.
+        """
+        cycles = math.ceil(seconds / homework.RETRY_PERIOD)
+        with mock.patch.multiple(homework, **{
+            'HEADERS': {'Authorization': f'OAuth {self.token}'},
+            'TELEGRAM_CHAT_ID': self.chat_id,
+            'STATUS_CACHE': self.status_cache,
+            'DIGEST': self.digest,
+            'NOTIFY_LATENCY': self.latency,
+            **patches,
+        }):
+            homework.run(
+                self.bot, self.clock, InProcessTransport(self.api),
+                poll=self._cycle, cycles=cycles,
+            )
+
+    def _cycle(self, bot) -> None:
+        if self._poll is None:
+            self._poll = self._make_poll()
+        self._apply_due()
+        self._poll(bot)
+        self.cycles += 1
+
+    def _make_poll(self):
+        if not self.tenants:
+            state = homework.default_state()
+            return partial(homework.poll_default, state=state)
+        self.registry.apply(self.tenants, int(self.clock.time()))
+
+        def poll(bot):
+            for state in self.registry.states():
+                homework.poll_tenant(bot, state)
+        return poll
+
+    def apply(self, tenants: Sequence[Tenant]) -> None:
+        """Change the tenants like an edit of TENANTS_FILE."""
+        self.tenants = list(tenants)
+        self.registry.apply(self.tenants, int(self.clock.time()))
+
+    def messages(self) -> List[Tuple[float, str, str]]:
+        """(seconds since the start, chat id, text) of sent messages."""
+        return [
+            (event['t'] - self.start, event['chat_id'], event['text'])
+            for event in self.sink.events
+        ]
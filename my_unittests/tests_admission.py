@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+
+from admission import (
+    DELAY, IDLE, REVIEWING, AdmissionController, priority_of
+)
+from clock import VirtualClock
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not met in time')
+        time.sleep(0.001)
+
+
+class SteppedClock(VirtualClock):
+    """Virtual time moved by the test, sleep() blocks until it is moved."""
+
+    def __init__(self):
+        super().__init__()
+        self.moved = threading.Condition()
+
+    def sleep(self, seconds):
+        with self.moved:
+            deadline = self.now + seconds
+            self.moved.wait_for(lambda: self.now >= deadline)
+
+    def advance(self, seconds):
+        with self.moved:
+            super().advance(seconds)
+            self.moved.notify_all()
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = SteppedClock()
+        self.controller = AdmissionController(
+            rate=1, burst=1, clock=self.clock.monotonic,
+            sleep=self.clock.sleep,
+        )
+        self.admitted = []
+        self.lock = threading.Lock()
+
+    def enqueue(self, tenant, priority):
+        def acquire():
+            self.controller.acquire(tenant, priority)
+            with self.lock:
+                self.admitted.append(tenant)
+
+        waiting = self.controller.waiting()
+        threading.Thread(target=acquire, daemon=True).start()
+        wait_for(lambda: self.controller.waiting() == waiting + 1)
+
+    def test_no_limit(self):
+        controller = AdmissionController(rate=0)
+        self.assertEqual(controller.acquire('a'), 0.0)
+
+    def test_weighted_fair_order(self):
+        reviewing_before = DELAY.count(labels={'priority': REVIEWING})
+        self.controller.acquire('first')
+        for _ in range(2):
+            self.enqueue('idle', IDLE)
+        for _ in range(4):
+            self.enqueue('busy', REVIEWING)
+        for admitted in range(1, 7):
+            self.clock.advance(1)
+            wait_for(lambda: len(self.admitted) == admitted)
+        self.assertEqual(
+            self.admitted, ['busy', 'busy', 'busy', 'idle', 'busy', 'idle']
+        )
+        self.assertEqual(
+            DELAY.count(labels={'priority': REVIEWING}),
+            reviewing_before + 4
+        )
+
+    def test_waits_in_time_of_clock(self):
+        clock = VirtualClock()
+        controller = AdmissionController(
+            rate=0.001, burst=1, clock=clock.monotonic, sleep=clock.sleep
+        )
+        controller.acquire('a')
+        started = time.monotonic()
+        self.assertEqual(controller.acquire('a'), 1000)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_invalid_weight(self):
+        with self.assertRaises(ValueError):
+            AdmissionController(rate=1, weights={IDLE: 0})
+
+
+class TestPriority(unittest.TestCase):
+    def test_priority_of(self):
+        answer = {'homeworks': [{'status': 'reviewing'}]}
+        self.assertEqual(priority_of(answer), REVIEWING)
+        self.assertEqual(priority_of({'homeworks': []}), IDLE)
+        self.assertEqual(priority_of(None), IDLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from collections import Counter
+
+import telegram
+
+from bots import ALIVE, BotPool, HashRing, bot_name
+
+
+class FakeBot:
+    def __init__(self, revoked=False):
+        self.revoked = revoked
+        self.blocked = set()
+        self.sent = []
+
+    def get_me(self):
+        if self.revoked:
+            raise telegram.error.Unauthorized('Unauthorized')
+        return telegram.User(1, 'bot', True)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.revoked:
+            raise telegram.error.Unauthorized('Unauthorized')
+        if chat_id in self.blocked:
+            raise telegram.error.Unauthorized(
+                'Forbidden: bot was blocked by the user'
+            )
+        self.sent.append((chat_id, text))
+        return len(self.sent)
+
+
+class TestHashRing(unittest.TestCase):
+    def test_balanced(self):
+        ring = HashRing(['a', 'b', 'c'])
+        nodes = Counter(ring.node_for(str(key)) for key in range(3000))
+        self.assertEqual(set(nodes), {'a', 'b', 'c'})
+        self.assertTrue(all(count > 600 for count in nodes.values()))
+
+    def test_removal_moves_only_keys_of_node(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(str(key)) for key in range(1000)}
+        ring.remove('b')
+        for key, node in before.items():
+            if node != 'b':
+                self.assertEqual(ring.node_for(str(key)), node)
+            else:
+                self.assertIn(ring.node_for(str(key)), ('a', 'c'))
+
+
+class TestBotPool(unittest.TestCase):
+    def setUp(self):
+        self.bots = {'1': FakeBot(), '2': FakeBot(), '3': FakeBot()}
+        self.sleeps = []
+        self.pool = BotPool(self.bots, rate=1, sleep=self.sleeps.append)
+
+    def test_chat_pinned_to_one_bot(self):
+        name = self.pool.name_for(42)
+        self.pool.send_message(chat_id=42, text='a')
+        self.assertEqual(self.bots[name].sent, [(42, 'a')])
+
+    def test_bots_have_own_limits(self):
+        chats = {}
+        for chat_id in range(100):
+            chats.setdefault(self.pool.name_for(chat_id), chat_id)
+        for chat_id in chats.values():
+            self.pool.send_message(chat_id=chat_id, text='a')
+        self.assertEqual(len(chats), 3)
+        self.assertEqual(self.sleeps, [])
+
+    def test_revoked_bot_chats_move(self):
+        name = self.pool.name_for(42)
+        self.bots[name].revoked = True
+        with self.assertLogs('bots', level='ERROR'):
+            self.pool.send_message(chat_id=42, text='a')
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(ALIVE.value(), 2)
+        other = self.pool.name_for(42)
+        self.assertNotEqual(other, name)
+        self.assertEqual(self.bots[other].sent, [(42, 'a')])
+
+    def test_all_revoked(self):
+        for bot in self.bots.values():
+            bot.revoked = True
+        with self.assertLogs('bots', level='ERROR'):
+            with self.assertRaises(telegram.error.Unauthorized):
+                self.pool.send_message(chat_id=42, text='a')
+
+    def test_blocked_chat_keeps_bots(self):
+        for bot in self.bots.values():
+            bot.blocked.add(42)
+        with self.assertRaises(telegram.error.Unauthorized):
+            self.pool.send_message(chat_id=42, text='a')
+        self.assertEqual(len(self.pool), 3)
+        name = self.pool.name_for(7)
+        self.pool.send_message(chat_id=7, text='b')
+        self.assertEqual(self.bots[name].sent, [(7, 'b')])
+
+    def test_other_attributes_of_primary_bot(self):
+        self.bots['1'].get_updates = lambda: 'updates'
+        self.assertEqual(self.pool.get_updates(), 'updates')
+
+    def test_bot_name(self):
+        self.assertEqual(bot_name('123:secret'), '123')
+
+
+if __name__ == '__main__':
+    unittest.main()
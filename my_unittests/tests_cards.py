@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import telegram
+
+from cards import CardStore, send_card
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.message_id = message_id
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.edited = []
+        self.edit_error = None
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+        return FakeMessage(len(self.sent))
+
+    def edit_message_text(self, text=None, chat_id=None, message_id=None,
+                          **kwargs):
+        if self.edit_error:
+            raise self.edit_error
+        self.edited.append((message_id, text))
+
+
+class TestCards(unittest.TestCase):
+    def setUp(self):
+        self.bot = FakeBot()
+        self.store = CardStore()
+
+    def test_status_changes_edit_one_message(self):
+        for text in ('reviewing', 'rejected', 'reviewing', 'approved'):
+            send_card(self.bot, self.store, 12345, 710842, text)
+        self.assertEqual(self.bot.sent, ['reviewing'])
+        self.assertEqual(
+            self.bot.edited,
+            [(1, 'rejected'), (1, 'reviewing'), (1, 'approved')]
+        )
+
+    def test_retry_is_idempotent(self):
+        send_card(self.bot, self.store, 12345, 710842, 'approved')
+        send_card(self.bot, self.store, 12345, 710842, 'approved')
+        self.assertEqual(self.bot.sent, ['approved'])
+        self.assertEqual(self.bot.edited, [])
+
+    def test_deleted_card_is_sent_again(self):
+        send_card(self.bot, self.store, 12345, 710842, 'reviewing')
+        self.bot.edit_error = telegram.error.BadRequest(
+            'Message to edit not found'
+        )
+        send_card(self.bot, self.store, 12345, 710842, 'approved')
+        self.assertEqual(self.bot.sent, ['reviewing', 'approved'])
+        self.assertEqual(self.store.get(12345, 710842)['message_id'], 2)
+
+    def test_cards_persisted_in_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cards.json')
+            send_card(self.bot, CardStore(path), 12345, 710842, 'reviewing')
+            card = CardStore(path).get(12345, 710842)
+        self.assertEqual(card, {'message_id': 1, 'text': 'reviewing'})
+
+
+if __name__ == '__main__':
+    unittest.main()
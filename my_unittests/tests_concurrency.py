@@ -0,0 +1,108 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+
+import homework
+from clock import VirtualClock
+from concurrency import GRADIENT, LIMIT, AIMDLimiter
+from my_unittests.fakes import FakePracticumAPI
+from transport import PooledTransport
+
+
+class TestAIMDLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.limiter = AIMDLimiter(
+            max_limit=8, initial=2, clock=self.clock.monotonic
+        )
+
+    def request(self, latency, overloaded=False):
+        with self.limiter.flight() as flight:
+            self.clock.now += latency
+            flight.overloaded = overloaded
+
+    def test_additive_increase_up_to_max(self):
+        for _ in range(3):
+            self.request(1)
+        self.assertEqual(self.limiter.limit, 3)
+        for _ in range(100):
+            self.request(1)
+        self.assertEqual(self.limiter.limit, 8)
+        self.assertEqual(LIMIT.value(), 8)
+
+    def test_overload_halves_limit_once_per_latency(self):
+        for _ in range(100):
+            self.request(1)
+        self.request(0, overloaded=True)
+        self.assertEqual(self.limiter.limit, 4)
+        self.request(0, overloaded=True)
+        self.assertEqual(self.limiter.limit, 4)
+        self.clock.now += 2
+        self.request(0, overloaded=True)
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_timeout_is_overload(self):
+        for _ in range(100):
+            self.request(1)
+        with self.assertRaises(requests.Timeout):
+            with self.limiter.flight():
+                raise requests.Timeout()
+        self.assertEqual(self.limiter.limit, 4)
+
+    def test_latency_spike_is_overload(self):
+        for _ in range(100):
+            self.request(1)
+        self.request(5)
+        self.assertLess(self.limiter.gradient, 0.5)
+        self.assertEqual(GRADIENT.value(), self.limiter.gradient)
+        self.assertEqual(self.limiter.limit, 4)
+
+
+class TestLimiterWithFakeAPI(unittest.TestCase):
+    def setUp(self):
+        self.api = FakePracticumAPI()
+        self.api.set_status('sometoken', 'reviewing')
+        url = self.api.start()
+        self.transport = PooledTransport(pool_size=32)
+        self.limiter = AIMDLimiter(max_limit=32, initial=2)
+        patcher = mock.patch.multiple(
+            homework, ENDPOINT=url, TRANSPORT=self.transport,
+            LIMITER=self.limiter,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.api.stop)
+        self.addCleanup(self.transport.close)
+
+    def poll(self, requests_count):
+        def fetch(_):
+            try:
+                homework.fetch_answer(
+                    0, {'Authorization': 'OAuth sometoken'}
+                )
+            except homework.ResponseError:
+                pass
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            list(executor.map(fetch, range(requests_count)))
+
+    def test_limit_follows_api(self):
+        self.poll(200)
+        fast_limit = self.limiter.limit
+        self.assertGreater(fast_limit, 2)
+        self.api.delay = 0.3
+        self.poll(8)
+        self.assertLess(self.limiter.limit, fast_limit)
+
+    def test_too_many_requests_cut_limit(self):
+        self.poll(200)
+        fast_limit = self.limiter.limit
+        self.api.status_code = 429
+        self.poll(1)
+        self.assertLess(self.limiter.limit, fast_limit)
+
+
+if __name__ == '__main__':
+    unittest.main()
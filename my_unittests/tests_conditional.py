@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import homework
+from conditional import ConditionalCache
+from my_unittests.fakes import FakePracticumAPI, FakeResponse
+from recording import ApiRecorder, read_records
+from replay import replay
+from transport import PooledTransport
+
+HEADERS = {'Authorization': 'OAuth sometoken'}
+
+
+class CountingResponse(FakeResponse):
+    def __init__(self, status_code, body, content=None, headers=None):
+        super().__init__(status_code, body)
+        self.content = content
+        self.headers = headers or {}
+        self.decoded = 0
+
+    def json(self):
+        self.decoded += 1
+        return super().json()
+
+
+class TestConditionalCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ConditionalCache()
+        self.params = {'from_date': 0}
+
+    def test_same_body_not_decoded(self):
+        first = CountingResponse(200, {'homeworks': []}, b'body')
+        second = CountingResponse(200, {'homeworks': []}, b'body')
+        answer = self.cache.answer(self.params, first)
+        self.assertIs(self.cache.answer(self.params, second), answer)
+        self.assertEqual(second.decoded, 0)
+
+    def test_validators_sent_for_same_params_only(self):
+        self.cache.answer(self.params, CountingResponse(
+            200, {}, b'body', {'ETag': '"1"', 'Last-Modified': 'date'}
+        ))
+        headers = self.cache.request_headers(self.params)
+        self.assertEqual(headers['If-None-Match'], '"1"')
+        self.assertEqual(headers['If-Modified-Since'], 'date')
+        self.assertNotIn(
+            'If-None-Match', self.cache.request_headers({'from_date': 1})
+        )
+
+    def test_changed_answer_drops_old_validators(self):
+        self.cache.answer(self.params, CountingResponse(
+            200, {}, b'old', {'ETag': '"1"'}
+        ))
+        self.cache.answer(self.params, CountingResponse(200, {}, b'new'))
+        self.assertNotIn(
+            'If-None-Match', self.cache.request_headers(self.params)
+        )
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.api = FakePracticumAPI(conditional=True, compress=True)
+        self.api.set_status('sometoken', 'reviewing')
+        url = self.api.start()
+        self.transport = PooledTransport(pool_size=1)
+        patcher = mock.patch.multiple(
+            homework, ENDPOINT=url, TRANSPORT=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.api.stop)
+        self.addCleanup(self.transport.close)
+        self.cache = ConditionalCache()
+
+    def fetch(self):
+        return homework.fetch_answer(0, HEADERS, self.cache)
+
+    def test_not_modified(self):
+        first = self.fetch()
+        self.assertIs(self.fetch(), first)
+        self.assertEqual(self.api.not_modified, 1)
+
+    def test_not_modified_recorded_as_answers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = ApiRecorder(os.path.join(directory, 'api.jsonl'))
+            with mock.patch.object(homework, 'RECORDER', recorder):
+                for _ in range(5):
+                    self.fetch()
+            records = list(read_records(recorder.path))
+        self.assertEqual([record['status_code'] for record in records],
+                         [200] * 5)
+        self.assertEqual(sum('not_modified' in record for record in records),
+                         4)
+        self.assertEqual(replay(records)['errors'], 0)
+
+    def test_changed_status_fetched(self):
+        first = self.fetch()
+        self.api.set_status('sometoken', 'approved')
+        answer = self.fetch()
+        self.assertIsNot(answer, first)
+        self.assertEqual(answer['homeworks'][0]['status'], 'approved')
+        self.assertEqual(self.api.not_modified, 0)
+
+    def test_unexpected_not_modified_is_error(self):
+        self.fetch()
+        with self.assertRaises(homework.ResponseError):
+            homework.fetch_answer(0, {
+                **HEADERS, 'If-None-Match': '"1"'
+            })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import json
+import os
+import signal
+import tempfile
+import unittest
+from unittest import mock
+
+import homework
+from clock import VirtualClock
+from config import ConfigWatcher, Tenant, parse_config
+from exceptions import ConfigError
+from my_unittests.fakes import FakePracticumAPI
+from tenants import TenantRegistry
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'tenants.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(data if isinstance(data, str) else json.dumps(data))
+
+    def test_parse_config(self):
+        config = parse_config({
+            'policy': {'retry_period': 300},
+            'tenants': [{'id': 'a', 'practicum_token': 't', 'chat_id': 1}],
+        })
+        self.assertEqual(config.policy.retry_period, 300)
+        self.assertEqual(config.tenants['a'], Tenant('a', 't', '1'))
+
+    def test_invalid_config(self):
+        for data in ([], {'tenants': [{'id': 'a'}]},
+                     {'policy': {'retry_period': 0}},
+                     {'policy': {'retry_period': '600'}},
+                     {'policy': {'unknown': 1}},
+                     {'policy': {'calendar': {'quiet_retry_period': '3600'}}},
+                     {'tenants': [{'id': 'a', 'practicum_token': 't',
+                                   'chat_id': '1',
+                                   'calendar': {'quiet_weekdays': '56'}}]}):
+            with self.assertRaises(ConfigError):
+                parse_config(data)
+
+    def test_reload_keeps_current_config_if_new_is_invalid(self):
+        self.write({'tenants': []})
+        watcher = ConfigWatcher(self.path)
+        config = watcher.reload()
+        self.assertIsNone(watcher.reload(config))
+        self.write('{not json')
+        watcher.request_reload()
+        self.assertIsNone(watcher.reload(config))
+        self.write({'policy': {'retry_period': '600'}})
+        watcher.request_reload()
+        self.assertIsNone(watcher.reload(config))
+        self.write({'policy': {'retry_period': 60}})
+        watcher.request_reload()
+        self.assertEqual(watcher.reload(config).policy.retry_period, 60)
+
+    def test_watcher_notices_change_of_file(self):
+        self.write({'tenants': []})
+        watcher = ConfigWatcher(self.path, interval=0.01)
+        watcher.start()
+        os.utime(self.path, (0, 0))
+        self.assertTrue(watcher.changed.wait(5))
+        watcher.stop()
+
+    def test_change_wakes_only_new_tenants(self):
+        self.write({'tenants': [
+            {'id': 'a', 'practicum_token': 't1', 'chat_id': '1'},
+        ]})
+        polled, handlers = [], {}
+
+        def end_cycle(bot):
+            if len(polled) == 1:
+                self.write({'tenants': [
+                    {'id': 'a', 'practicum_token': 't1', 'chat_id': '1'},
+                    {'id': 'b', 'practicum_token': 't2', 'chat_id': '2'},
+                ]})
+                handlers[signal.SIGHUP](signal.SIGHUP, None)
+            else:
+                raise StopIteration
+
+        def poll_watched(bot, state):
+            state.last_poll = 0.0
+            polled.append(state.tenant.id)
+
+        with mock.patch.multiple(
+            homework, TENANTS_FILE=self.path, TENANTS=TenantRegistry(),
+            poll_watched=poll_watched, end_cycle=end_cycle,
+        ), mock.patch('signal.signal', side_effect=handlers.__setitem__):
+            with self.assertRaises(StopIteration):
+                homework.poll_tenants(FakeBot())
+        self.assertEqual(polled, ['a', 'b'])
+
+
+class TestTenantRegistry(unittest.TestCase):
+    def test_apply_keeps_state_of_existing_tenants(self):
+        registry = TenantRegistry()
+        registry.apply([Tenant('a', 't1', '1'), Tenant('b', 't2', '2')], 0)
+        registry.get('a').remember('approved')
+        registry.apply([Tenant('a', 't3', '1'), Tenant('c', 't4', '3')], 10)
+        self.assertFalse(registry.get('a').is_new('approved'))
+        self.assertEqual(registry.get('a').tenant.practicum_token, 't3')
+        self.assertIsNone(registry.get('b'))
+        self.assertEqual(sorted(registry.table.tenants()), ['a', 'c'])
+        self.assertEqual(registry.get('c').timestamp, 10)
+        self.assertIs(registry.by_chat('3'), registry.get('c'))
+
+    def test_answers_cached_only_for_status_command(self):
+        registry = TenantRegistry()
+        registry.apply([Tenant('a', 't1', '1')], 0)
+        state = registry.get('a')
+        self.assertEqual(state.priority, 'idle')
+        state.observe({'homeworks': [{'status': 'reviewing'}]})
+        self.assertEqual(state.priority, 'reviewing')
+        self.assertIsNone(state._cache)
+        self.assertIsNone(state.cache.peek())
+        answer = {'homeworks': [{'status': 'approved'}]}
+        state.observe(answer)
+        self.assertEqual(state.priority, 'idle')
+        self.assertIs(state.cache.peek(), answer)
+
+    def test_answers_cached_on_clock_of_registry(self):
+        clock = VirtualClock(0)
+        registry = TenantRegistry(cache_ttl=600, clock=clock.monotonic)
+        registry.apply([Tenant('a', 't1', '1')], 0)
+        cache = registry.get('a').cache
+        cache.update({'homeworks': []})
+        clock.advance(599)
+        self.assertTrue(cache.is_fresh())
+        clock.advance(1)
+        self.assertFalse(cache.is_fresh())
+
+    def test_new_token_resets_caches(self):
+        registry = TenantRegistry(conditional=True)
+        registry.apply([Tenant('a', 't1', '1')], 0)
+        state = registry.get('a')
+        state.cache.update({'homeworks': []})
+        http_cache = state.http_cache
+        state.last_poll = 100.0
+        registry.apply([Tenant('a', 't1', '1', locale='en')], 0)
+        self.assertEqual(registry.unpolled(), [])
+        self.assertIs(state.http_cache, http_cache)
+        registry.apply([Tenant('a', 't2', '1')], 0)
+        self.assertIsNone(state.cache.peek())
+        self.assertIsNot(state.http_cache, http_cache)
+        self.assertEqual(registry.unpolled(), [state])
+
+    def test_removed_tenant_keeps_its_row(self):
+        registry = TenantRegistry()
+        registry.apply([Tenant('a', 't1', '1')], 0)
+        removed = registry.get('a')
+        removed.remember('approved')
+        registry.apply([Tenant('b', 't2', '2')], 10)
+        removed.last_poll = 100.0
+        removed.quarantined_at = 100.0
+        added = registry.get('b')
+        self.assertEqual(registry.table.tenants(), ['b'])
+        self.assertIsNone(added.last_poll)
+        self.assertIsNone(added.quarantined_at)
+        self.assertEqual(registry.quarantined(), 0)
+        self.assertFalse(removed.is_new('approved'))
+        self.assertEqual(removed.last_poll, 100.0)
+
+
+class TestPollTenant(unittest.TestCase):
+    def test_status_sent_once_per_change(self):
+        api = FakePracticumAPI()
+        api.set_status('t1', 'reviewing')
+        registry = TenantRegistry()
+        registry.apply([Tenant('a', 't1', '1')], 0)
+        state = registry.get('a')
+        bot = FakeBot()
+        with mock.patch.object(homework, 'ENDPOINT', api.start()):
+            homework.poll_tenant(bot, state)
+            homework.poll_tenant(bot, state)
+            api.set_status('t1', 'approved')
+            homework.poll_tenant(bot, state)
+        api.stop()
+        self.assertEqual(len(bot.sent), 2)
+        self.assertEqual(bot.sent[1][0], '1')
+        self.assertIn(homework.HOMEWORK_VERDICTS['approved'], bot.sent[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from clock import VirtualClock
+from digest import DigestBuffer, split_message
+
+
+class TestSplitMessage(unittest.TestCase):
+    def test_short_text_not_split(self):
+        self.assertEqual(split_message('a\nb'), ['a\nb'])
+
+    def test_split_by_lines(self):
+        text = '\n'.join(['x' * 40] * 300)
+        parts = split_message(text)
+        self.assertTrue(all(len(part) <= 4096 for part in parts))
+        self.assertEqual('\n'.join(parts), text)
+
+    def test_long_line_split_by_characters(self):
+        parts = split_message('y' * 5000)
+        self.assertEqual([len(part) for part in parts], [4096, 904])
+
+
+class TestDigestBuffer(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.digest = DigestBuffer(3600, 3, clock=self.clock.monotonic)
+        self.sent = []
+
+    def send(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+    def test_flushed_after_interval(self):
+        self.digest.add(12345, 'first')
+        self.digest.add(12345, 'second')
+        self.assertEqual(self.digest.flush_due(self.send), 0)
+        self.clock.now = 3600
+        self.assertEqual(self.digest.flush_due(self.send), 1)
+        self.assertEqual(len(self.sent), 1)
+        self.assertIn('- first\n- second', self.sent[0][1])
+
+    def test_flushed_after_max_messages(self):
+        for message in ('first', 'second', 'third'):
+            self.digest.add(12345, message)
+        self.assertEqual(self.digest.flush_due(self.send), 1)
+
+    def test_messages_kept_if_sending_failed(self):
+        def failing_send(chat_id, text):
+            raise ConnectionError('telegram is down')
+
+        for message in ('first', 'second', 'third'):
+            self.digest.add(12345, message)
+        self.assertEqual(self.digest.flush_due(failing_send), 0)
+        self.assertEqual(self.digest.flush_due(self.send), 1)
+        self.assertIn('- third', self.sent[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
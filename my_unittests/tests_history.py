@@ -0,0 +1,193 @@
+import os
+import tempfile
+import time
+import unittest
+
+from history import HEADER, RECORD, TransitionLog
+from my_unittests.simulation import DAY, START, Simulation
+
+HOUR = 60 * 60
+
+
+def homework(homework_id, status, updated_at, lesson='lesson'):
+    return {
+        'id': homework_id,
+        'status': status,
+        'lesson_name': lesson,
+        'date_updated': time.strftime(
+            '%Y-%m-%dT%H:%M:%SZ', time.gmtime(START + updated_at)
+        ),
+    }
+
+
+class TestTransitionLog(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'history.log')
+        self.log = self.open()
+
+    def open(self, **kwargs):
+        log = TransitionLog(self.path, **kwargs)
+        self.addCleanup(log.close)
+        return log
+
+    def review(self, tenant, homework_id, hours, lesson='lesson',
+               status='approved'):
+        self.log.observe(tenant, homework(homework_id, 'reviewing', 0, lesson),
+                         START + 60)
+        self.log.observe(
+            tenant, homework(homework_id, status, hours * HOUR, lesson),
+            START + hours * HOUR + 60,
+        )
+
+    def test_only_changes_appended(self):
+        answer = homework(1, 'reviewing', 0)
+        self.assertTrue(self.log.observe('student', answer, START))
+        self.assertFalse(self.log.observe('student', answer, START + 600))
+        self.assertFalse(self.log.observe('student', {'status': 'x'}, START))
+        self.review('student', 1, 2)
+        transitions = self.log.transitions('student', 1)
+        self.assertEqual(
+            [(item.from_status, item.to_status) for item in transitions],
+            [('', 'reviewing'), ('reviewing', 'approved')]
+        )
+        self.assertEqual(transitions[1].updated_at, START + 2 * HOUR)
+        self.assertEqual(transitions[1].detected_at, START + 2 * HOUR + 60)
+
+    def test_median_time_in_reviewing(self):
+        for homework_id, hours in enumerate([1, 2, 6]):
+            self.review('student', homework_id, hours, 'first')
+        self.review('other', 1, 10, 'second', status='rejected')
+        self.log.observe('other', homework(1, 'reviewing', 11 * HOUR,
+                                           'second'), START + 11 * HOUR)
+        self.log.observe('other', homework(1, 'approved', 15 * HOUR,
+                                           'second'), START + 15 * HOUR)
+        self.assertEqual(self.log.median_times(), {
+            'first': (3, 2 * HOUR),
+            'second': (2, 7 * HOUR),
+        })
+        self.assertEqual(self.log.median_times(lessons=['unknown']), {})
+
+    def test_reopened_log_knows_last_statuses(self):
+        self.review('student', 1, 2)
+        self.log.close()
+        log = self.open()
+        self.assertFalse(log.observe('student', homework(1, 'approved', 0),
+                                     START + DAY))
+        self.assertEqual(len(log), 2)
+
+    def test_compaction_drops_duplicates_and_keeps_tail(self):
+        for homework_id in range(20):
+            self.review('student', homework_id, homework_id % 4 + 1,
+                        f'lesson {homework_id % 2}')
+        self.log.close()
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        with open(self.path, 'ab') as file:
+            # The same change detected again after the loss of the index.
+            file.write(data[HEADER.size:HEADER.size + RECORD.size])
+        before = self.open(readonly=True).median_times()
+        self.log = self.open()
+        self.assertEqual(len(self.log), 41)
+        self.log.compact()
+        self.assertEqual(len(self.log), 40)
+        self.review('student', 100, 8, 'lesson 0')
+        self.assertEqual(len(self.log), 42)
+        self.log.close()
+        reopened = self.open(readonly=True)
+        self.assertEqual(len(reopened), 42)
+        before['lesson 0'] = (11, 3 * HOUR)
+        self.assertEqual(reopened.median_times(), before)
+        self.assertEqual(reopened.transitions('student', 7)[-1].lesson,
+                         'lesson 1')
+
+    def test_tail_merged_into_sorted_segment(self):
+        for homework_id in range(30):
+            self.review(f'student {homework_id % 3}', homework_id,
+                        homework_id % 5 + 1, f'lesson {homework_id % 4}')
+            if homework_id % 10 == 9:
+                self.log.compact()
+        before = self.log.median_times()
+        self.log.close()
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        with open(self.path, 'ab') as file:
+            # A record of the segment appended again.
+            file.write(data[HEADER.size:HEADER.size + RECORD.size])
+        self.log = self.open()
+        self.assertEqual(len(self.log), 61)
+        self.log.compact()
+        self.assertEqual(len(self.log), 60)
+        self.assertEqual(self.log.median_times(), before)
+        with open(self.path, 'rb') as file:
+            records = list(RECORD.iter_unpack(file.read()[HEADER.size:]))
+        keys = [(item[2], item[0], item[1], item[5]) for item in records]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(
+            [item.homework_id for item in self.log.transitions('student 1')],
+            [homework_id for homework_id in range(1, 30, 3)
+             for _ in range(2)]
+        )
+
+    def test_queries_read_only_indexed_records(self):
+        for homework_id in range(50):
+            self.review(f'student {homework_id}', 1, 1,
+                        f'lesson {homework_id}')
+        self.log.compact()
+        self.review('student 0', 2, 3, 'lesson 0')
+        self.log.records_read = 0
+        self.assertEqual(
+            self.log.time_in_status('lesson 0'), [HOUR, 3 * HOUR]
+        )
+        self.assertEqual(len(self.log.transitions('student 1')), 2)
+        self.assertEqual(self.log.records_read, 6)
+
+    def test_cut_record_dropped(self):
+        self.review('student', 1, 2)
+        self.log.close()
+        with open(self.path, 'ab') as file:
+            file.write(b'\0' * 5)
+        log = self.open()
+        self.assertEqual(len(log), 2)
+        self.assertTrue(log.observe('student', homework(1, 'rejected', 0),
+                                    START))
+        self.assertEqual(len(self.open(readonly=True)), 3)
+
+    def test_maybe_compact(self):
+        log = self.open(compact_every=3)
+        self.assertFalse(log.maybe_compact())
+        for homework_id in range(2):
+            log.observe('student', homework(homework_id, 'reviewing', 0),
+                        START)
+        self.assertFalse(log.maybe_compact())
+        log.observe('student', homework(3, 'reviewing', 0), START)
+        self.assertTrue(log.maybe_compact())
+        deadline = time.monotonic() + 5
+        while log._compacting and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists(f'{self.path}.index'))
+        self.assertFalse(log.maybe_compact())
+
+
+class TestHistoryInSimulation(unittest.TestCase):
+    def test_transitions_of_default_tenant(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        log = TransitionLog(os.path.join(directory.name, 'history.log'))
+        self.addCleanup(log.close)
+        simulation = Simulation()
+        simulation.schedule(0, 'sometoken', 'reviewing')
+        simulation.schedule(DAY, 'sometoken', 'rejected')
+        simulation.schedule(2 * DAY, 'sometoken', 'reviewing')
+        simulation.schedule(3 * DAY, 'sometoken', 'approved')
+        simulation.run(4 * DAY, HISTORY=log)
+        self.assertEqual(
+            [item.to_status for item in log.transitions('default')],
+            ['reviewing', 'rejected', 'reviewing', 'approved']
+        )
+        self.assertEqual(log.median_times(), {'lesson': (2, DAY)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from lag_watchdog import BLOCKED, LAG, LagWatchdog
+
+
+def blocking_call(started, release):
+    started.set()
+    release.wait(5)
+
+
+class TestLagWatchdog(unittest.TestCase):
+    def test_blocked_unit_logged_once_with_stack(self):
+        watchdog = LagWatchdog(threshold=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def unit():
+            with watchdog.watch('slow unit'):
+                blocking_call(started, release)
+
+        thread = threading.Thread(target=unit)
+        thread.start()
+        started.wait(5)
+        time.sleep(0.1)
+        blocked = BLOCKED.value()
+        with self.assertLogs('lag_watchdog', level='WARNING') as logs:
+            watchdog.tick(0.0)
+            watchdog.tick(0.0)
+        release.set()
+        thread.join()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('slow unit', logs.output[0])
+        self.assertIn('blocking_call', logs.output[0])
+        self.assertEqual(BLOCKED.value(), blocked + 1)
+
+    def test_lag_recorded_and_reported(self):
+        watchdog = LagWatchdog(threshold=0.5)
+        count = LAG.count()
+        with self.assertLogs('lag_watchdog', level='WARNING') as logs:
+            with watchdog.watch('poll'):
+                watchdog.tick(0.1)
+                watchdog.tick(1.0)
+        self.assertEqual(LAG.count(), count + 2)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Scheduler lag 1.00s', logs.output[0])
+        self.assertIn('test_lag_recorded_and_reported', logs.output[0])
+
+    def test_thread_measures_lag(self):
+        watchdog = LagWatchdog(threshold=10, interval=0.01)
+        count = LAG.count()
+        watchdog.start()
+        time.sleep(0.1)
+        watchdog.stop()
+        self.assertGreater(LAG.count(), count)
+
+    def test_off(self):
+        watchdog = LagWatchdog(threshold=0)
+        with watchdog.watch('unit'):
+            self.assertEqual(watchdog._units, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
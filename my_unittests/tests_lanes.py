@@ -0,0 +1,154 @@
+import unittest
+from unittest import mock
+
+import telegram
+
+import homework
+from clock import VirtualClock
+from digest import DigestBuffer
+from exceptions import SendMessageError
+from lanes import MAX_ATTEMPTS, Lane, LaneLimits, PriorityOutbox
+from rate_limit import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate(self):
+        clock = VirtualClock()
+        bucket = TokenBucket(2, burst=2, clock=clock.monotonic)
+        self.assertTrue(bucket.try_take())
+        self.assertTrue(bucket.try_take())
+        self.assertFalse(bucket.try_take())
+        self.assertEqual(bucket.wait_time(), 0.5)
+        clock.now = 0.5
+        self.assertTrue(bucket.try_take())
+
+
+class TestPriorityOutbox(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.sent = []
+
+    def delivery(self, text):
+        return lambda: self.sent.append(text)
+
+    def test_status_goes_before_errors(self):
+        outbox = PriorityOutbox(rate=0, clock=self.clock.monotonic)
+        for number in range(3):
+            outbox.submit(Lane.ERROR, self.delivery(f'error {number}'))
+        outbox.submit(Lane.DIGEST, self.delivery('digest'))
+        outbox.submit(Lane.STATUS, self.delivery('approved'))
+        outbox.submit(Lane.RECOVERY, self.delivery('recovered'))
+        while outbox.run_once() == 0:
+            pass
+        self.assertEqual(
+            self.sent, ['approved', 'recovered', 'error 0', 'digest']
+        )
+        self.clock.now = 1
+        outbox.run_once()
+        self.assertEqual(self.sent[-1], 'error 1')
+
+    def test_full_lane_drops(self):
+        outbox = PriorityOutbox(
+            limits={Lane.ERROR: LaneLimits(max_pending=2)},
+            clock=self.clock.monotonic,
+        )
+        results = [
+            outbox.submit(Lane.ERROR, self.delivery('error'))
+            for _ in range(3)
+        ]
+        self.assertEqual(results, [True, True, False])
+
+    def test_retry_after_requeues(self):
+        outbox = PriorityOutbox(rate=0, clock=self.clock.monotonic)
+
+        def throttled():
+            try:
+                raise telegram.error.RetryAfter(3)
+            except telegram.error.RetryAfter as error:
+                raise SendMessageError('Failed') from error
+
+        outbox.submit(Lane.STATUS, throttled)
+        self.assertEqual(outbox.run_once(), 3)
+        self.assertEqual(outbox.pending(Lane.STATUS), 1)
+
+    def test_failed_delivery_retried_with_backoff(self):
+        outbox = PriorityOutbox(rate=0, clock=self.clock.monotonic)
+        failures = iter([SendMessageError('Timed out')] * 2)
+
+        def flaky():
+            error = next(failures, None)
+            if error:
+                raise error
+            self.sent.append('approved')
+
+        outbox.submit(Lane.STATUS, flaky)
+        outbox.submit(Lane.ERROR, self.delivery('error'))
+        with self.assertLogs('lanes', level='WARNING'):
+            self.assertEqual(outbox.run_once(), 0)
+        # The error lane goes on while the status waits for its retry.
+        self.assertEqual(outbox.run_once(), 0)
+        self.assertEqual(self.sent, ['error'])
+        self.assertEqual(outbox.run_once(), 1)
+        self.clock.now = 1
+        with self.assertLogs('lanes', level='WARNING'):
+            outbox.run_once()
+        self.assertEqual(outbox.run_once(), 1)
+        self.clock.now = 2
+        self.assertEqual(outbox.run_once(), 1)
+        self.clock.now = 3
+        outbox.run_once()
+        self.assertEqual(self.sent, ['error', 'approved'])
+        self.assertEqual(outbox.pending(Lane.STATUS), 0)
+
+    def test_failing_delivery_given_up(self):
+        outbox = PriorityOutbox(rate=0, clock=self.clock.monotonic)
+        attempts = []
+
+        def failing():
+            attempts.append(self.clock.now)
+            raise SendMessageError('Chat not found')
+
+        outbox.submit(Lane.STATUS, failing)
+        with self.assertLogs('lanes', level='WARNING') as logs:
+            while outbox.pending(Lane.STATUS):
+                self.clock.advance(outbox.run_once())
+        self.assertEqual(len(attempts), MAX_ATTEMPTS)
+        self.assertEqual(attempts, [0, 1, 3, 7, 15])
+        self.assertIn('given up', logs.output[-1])
+
+    def test_worker_delivers_everything_before_close(self):
+        outbox = PriorityOutbox()
+        outbox.start()
+        for number in range(5):
+            outbox.submit(Lane.STATUS, self.delivery(number))
+        outbox.close(timeout=5)
+        self.assertEqual(self.sent, [0, 1, 2, 3, 4])
+
+
+class TestDeliver(unittest.TestCase):
+    def test_lane_limits_merged_into_defaults(self):
+        with mock.patch.multiple(
+            homework, PRIORITY_LANES=True, OUTBOX=None,
+            LANE_LIMITS='{"error": {"rate": 5}}',
+        ):
+            homework.start_outbox()
+            outbox = homework.OUTBOX
+            outbox.close(timeout=5)
+        self.assertEqual(outbox.limits[Lane.ERROR],
+                         LaneLimits(max_pending=100, rate=5))
+
+    def test_full_lane_keeps_digest(self):
+        outbox = PriorityOutbox(
+            limits={Lane.DIGEST: LaneLimits(max_pending=0)}, rate=0
+        )
+        digest = DigestBuffer(0, 1)
+        digest.add('1', 'approved')
+        with mock.patch.multiple(homework, OUTBOX=outbox, DIGEST=digest):
+            with self.assertLogs('lanes', level='WARNING'):
+                with self.assertLogs('digest', level='ERROR'):
+                    homework.flush_digest(bot=None)
+        self.assertEqual(digest._messages, {'1': ['approved']})
+
+
+if __name__ == '__main__':
+    unittest.main()
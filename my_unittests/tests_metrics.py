@@ -0,0 +1,43 @@
+import unittest
+import urllib.request
+
+from metrics import Registry, serve_metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_with_labels(self):
+        counter = self.registry.counter('polls_total')
+        counter.inc()
+        counter.inc(2, labels={'tenant': 'a'})
+        self.assertEqual(counter.value(), 1)
+        self.assertEqual(counter.value({'tenant': 'a'}), 2)
+
+    def test_histogram_percentiles_over_bounded_reservoir(self):
+        histogram = self.registry.histogram('latency_seconds')
+        for value in range(1, 2001):
+            histogram.observe(value)
+        self.assertEqual(histogram.count(), 2000)
+        self.assertEqual(histogram.percentile(0.5), 1488)
+
+    def test_same_name_other_kind(self):
+        self.registry.counter('value')
+        with self.assertRaises(TypeError):
+            self.registry.gauge('value')
+
+    def test_served_in_prometheus_format(self):
+        self.registry.gauge('tenants', 'Number of tenants').set(3)
+        server = serve_metrics('127.0.0.1', 0, registry=self.registry)
+        host, port = server.server_address
+        with urllib.request.urlopen(
+                f'http://{host}:{port}/metrics', timeout=5) as response:
+            text = response.read().decode()
+        server.shutdown()
+        server.server_close()
+        self.assertIn('# TYPE tenants gauge\ntenants 3', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
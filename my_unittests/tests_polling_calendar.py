@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from polling_calendar import PollingCalendar
+
+MOSCOW = ZoneInfo('Europe/Moscow')
+
+
+def moment(day, hour, minute=0):
+    # 2023-03-06 is Monday.
+    return datetime(2023, 3, day, hour, minute, tzinfo=MOSCOW).timestamp()
+
+
+class TestPollingCalendar(unittest.TestCase):
+    def setUp(self):
+        self.calendar = PollingCalendar(
+            timezone='Europe/Moscow',
+            quiet_hours=[['23:00', '08:00']],
+            quiet_weekdays=[5, 6],
+            quiet_retry_period=3600,
+        )
+
+    def test_quiet_hours_over_midnight(self):
+        self.assertTrue(self.calendar.is_quiet(moment(6, 23, 30)))
+        self.assertTrue(self.calendar.is_quiet(moment(7, 7, 59)))
+        self.assertFalse(self.calendar.is_quiet(moment(7, 8)))
+        self.assertFalse(self.calendar.is_quiet(moment(7, 22, 59)))
+
+    def test_quiet_weekdays(self):
+        self.assertTrue(self.calendar.is_quiet(moment(11, 12)))
+        self.assertFalse(self.calendar.is_quiet(moment(10, 12)))
+
+    def test_polls_rarely_in_quiet_hours(self):
+        night = moment(7, 2)
+        self.assertTrue(self.calendar.should_poll(night, None))
+        self.assertFalse(self.calendar.should_poll(night + 600, night))
+        self.assertTrue(self.calendar.should_poll(night + 3600, night))
+
+    def test_catch_up_poll_after_window(self):
+        suspended = PollingCalendar(quiet_hours=[['20:00', '08:00']])
+        night = datetime(2023, 3, 7, 7, 50, tzinfo=ZoneInfo('UTC'))
+        self.assertFalse(suspended.should_poll(night.timestamp(), None))
+        self.assertTrue(
+            suspended.should_poll(night.timestamp() + 600, None)
+        )
+
+    def test_invalid_spec(self):
+        for spec in ({'timezone': 'Mars/Olympus'},
+                     {'quiet_hours': [['23', '08:00']]},
+                     {'quiet_days': [5]},
+                     {'quiet_weekdays': '56'},
+                     {'quiet_weekdays': [7]},
+                     {'quiet_weekdays': 5},
+                     {'quiet_weekdays': [True]},
+                     {'quiet_retry_period': '3600'},
+                     {'quiet_retry_period': -1},
+                     []):
+            with self.assertRaises(ValueError):
+                PollingCalendar.from_dict(spec)
+        calendar = PollingCalendar.from_dict(
+            {'quiet_weekdays': [0, 6], 'quiet_retry_period': 0.5}
+        )
+        self.assertEqual(calendar.quiet_weekdays, {0, 6})
+
+
+if __name__ == '__main__':
+    unittest.main()
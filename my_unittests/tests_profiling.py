@@ -0,0 +1,105 @@
+import cProfile
+import tracemalloc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import homework
+from profiling import CycleProfiler
+
+
+def get_api_answer():
+    return sum(range(1000))
+
+
+def parse_status():
+    return 'status'
+
+
+class TestCycleProfiler(unittest.TestCase):
+    def test_not_profiled_until_requested(self):
+        profiler = CycleProfiler(watched=('get_api_answer',))
+        with self.assertNoLogs('profiling'):
+            with profiler.cycle():
+                get_api_answer()
+
+    def test_watched_functions_reported_after_cycles(self):
+        profiler = CycleProfiler(watched=('get_api_answer', 'parse_status'))
+        profiler.request(2)
+        with self.assertLogs('profiling') as logs:
+            for _ in range(3):
+                with profiler.cycle():
+                    get_api_answer()
+                    parse_status()
+        reports = [line for line in logs.output if 'Profile of ' in line]
+        self.assertIn('Profile of get_api_answer: 2 calls', reports[0])
+        self.assertIn('Profile of parse_status: 2 calls', reports[1])
+
+    def test_tasks_in_other_threads_profiled(self):
+        profiler = CycleProfiler(watched=('get_api_answer', 'parse_status'))
+
+        def task():
+            with profiler.task():
+                get_api_answer()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with profiler.cycle():
+                list(executor.map(lambda _: task(), range(3)))
+            profiler.request(1)
+            with self.assertLogs('profiling') as logs:
+                with profiler.cycle():
+                    list(executor.map(lambda _: task(), range(4)))
+                    parse_status()
+                    with profiler.task():
+                        parse_status()
+        reports = [line for line in logs.output if 'Profile of ' in line]
+        self.assertIn('Profile of get_api_answer: 4 calls', reports[0])
+        self.assertIn('Profile of parse_status: 2 calls', reports[1])
+
+    def test_task_without_own_profile_if_one_is_enabled(self):
+        class EnabledElsewhere(cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                raise ValueError('Another profiling tool is already active')
+
+        profiler = CycleProfiler(watched=('get_api_answer',))
+
+        def task():
+            with profiler.task():
+                return get_api_answer()
+
+        profiler.request(1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with self.assertLogs('profiling'):
+                with profiler.cycle():
+                    with mock.patch('cProfile.Profile', EnabledElsewhere):
+                        answer = executor.submit(task).result()
+        self.assertEqual(answer, get_api_answer())
+        self.assertEqual(profiler._task_profiles, [])
+
+    def test_memory_diff(self):
+        profiler = CycleProfiler()
+        with self.assertLogs('profiling') as logs:
+            profiler.request_memory_diff()
+            with profiler.cycle():
+                pass
+            profiler.request_memory_diff()
+            with profiler.cycle():
+                garbage = [bytearray(1024) for _ in range(100)]
+        self.assertIn('snapshot taken', logs.output[0])
+        self.assertIn('Memory growth', logs.output[1])
+        del garbage
+        tracemalloc.stop()
+
+    def test_tracemalloc_started_with_profiling(self):
+        with mock.patch.multiple(homework, TRACEMALLOC=True,
+                                 PROFILER=CycleProfiler()):
+            homework.start_profiling()
+            try:
+                self.assertTrue(tracemalloc.is_tracing())
+                self.assertTrue(homework.PROFILER._memory_requested)
+            finally:
+                tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import homework
+from config import Tenant
+from my_unittests.simulation import DAY, Simulation
+
+
+def tenant(token):
+    return Tenant(id='student', practicum_token=token, chat_id='1')
+
+
+class TestQuarantine(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation([tenant('revoked')])
+        self.simulation.schedule(0, 'valid', 'reviewing')
+
+    def run_quiet(self, seconds, **patches):
+        with self.assertLogs('homework', level='ERROR'):
+            self.simulation.run(seconds, **patches)
+
+    def test_polled_once_a_day_and_notified_once(self):
+        self.run_quiet(3 * DAY)
+        self.assertEqual(self.simulation.api.requests, 3)
+        self.assertEqual(self.simulation.registry.quarantined(), 1)
+        texts = [text for _, _, text in self.simulation.messages()]
+        self.assertEqual(len(texts), 1)
+        self.assertIn('Token is rejected by API (401)', texts[0])
+        self.assertIn('checked again every 24 hours', texts[0])
+
+    def test_new_token_lifts_quarantine(self):
+        self.run_quiet(DAY, QUARANTINE_RETRY_PERIOD=0)
+        self.assertEqual(self.simulation.api.requests, 1)
+        self.assertIn('not checked until the token is changed',
+                      self.simulation.messages()[0][2])
+        self.simulation.apply([tenant('valid')])
+        self.assertEqual(self.simulation.registry.quarantined(), 0)
+        self.simulation.run(600, QUARANTINE_RETRY_PERIOD=0)
+        self.assertEqual(self.simulation.api.requests, 2)
+        self.assertIn('взята на проверку', self.simulation.messages()[-1][2])
+
+    def test_default_tenant(self):
+        simulation = Simulation(token='revoked')
+        with self.assertLogs('homework', level='ERROR'):
+            simulation.run(DAY)
+        self.assertEqual(simulation.api.requests, 1)
+        self.assertEqual(homework.QUARANTINED.value(), 1)
+        self.assertEqual(len(simulation.messages()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
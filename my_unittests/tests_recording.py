@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import homework
+from config import Tenant
+from my_unittests.simulation import DAY, Simulation
+from recording import ApiRecorder, read_records, sanitize
+from replay import replay
+
+
+def answer(status):
+    return {
+        'current_date': 1679996158,
+        'homeworks': [
+            {'homework_name': 'Resistor-git__hw05_final.zip',
+             'id': 710842,
+             'reviewer_comment': 'token sometoken',
+             'status': status}
+        ]
+    }
+
+
+class TestRecording(unittest.TestCase):
+    def test_sanitize(self):
+        data = {'Authorization': 'OAuth sometoken',
+                'items': ['sometoken here']}
+        self.assertEqual(
+            sanitize(data, ['sometoken']),
+            {'Authorization': '***', 'items': ['*** here']}
+        )
+
+    def test_record_and_replay(self):
+        clock_values = iter([0, 600, 1200, 1800, 2400])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'api.jsonl.gz')
+            recorder = ApiRecorder(path, secrets=['sometoken'],
+                                   clock=lambda: next(clock_values))
+            recorder.record(0, 200, answer('reviewing'))
+            recorder.record(0, 200, answer('reviewing'))
+            recorder.record(0, 500, None)
+            recorder.record(0, 200, answer('rejected'))
+            recorder.record(0, 200, answer('approved'))
+            records = list(read_records(path))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(
+            records[0]['answer']['homeworks'][0]['reviewer_comment'],
+            'token ***'
+        )
+        pauses = []
+        summary = replay(records, speedup=100, sleep=pauses.append)
+        self.assertEqual(pauses, [6, 6, 6, 6])
+        self.assertEqual(summary['answers'], 5)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['changes'], 3)
+        self.assertEqual(summary['recorded_seconds'], 2400)
+
+    def test_token_of_tenant_hidden(self):
+        tenant = Tenant(id='first', practicum_token='sometoken', chat_id='1')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'api.jsonl')
+            recorder = ApiRecorder(path, secrets=['defaulttoken'])
+            with mock.patch.object(homework, 'RECORDER', recorder):
+                homework.record_answer(
+                    0, 200, answer('reviewing'), tenant=tenant
+                )
+            record, = read_records(path)
+        self.assertEqual(record['tenant'], 'first')
+        self.assertEqual(
+            record['answer']['homeworks'][0]['reviewer_comment'],
+            'token ***'
+        )
+
+    def test_replayed_like_sent(self):
+        records = [{'t': 0, 'status_code': 200, 'answer': answer('on_hold')}]
+        summary = replay(records)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(
+            summary['messages'],
+            [homework.render_status(answer('on_hold')['homeworks'][0])],
+        )
+
+    def test_not_modified_answers_are_not_errors(self):
+        records = [
+            {'t': 0, 'status_code': 200, 'answer': answer('reviewing')},
+            {'t': 600, 'status_code': 304, 'answer': answer('reviewing')},
+            {'t': 1200, 'status_code': 304, 'answer': None},
+        ]
+        summary = replay(records)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['changes'], 1)
+
+    def test_tenants_replayed_separately(self):
+        records = [
+            {'t': 0, 'status_code': 200, 'answer': answer('reviewing'),
+             'tenant': 'first'},
+            {'t': 0, 'status_code': 200, 'answer': answer('approved'),
+             'tenant': 'second'},
+            {'t': 600, 'status_code': 200, 'answer': answer('reviewing'),
+             'tenant': 'first'},
+            {'t': 600, 'status_code': 200, 'answer': answer('approved'),
+             'tenant': 'second'},
+            {'t': 1200, 'status_code': 200, 'answer': answer('approved')},
+        ]
+        summary = replay(records)
+        self.assertEqual(summary['changes'], 3)
+        self.assertTrue(summary['messages'][0].startswith('first: '))
+        self.assertTrue(summary['messages'][1].startswith('second: '))
+
+    def test_answers_of_tenants_recorded_with_ids(self):
+        tenants = [
+            Tenant(id=str(number), practicum_token=f'token-{number}',
+                   chat_id=str(number))
+            for number in range(2)
+        ]
+        simulation = Simulation(tenants)
+        simulation.schedule(0, 'token-0', 'reviewing')
+        simulation.schedule(0, 'token-1', 'reviewing')
+        simulation.schedule(DAY, 'token-1', 'approved')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'api.jsonl')
+            recorder = ApiRecorder(path, clock=simulation.clock.time)
+            simulation.run(2 * DAY, RECORDER=recorder)
+            records = list(read_records(path))
+        self.assertEqual(
+            {record['tenant'] for record in records}, {'0', '1'}
+        )
+        summary = replay(records)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(summary['changes'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import homework
+from cards import CardStore, send_card
+from metrics import Registry
+from shadow import (
+    ShadowBot, comparable_kind, compare, messages, stage_summary
+)
+
+
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+class TestShadowBot(unittest.TestCase):
+    def setUp(self):
+        self.sink = ListSink()
+        self.bot = ShadowBot(self.sink, clock=lambda: 100)
+
+    def test_send_message_recorded(self):
+        message = self.bot.send_message(chat_id=1, text='hi')
+        self.assertEqual(message.message_id, 1)
+        self.assertEqual(self.sink.events, [{
+            'event': 'would_send', 'action': 'send', 'chat_id': '1',
+            'text': 'hi', 't': 100, 'message_id': 1,
+        }])
+
+    def test_cards_work_with_shadow(self):
+        store = CardStore()
+        send_card(self.bot, store, 1, 7, 'reviewing')
+        send_card(self.bot, store, 1, 7, 'approved')
+        self.assertEqual(
+            [event['action'] for event in self.sink.events], ['send', 'edit']
+        )
+        self.assertEqual(store.get(1, 7)['text'], 'approved')
+
+
+class TestReport(unittest.TestCase):
+    def test_compare_with_baseline(self):
+        events = [
+            {'event': 'status_changed', 'chat_id': '1', 'message': 'a'},
+            {'event': 'would_send', 'chat_id': '1', 'text': 'a'},
+            {'event': 'status_changed', 'chat_id': '1', 'message': 'b'},
+            {'event': 'would_send', 'chat_id': '1', 'text': 'b'},
+            {'event': 'would_send', 'chat_id': '1', 'text': 'failure'},
+        ]
+        live = [
+            {'event': 'status_changed', 'chat_id': 1, 'message': 'a'},
+            {'event': 'status_changed', 'chat_id': 2, 'message': 'c'},
+        ]
+        kind = comparable_kind(live)
+        self.assertEqual(kind, 'status_changed')
+        only_shadow, only_baseline = compare(
+            messages(events, kind), messages(live, kind)
+        )
+        self.assertEqual(list(only_shadow), [('1', 'b')])
+        self.assertEqual(list(only_baseline), [('2', 'c')])
+        self.assertEqual(comparable_kind(events), 'would_send')
+        self.assertEqual(sum(messages(events).values()), 3)
+
+    def test_stage_summary(self):
+        registry = Registry()
+        histogram = registry.histogram('stage_seconds')
+        for value in (1, 2, 3, 4):
+            histogram.observe(value, labels={'stage': 'fetch'})
+        summary = stage_summary(registry)
+        self.assertEqual(summary['fetch']['count'], 4)
+        self.assertEqual(summary['fetch']['p50'], 2)
+        self.assertEqual(summary['fetch']['p99'], 4)
+
+
+class TestDryRun(unittest.TestCase):
+    def test_files_of_live_worker_untouched(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        def path(name):
+            return os.path.join(directory.name, name)
+
+        with mock.patch.multiple(
+            homework, DRY_RUN=True, DRY_RUN_FILE=path('dry.jsonl'),
+            DRY_RUN_SINK=None, EVENT_SINKS=f'jsonl:{path("live.jsonl")}',
+            SINKS=homework.SINKS, HISTORY_FILE=path('history.log'),
+            HISTORY=None, CARD_STORE=CardStore(path('cards.json')),
+            RECORDER=homework.ApiRecorder(path('api.jsonl')),
+        ):
+            bot = homework.start_dry_run(None)
+            homework.start_sinks()
+            with self.assertLogs('homework', level='WARNING'):
+                homework.start_history()
+            self.assertEqual(homework.SINKS.sinks, [homework.DRY_RUN_SINK])
+            self.assertIs(bot.sink, homework.DRY_RUN_SINK)
+            self.assertIsNone(homework.CARD_STORE.path)
+            self.assertIsNone(homework.RECORDER)
+            self.assertIsNone(homework.HISTORY)
+            homework.DRY_RUN_SINK.close(5)
+        self.assertEqual(os.listdir(directory.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import time
+import unittest
+
+from clock import VirtualClock
+import homework
+from config import Tenant
+from my_unittests.simulation import DAY, Simulation
+from polling_calendar import PollingCalendar
+
+
+class TestVirtualClock(unittest.TestCase):
+    def test_sleep_moves_time(self):
+        clock = VirtualClock(100)
+        clock.sleep(600)
+        self.assertEqual(clock.time(), 700)
+        with self.assertRaises(ValueError):
+            clock.advance(-1)
+
+
+class TestSimulation(unittest.TestCase):
+    def test_month_of_polling(self):
+        simulation = Simulation()
+        simulation.schedule(0, 'sometoken', 'reviewing')
+        simulation.schedule(2 * DAY + 1, 'sometoken', 'approved')
+        started = time.perf_counter()
+        simulation.run(30 * DAY)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(simulation.cycles, 30 * 144)
+        self.assertEqual(simulation.api.requests, 30 * 144)
+        messages = simulation.messages()
+        self.assertEqual([at for at, _, _ in messages], [0, 2 * DAY + 600])
+        self.assertIn('Работа проверена', messages[1][2])
+
+    def test_api_failure_and_recovery(self):
+        simulation = Simulation()
+        simulation.schedule(0, 'sometoken', 'reviewing')
+        simulation.run(DAY)
+        simulation.api.status_code = 500
+        with self.assertLogs('homework', level='ERROR'):
+            simulation.run(DAY)
+        simulation.api.status_code = None
+        simulation.run(DAY)
+        texts = [text for _, _, text in simulation.messages()]
+        self.assertEqual(len(texts), 3)
+        self.assertTrue(texts[1].startswith('Program failure'))
+        self.assertEqual(texts[0], texts[2])
+
+    def test_quiet_hours(self):
+        simulation = Simulation()
+        simulation.schedule(0, 'sometoken', 'reviewing')
+        calendar = PollingCalendar(quiet_hours=[('00:00', '12:00')])
+        simulation.run(DAY, CALENDAR=calendar)
+        self.assertEqual(simulation.api.requests, 72)
+
+    def test_tenants(self):
+        tenants = [
+            Tenant(id=str(number), practicum_token=f'token-{number}',
+                   chat_id=str(number))
+            for number in range(3)
+        ]
+        simulation = Simulation(tenants)
+        for tenant in tenants:
+            simulation.schedule(0, tenant.practicum_token, 'reviewing')
+        simulation.schedule(DAY, 'token-1', 'rejected')
+        simulation.run(2 * DAY)
+        self.assertEqual(simulation.api.requests, 3 * 2 * 144)
+        chats = [chat_id for _, chat_id, _ in simulation.messages()]
+        self.assertEqual(sorted(chats), ['0', '1', '1', '2'])
+
+    def test_digest_mode(self):
+        for digest in (None, homework.DIGEST):
+            with self.subTest(digest=digest):
+                simulation = Simulation()
+                simulation.schedule(0, 'sometoken', 'reviewing')
+                simulation.schedule(DAY, 'sometoken', 'rejected')
+                simulation.schedule(DAY + 600, 'sometoken', 'reviewing')
+                patches = {'DIGEST': digest} if digest else {}
+                simulation.run(7 * DAY, DELIVERY_MODE='digest', **patches)
+                messages = simulation.messages()
+                self.assertEqual(
+                    [at for at, _, _ in messages], [3600, DAY + 3600]
+                )
+                self.assertEqual(messages[1][2].count('\n- '), 2)
+
+
+class TestRun(unittest.TestCase):
+    def test_clock_and_transport_passed_in(self):
+        clock, transport = VirtualClock(100), object()
+        seen = []
+
+        def poll(bot):
+            seen.append((bot, homework.CLOCK, homework.TRANSPORT))
+
+        globals_before = homework.CLOCK, homework.TRANSPORT
+        homework.run('bot', clock, transport, poll=poll, cycles=3)
+        self.assertEqual(seen, [('bot', clock, transport)] * 3)
+        self.assertEqual(clock.time(), 100 + 3 * homework.RETRY_PERIOD)
+        self.assertEqual(
+            (homework.CLOCK, homework.TRANSPORT), globals_before
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
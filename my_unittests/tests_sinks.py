@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from sinks import EventSink, HttpSink, JsonlSink, SinkHub, build_sinks
+
+
+class SlowSink(EventSink):
+    name = 'slow'
+
+    def __init__(self, **kwargs):
+        self.release = threading.Event()
+        self.written = []
+        super().__init__(**kwargs)
+
+    def write(self, event):
+        self.release.wait(5)
+        self.written.append(event)
+
+
+class HookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.server.events.append(json.loads(self.rfile.read(length)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSinks(unittest.TestCase):
+    event = {'event': 'status_changed', 'homework_id': 710842,
+             'status': 'approved'}
+
+    def test_jsonl_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            sink = JsonlSink(path)
+            sink.emit(self.event)
+            sink.emit(self.event)
+            sink.close()
+            with open(path, encoding='utf-8') as file:
+                lines = file.readlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [self.event, self.event])
+
+    def test_slow_sink_does_not_stall_others(self):
+        slow = SlowSink(queue_size=2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            fast = JsonlSink(path)
+            hub = SinkHub([slow, fast])
+            started = time.monotonic()
+            for _ in range(10):
+                hub.emit(self.event)
+            self.assertLess(time.monotonic() - started, 1)
+            fast.close()
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(file.readlines()), 10)
+        self.assertGreater(slow.dropped, 0)
+        slow.release.set()
+        slow.close()
+        self.assertEqual(len(slow.written) + slow.dropped, 10)
+
+    def test_http_sink(self):
+        server = HTTPServer(('127.0.0.1', 0), HookHandler)
+        server.events = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        sink = HttpSink(f'http://{host}:{port}/hook')
+        sink.emit(self.event)
+        sink.close()
+        server.shutdown()
+        server.server_close()
+        self.assertEqual(server.events, [self.event])
+        self.assertEqual(sink.failed, 0)
+
+    def test_build_sinks_unknown(self):
+        with self.assertRaises(ValueError):
+            build_sinks('stdout,kafka://localhost')
+
+
+if __name__ == '__main__':
+    unittest.main()
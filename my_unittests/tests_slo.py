@@ -0,0 +1,118 @@
+import unittest
+
+from clock import VirtualClock
+from config import Tenant
+from metrics import Registry
+from my_unittests.simulation import DAY, START, Simulation
+from slo import LatencyTracker, parse_date
+
+
+def homework(updated_at):
+    return {'date_updated': f'2024-01-01T00:00:{updated_at:02d}Z'}
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock(START)
+        self.registry = Registry()
+        self.tracker = LatencyTracker(
+            30, percentile=0.5, clock=self.clock.time,
+            registry=self.registry,
+        )
+
+    def test_delays(self):
+        self.clock.now = START + 20
+        detection = self.tracker.detected(homework(5))
+        self.clock.now = START + 22
+        self.tracker.tracked(detection, lambda: None)()
+        self.assertEqual(self.tracker.detection.percentile(0.5), 15)
+        self.assertEqual(self.tracker.delivery.percentile(0.5), 2)
+        self.assertEqual(self.tracker.latency.percentile(0.5), 17)
+        self.assertFalse(self.tracker.breached())
+
+    def test_breach(self):
+        self.clock.now = START + 50
+        detection = self.tracker.detected(homework(1))
+        with self.assertLogs('slo', level='WARNING'):
+            self.tracker.delivered(detection)
+        self.assertEqual(self.tracker.breaches.value(), 1)
+        self.assertTrue(self.tracker.breached())
+        self.assertEqual(self.tracker.breached_gauge.value(), 1)
+
+    def test_failed_delivery_not_recorded(self):
+        detection = self.tracker.detected(homework(1))
+
+        def failing():
+            raise RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            self.tracker.tracked(detection, failing)()
+        self.assertEqual(self.tracker.latency.count(), 0)
+
+    def test_change_measured_once_per_tenant(self):
+        self.clock.now = START + 20
+        for tenant in ('a', 'b'):
+            detection = self.tracker.detected(homework(5), tenant)
+            self.tracker.delivered(detection)
+        self.assertIsNone(self.tracker.detected(homework(5), 'a'))
+        self.assertEqual(self.tracker.latency.count(), 2)
+
+    def test_measured_changes_bounded(self):
+        tracker = LatencyTracker(
+            30, clock=self.clock.time, registry=Registry(), measured_size=2
+        )
+        for tenant in ('a', 'b', 'c'):
+            tracker.delivered(tracker.detected(homework(5), tenant))
+        self.assertEqual(len(tracker._measured), 2)
+        self.assertIsNotNone(tracker.detected(homework(5), 'a'))
+        self.assertIsNone(tracker.detected(homework(5), 'c'))
+
+    def test_changes_before_start_ignored(self):
+        self.clock.now = START + 10
+        tracker = LatencyTracker(
+            30, clock=self.clock.time, registry=Registry()
+        )
+        self.assertIsNone(tracker.detected(homework(5)))
+        self.assertIsNone(tracker.detected({'date_updated': 'yesterday'}))
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date('2024-01-01T00:00:00Z'), START)
+
+
+class TestLatencyInSimulation(unittest.TestCase):
+    def test_detection_within_retry_period(self):
+        simulation = Simulation()
+        tracker = LatencyTracker(
+            900, clock=simulation.clock.time, registry=Registry()
+        )
+        simulation.schedule(0, 'sometoken', 'reviewing')
+        for day, status in enumerate(['rejected', 'reviewing', 'approved']):
+            simulation.schedule((day + 1) * DAY + 100, 'sometoken', status)
+        simulation.run(4 * DAY, NOTIFY_LATENCY=tracker)
+        self.assertEqual(tracker.latency.count(), 4)
+        self.assertEqual(tracker.latency.percentile(0.5), 500)
+        self.assertEqual(tracker.detection.percentile(1), 500)
+        self.assertFalse(tracker.breached())
+
+    def test_resend_after_outage_not_measured(self):
+        for tenants in (None, [Tenant('student', 'sometoken', '1')]):
+            with self.subTest(tenants=tenants):
+                simulation = Simulation(tenants)
+                tracker = LatencyTracker(
+                    900, clock=simulation.clock.time, registry=Registry()
+                )
+                simulation.schedule(0, 'sometoken', 'reviewing')
+                simulation.run(DAY, NOTIFY_LATENCY=tracker)
+                simulation.api.status_code = 500
+                with self.assertLogs('homework', level='ERROR'):
+                    simulation.run(60 * 60, NOTIFY_LATENCY=tracker)
+                simulation.api.status_code = None
+                simulation.run(DAY, NOTIFY_LATENCY=tracker)
+                self.assertEqual(len(simulation.messages()), 3)
+                self.assertEqual(tracker.latency.count(), 1)
+                self.assertEqual(tracker.breaches.value(), 0)
+                self.assertFalse(tracker.breached())
+
+
+if __name__ == '__main__':
+    unittest.main()
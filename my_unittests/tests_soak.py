@@ -0,0 +1,60 @@
+import tracemalloc
+import unittest
+from unittest import mock
+
+import homework
+from benchmarks.soak import Population, run
+from my_unittests.fakes import FakePracticumAPI
+
+poll_tenant = homework.poll_tenant
+
+
+def leaking_poll_tenant(bot, state):
+    poll_tenant(bot, state)
+    state.cache.history = getattr(state.cache, 'history', []) + [
+        state.timestamp
+    ]
+
+
+class TestSoak(unittest.TestCase):
+    def test_memory_is_flat(self):
+        result = run(tenants=50, cycles=200, churn=0.1, replace=0.02)
+        self.assertEqual(result['failures'], [], '\n'.join(result['top']))
+        self.assertEqual(result['polls'], 50 * 200)
+        self.assertGreater(result['messages'], 50)
+
+    def test_leak_detected(self):
+        with mock.patch('homework.poll_tenant', leaking_poll_tenant):
+            result = run(tenants=50, cycles=100, replace=0)
+        self.assertTrue(result['failures'])
+        self.assertIn('State per tenant grew', result['failures'][0])
+        self.assertTrue(result['top'])
+
+    def test_tracing_of_caller_kept(self):
+        tracemalloc.start()
+        try:
+            run(tenants=5, cycles=10)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        run(tenants=5, cycles=10)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestPopulation(unittest.TestCase):
+    def test_homework_ids_unique(self):
+        api = FakePracticumAPI()
+        population = Population(api, 10)
+        for _ in range(4):
+            population.change_statuses(10)
+        ids = [
+            homework['id']
+            for homeworks in api.homeworks.values()
+            for homework in homeworks
+        ]
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(len(set(ids)), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
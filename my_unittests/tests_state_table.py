@@ -0,0 +1,79 @@
+import math
+import unittest
+
+from benchmarks.bench_state import measure, reports, state_table
+from state_table import StateTable, StatusCodes, fingerprint_of
+
+
+class TestStatusCodes(unittest.TestCase):
+    def test_interned(self):
+        codes = StatusCodes(['reviewing', 'approved'])
+        self.assertEqual(codes.code('reviewing'), 1)
+        self.assertEqual(codes.code('new'), 3)
+        self.assertEqual(codes.code('new'), 3)
+        self.assertEqual(codes.name(0), '')
+        self.assertEqual(codes.name(2), 'approved')
+        self.assertEqual(len(codes), 4)
+
+
+class TestStateTable(unittest.TestCase):
+    def setUp(self):
+        self.table = StateTable(['reviewing', 'approved', 'rejected'])
+
+    def test_columns_by_tenant_id(self):
+        row = self.table.add('first', cursor=100, last_poll=400.0)
+        self.assertEqual(self.table.add('first'), row)
+        second = self.table.add('second', cursor=200)
+        self.assertEqual(len(self.table), 2)
+        self.assertIn('second', self.table)
+        self.assertEqual(self.table.row('second'), second)
+        self.assertEqual(self.table.cursor[row], 100)
+        self.assertEqual(self.table.last_poll[row], 400.0)
+        self.assertTrue(math.isnan(self.table.last_poll[second]))
+        self.table.cursor[second] = 300
+        self.assertEqual(self.table.cursor[self.table.row('second')], 300)
+        with self.assertRaises(KeyError):
+            self.table.row('unknown')
+
+    def test_statuses(self):
+        row = self.table.add('first')
+        self.assertEqual(self.table.status_of(row), '')
+        self.table.set_status(row, 'approved')
+        self.assertEqual(self.table.status[row], 2)
+        self.table.set_status(row, 'new')
+        self.assertEqual(self.table.status_of(row), 'new')
+
+    def test_rows_reused(self):
+        row = self.table.add('first', cursor=1)
+        self.table.fingerprint[row] = fingerprint_of('text')
+        self.table.set_status(row, 'reviewing')
+        self.table.remove('first')
+        self.assertNotIn('first', self.table)
+        self.assertEqual(self.table.add('second', cursor=2), row)
+        self.assertEqual(self.table.cursor[row], 2)
+        self.assertEqual(self.table.fingerprint[row], 0)
+        self.assertEqual(self.table.status_of(row), '')
+        self.assertEqual(self.table.tenants(), ['second'])
+
+    def test_row_moved_to_other_table(self):
+        row = self.table.add('first', cursor=5, last_poll=10.0)
+        self.table.set_status(row, 'rejected')
+        other = StateTable()
+        other.add('other')
+        moved = self.table.move('first', other)
+        self.assertNotIn('first', self.table)
+        self.assertEqual(other.row('first'), moved)
+        self.assertEqual(other.cursor[moved], 5)
+        self.assertEqual(other.last_poll[moved], 10.0)
+        self.assertEqual(other.status_of(moved), 'rejected')
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_table_is_smaller(self):
+        table = measure(state_table, 200, 5)['bytes_per_tenant']
+        dicts = measure(reports, 200, 5)['bytes_per_tenant']
+        self.assertLess(table * 10, dicts)
+
+
+if __name__ == '__main__':
+    unittest.main()
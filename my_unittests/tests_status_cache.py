@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import homework
+from clock import VirtualClock
+from config import Tenant
+from my_unittests.fakes import FakePracticumAPI, InProcessTransport
+from status_cache import StatusCache
+from tenants import TenantRegistry
+
+
+class TestStatusCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.cache = StatusCache(ttl=600, clock=self.clock.monotonic)
+        self.answer = {'current_date': 1679996158, 'homeworks': []}
+
+    def test_fresh_answer_does_not_call_api(self):
+        self.cache.update(self.answer)
+        self.clock.now = 599
+        result = self.cache.get(lambda: self.fail('API should not be called'))
+        self.assertIs(result, self.answer)
+
+    def test_stale_answer_is_refreshed(self):
+        self.cache.update(self.answer)
+        self.clock.now = 600
+        new_answer = {'current_date': 1679996758, 'homeworks': []}
+        self.assertIs(self.cache.get(lambda: new_answer), new_answer)
+        self.assertIs(self.cache.peek(), new_answer)
+
+    def test_burst_of_requests_calls_api_once(self):
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return self.answer
+
+        threads = [
+            threading.Thread(target=self.cache.get, args=(slow_fetch,))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_waiters_share_failure_of_refresh(self):
+        calls, errors = [], []
+
+        def failing_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            raise ConnectionError('API is down')
+
+        def get():
+            try:
+                self.cache.get(failing_fetch)
+            except ConnectionError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=get) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 10)
+        self.assertIs(self.cache.get(lambda: self.answer), self.answer)
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+
+class TestStatusCommand(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.api = FakePracticumAPI()
+        self.api.set_status('sometoken', 'reviewing')
+        self.api.set_status('token-a', 'approved')
+        self.bot = FakeBot()
+        self.tenants = TenantRegistry(clock=self.clock.monotonic)
+        self.patch = mock.patch.multiple(
+            homework,
+            TRANSPORT=InProcessTransport(self.api),
+            HEADERS={'Authorization': 'OAuth sometoken'},
+            TELEGRAM_CHAT_ID='1',
+            STATUS_CACHE=StatusCache(600, clock=self.clock.monotonic),
+            TENANTS=self.tenants,
+        )
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_answer_taken_from_cache_until_stale(self):
+        for _ in range(3):
+            homework.status_command(self.bot, update(1))
+        self.assertEqual(self.api.requests, 1)
+        self.clock.advance(600)
+        homework.status_command(self.bot, update(1))
+        self.assertEqual(self.api.requests, 2)
+        self.assertEqual(self.bot.sent, [('1', homework.render_status(
+            self.api.homeworks['sometoken'][0]
+        ))] * 4)
+
+    def test_chat_of_tenant_answered_with_its_status(self):
+        self.tenants.apply([Tenant('a', 'token-a', '2', locale='en')], 0)
+        with mock.patch.object(homework, 'TENANTS_FILE', 'tenants.json'):
+            homework.status_command(self.bot, update(2))
+            with self.assertLogs('homework', level='WARNING'):
+                homework.status_command(self.bot, update(1))
+        self.assertEqual(self.bot.sent, [('2', homework.render_status(
+            self.api.homeworks['token-a'][0], 'en'
+        ))])
+
+    def test_failure_reported_to_chat(self):
+        self.api.status_code = 500
+        with self.assertLogs('homework', level='ERROR'):
+            homework.status_command(self.bot, update(1))
+        self.assertEqual(len(self.bot.sent), 1)
+        self.assertTrue(self.bot.sent[0][1].startswith('Failed to get'))
+
+
+if __name__ == '__main__':
+    unittest.main()
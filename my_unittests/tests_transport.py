@@ -0,0 +1,75 @@
+import builtins
+import unittest
+from unittest import mock
+
+from exceptions import TransportError
+from my_unittests.fakes import FakeHTTP2PracticumAPI, FakePracticumAPI
+from transport import (
+    HTTP2Transport, PooledTransport, RequestsTransport, httpx, make_transport
+)
+
+
+class TransportTestMixin:
+    def test_get(self):
+        self.api.set_status('sometoken', 'approved')
+        url = self.api.start()
+        try:
+            response = self.transport.get(
+                url,
+                headers={'Authorization': 'OAuth sometoken'},
+                params={'from_date': 0},
+            )
+        finally:
+            self.transport.close()
+            self.api.stop()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['homeworks'][0]['status'],
+                         'approved')
+
+
+class TestRequestsTransport(TransportTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.api = FakePracticumAPI()
+        self.transport = RequestsTransport()
+
+
+class TestPooledTransport(TransportTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.api = FakePracticumAPI()
+        self.transport = PooledTransport(pool_size=2)
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestHTTP2Transport(TransportTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.api = FakeHTTP2PracticumAPI()
+        self.transport = HTTP2Transport(prior_knowledge=True)
+
+
+class TestMakeTransport(unittest.TestCase):
+    def test_unknown_transport(self):
+        with self.assertRaises(ValueError):
+            make_transport('http3')
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_pool_size_of_http2(self):
+        with mock.patch.object(httpx, 'Limits', wraps=httpx.Limits) as limits:
+            make_transport('http2', pool_size=7).close()
+        limits.assert_called_once_with(max_connections=7)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_http2_without_h2(self):
+        real_import = builtins.__import__
+
+        def import_without_h2(name, *args, **kwargs):
+            if name == 'h2' or name.startswith('h2.'):
+                raise ImportError(f'No module named {name!r}')
+            return real_import(name, *args, **kwargs)
+
+        with mock.patch('builtins.__import__', import_without_h2):
+            with self.assertRaises(TransportError):
+                make_transport('http2')
+
+
+if __name__ == '__main__':
+    unittest.main()
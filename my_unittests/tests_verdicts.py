@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+
+from homework import HOMEWORK_VERDICTS, parse_status, render_status
+from verdicts import UnknownStatusError, VerdictCatalog
+
+
+class TestVerdictCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = VerdictCatalog.build(HOMEWORK_VERDICTS)
+
+    def test_default_locale_matches_parse_status(self):
+        homework = {'homework_name': 'hw05_final.zip', 'status': 'approved'}
+        self.assertEqual(
+            self.catalog.render('hw05_final.zip', 'approved', 'ru'),
+            parse_status(homework)
+        )
+
+    def test_other_locale(self):
+        self.assertEqual(
+            self.catalog.render('hw.zip', 'rejected', 'en'),
+            'Review status of "hw.zip" changed. '
+            'The reviewer has some remarks.'
+        )
+
+    def test_unknown_locale_falls_back_to_default(self):
+        self.assertEqual(
+            self.catalog.render('hw.zip', 'approved', 'de'),
+            self.catalog.render('hw.zip', 'approved', 'ru'),
+        )
+
+    def test_unknown_status(self):
+        self.assertEqual(
+            self.catalog.render('hw.zip', 'on_hold', 'en'),
+            'Review status of "hw.zip" changed: on_hold.'
+        )
+        with self.assertRaises(UnknownStatusError):
+            self.catalog.render('hw.zip', 'on_hold', 'en', strict=True)
+        self.assertIn(
+            'on_hold',
+            render_status({'homework_name': 'hw.zip', 'status': 'on_hold'})
+        )
+
+    def test_rendered_once(self):
+        for _ in range(100):
+            self.catalog.render('hw.zip', 'approved', 'ru')
+        info = self.catalog.render.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 99))
+
+    def test_catalog_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'verdicts.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'en': {'verdicts': {'approved': 'Done!'}},
+                           'uk': {'message': '$homework_name: $verdict',
+                                  'unknown': '$homework_name: $status',
+                                  'verdicts': {}}}, file)
+            catalog = VerdictCatalog.build(HOMEWORK_VERDICTS, path)
+        self.assertEqual(
+            catalog.render('hw.zip', 'approved', 'en'),
+            'Review status of "hw.zip" changed. Done!'
+        )
+        self.assertEqual(
+            catalog.render('hw.zip', 'rejected', 'en'),
+            self.catalog.render('hw.zip', 'rejected', 'en'),
+        )
+        self.assertEqual(catalog.render('hw.zip', 'approved', 'uk'),
+                         'hw.zip: approved')
+
+    def test_invalid_catalog_file(self):
+        for content in ([], 'en', {'en': []}, {'en': {'verdicts': []}}):
+            with self.subTest(content=content):
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, 'verdicts.json')
+                    with open(path, 'w', encoding='utf-8') as file:
+                        json.dump(content, file)
+                    with self.assertRaises(ValueError):
+                        VerdictCatalog.build(HOMEWORK_VERDICTS, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import telegram
+
+import homework
+from updates import CommandDispatcher
+from webhook import WebhookServer
+
+
+class TestWebhookServer(unittest.TestCase):
+    def setUp(self):
+        self.handled = threading.Event()
+        self.updates = []
+
+        def status_handler(bot, update):
+            self.updates.append(update)
+            self.handled.set()
+
+        dispatcher = CommandDispatcher()
+        dispatcher.add_handler('status', status_handler)
+        self.server = WebhookServer(
+            ('127.0.0.1', 0), '/secret', None, dispatcher
+        )
+        self.server.serve_in_thread()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, path, data, headers=None):
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        request = urllib.request.Request(
+            self.url + path,
+            data=data,
+            headers={'Content-Type': 'application/json', **(headers or {})},
+        )
+        return urllib.request.urlopen(request, timeout=5)
+
+    def test_update_dispatched_to_handler(self):
+        update = {
+            'update_id': 1,
+            'message': {
+                'message_id': 10,
+                'date': 1679996158,
+                'chat': {'id': 12345, 'type': 'private'},
+                'text': '/status@practicum_review_status_bot',
+            },
+        }
+        response = self.post('/secret', update)
+        self.assertEqual(response.status, 200)
+        self.assertTrue(self.handled.wait(5))
+        self.assertEqual(self.updates[0].effective_chat.id, 12345)
+
+    def test_wrong_path_rejected(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post('/other', {'update_id': 1})
+        self.assertEqual(context.exception.code, 404)
+
+    def test_malformed_updates_rejected(self):
+        cases = [
+            (b'[1, 2]', {}),
+            (b'"update"', {}),
+            (b'{}', {}),
+            (b'{"update_id": 1, "message": 5}', {}),
+            (b'{"update_id": 1, "message": {"message_id": 1}}', {}),
+            (b'{"update_id": 1', {}),
+            (b'{}', {'Content-Length': 'many'}),
+            (b'{}', {'Content-Length': '-1'}),
+        ]
+        for data, headers in cases:
+            with self.subTest(data=data, headers=headers):
+                with self.assertLogs('webhook', level='ERROR'):
+                    with self.assertRaises(urllib.error.HTTPError) as context:
+                        self.post('/secret', data, headers)
+                self.assertEqual(context.exception.code, 400)
+        self.assertFalse(self.handled.is_set())
+
+
+class TestStartUpdates(unittest.TestCase):
+    def test_fallback_to_polling_without_telegram(self):
+        bot = mock.Mock()
+        bot.set_webhook.side_effect = telegram.error.NetworkError('down')
+        bot.delete_webhook.side_effect = telegram.error.NetworkError('down')
+        stop_event = threading.Event()
+        with mock.patch.multiple(
+            homework, UPDATES_MODE='webhook', DRY_RUN=False,
+            WEBHOOK_HOST='127.0.0.1', WEBHOOK_PORT=0,
+            WEBHOOK_URL='https://example.com/secret',
+            start_polling=mock.Mock(return_value=stop_event),
+        ):
+            with self.assertLogs('homework', level='ERROR') as logs:
+                self.assertIs(homework.start_updates(bot), stop_event)
+            homework.start_polling.assert_called_once()
+        self.assertIn('Failed to delete webhook', logs.output[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
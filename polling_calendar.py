@@ -0,0 +1,95 @@
+"""Calendar of quiet hours when reviewers do not work.
+
+During quiet hours a tenant is polled once in `quiet_retry_period`
+seconds or, if it is None, not polled at all. The first cycle after the
+quiet window polls as usual, which is the catch-up poll: from_date of the
+tenant does not move, so every change made during the window is caught.
+
+Spec format (JSON):
+{
+    "timezone": "Europe/Moscow",
+    "quiet_hours": [["23:00", "08:00"]],
+    "quiet_weekdays": [5, 6],
+    "quiet_retry_period": 3600
+}
+quiet_weekdays are numbers of days (Monday is 0) quiet all day long.
+"""
+
+from datetime import datetime, time as day_time
+from typing import FrozenSet, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def _parse_time(value: str) -> day_time:
+    hours, minutes = value.split(':')
+    return day_time(int(hours), int(minutes))
+
+
+class PollingCalendar:
+    """Quiet windows of one tenant."""
+
+    def __init__(self, timezone: str = 'UTC',
+                 quiet_hours: Sequence[Tuple[str, str]] = (),
+                 quiet_weekdays: Sequence[int] = (),
+                 quiet_retry_period: Optional[int] = None):
+        try:
+            self.timezone = ZoneInfo(timezone)
+            self.quiet_hours = tuple(
+                (_parse_time(start), _parse_time(end))
+                for start, end in quiet_hours
+            )
+        except (ZoneInfoNotFoundError, ValueError, TypeError) as error:
+            raise ValueError(f'Invalid polling calendar: {error}') from error
+        days_valid = isinstance(
+            quiet_weekdays, (list, tuple, set, frozenset)
+        ) and all(
+            isinstance(day, int) and not isinstance(day, bool)
+            and 0 <= day <= 6 for day in quiet_weekdays
+        )
+        if not days_valid:
+            raise ValueError(
+                f'Invalid polling calendar: quiet_weekdays should be '
+                f'numbers from 0 to 6, not {quiet_weekdays!r}'
+            )
+        self.quiet_weekdays: FrozenSet[int] = frozenset(quiet_weekdays)
+        if quiet_retry_period is not None and (
+            not isinstance(quiet_retry_period, (int, float))
+            or isinstance(quiet_retry_period, bool)
+            or quiet_retry_period < 0
+        ):
+            raise ValueError(
+                f'Invalid polling calendar: quiet_retry_period should be '
+                f'a number >= 0, not {quiet_retry_period!r}'
+            )
+        self.quiet_retry_period = quiet_retry_period
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PollingCalendar':
+        """Create the calendar from its JSON spec."""
+        try:
+            return cls(**data)
+        except TypeError as error:
+            raise ValueError(f'Invalid polling calendar: {error}') from error
+
+    def is_quiet(self, timestamp: float) -> bool:
+        """Check that the moment is inside one of the quiet windows."""
+        moment = datetime.fromtimestamp(timestamp, self.timezone)
+        if moment.weekday() in self.quiet_weekdays:
+            return True
+        now = moment.time()
+        for start, end in self.quiet_hours:
+            if start <= end:
+                if start <= now < end:
+                    return True
+            elif now >= start or now < end:
+                # The window goes over midnight, e.g. 23:00 - 08:00.
+                return True
+        return False
+
+    def should_poll(self, now: float, last_poll: Optional[float]) -> bool:
+        """Decide if the tenant is polled in the cycle starting now."""
+        if not self.is_quiet(now):
+            return True
+        if self.quiet_retry_period is None:
+            return False
+        return last_poll is None or now - last_poll >= self.quiet_retry_period
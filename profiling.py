@@ -0,0 +1,160 @@
+"""On-demand profiling of the polling loop.
+
+CPU: cProfile is enabled for the next N cycles of the loop, then stats of
+the watched functions and the top of all functions are logged (and dumped
+to a .pstats file if a directory is given). cProfile sees only its own
+thread, so work of the cycle done by other threads is wrapped in task():
+every task gets its own profile, they are merged in the report. Since
+Python 3.12 only one profile can be enabled in the process and it sees
+all threads: a task then runs without a profile of its own.
+
+Memory: the first request takes a tracemalloc snapshot, the next one
+compares a new snapshot with it and logs the top lines by growth.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS: int = 20
+TOP_MEMORY_LINES: int = 10
+
+
+def _enable(profile: cProfile.Profile) -> bool:
+    """Enable the profile, False if another one is enabled already."""
+    try:
+        profile.enable()
+    except ValueError:
+        return False
+    return True
+
+
+class CycleProfiler:
+    """Profile the cycles of the loop on request."""
+
+    def __init__(self, watched: Iterable[str] = (),
+                 dump_dir: Optional[str] = None):
+        self.watched = frozenset(watched)
+        self.dump_dir = dump_dir
+        self._lock = threading.Lock()
+        self._cycles_left = 0
+        self._profile: Optional[cProfile.Profile] = None
+        self._task_profiles: List[cProfile.Profile] = []
+        self._cycle_thread: Optional[int] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._memory_requested = False
+
+    def request(self, cycles: int) -> None:
+        """Profile the next `cycles` cycles. Safe to call from a signal."""
+        self._cycles_left = cycles
+
+    def request_memory_diff(self) -> None:
+        """Take a snapshot or diff with the previous one after the cycle."""
+        self._memory_requested = True
+
+    @contextmanager
+    def cycle(self):
+        """Wrap one cycle of the loop."""
+        profile = None
+        with self._lock:
+            if self._cycles_left > 0:
+                if self._profile is None:
+                    self._profile = cProfile.Profile()
+                profile = self._profile
+                self._cycle_thread = threading.get_ident()
+        if profile is not None and not _enable(profile):
+            logger.warning('Another profiler is enabled, cycle not profiled')
+            profile = None
+            with self._lock:
+                self._cycle_thread = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    self._cycle_thread = None
+                self._cycles_left -= 1
+                if self._cycles_left <= 0:
+                    self._report()
+            if self._memory_requested:
+                self._memory_requested = False
+                self._memory_diff()
+
+    @contextmanager
+    def task(self):
+        """Wrap work of the cycle done in another thread."""
+        with self._lock:
+            active = self._cycle_thread not in (None, threading.get_ident())
+        if not active:
+            yield
+            return
+        profile = cProfile.Profile()
+        if not _enable(profile):
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._task_profiles.append(profile)
+
+    def function_stats(self, stats: pstats.Stats) -> Dict[str, dict]:
+        """Return calls, own and cumulative time of the watched functions."""
+        result = {}
+        for (_, _, name), (_, calls, own, cumulative, _) in (
+            stats.stats.items()
+        ):
+            if name in self.watched:
+                result[name] = {
+                    'calls': calls,
+                    'own_seconds': own,
+                    'cumulative_seconds': cumulative,
+                }
+        return result
+
+    def _report(self) -> None:
+        with self._lock:
+            profile, self._profile = self._profile, None
+            profiles, self._task_profiles = self._task_profiles, []
+        if profile is None:
+            return
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, *profiles, stream=stream)
+        for name, values in sorted(self.function_stats(stats).items()):
+            logger.info(
+                f'Profile of {name}: {values["calls"]} calls, '
+                f'{values["own_seconds"]:.6f}s own, '
+                f'{values["cumulative_seconds"]:.6f}s cumulative'
+            )
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        logger.info(f'Profile of the loop:\n{stream.getvalue()}')
+        if self.dump_dir:
+            path = os.path.join(
+                self.dump_dir, f'profile-{int(time.time())}.pstats'
+            )
+            stats.dump_stats(path)
+            logger.info(f'Profile dumped to {path}')
+
+    def _memory_diff(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        snapshot = tracemalloc.take_snapshot()
+        if self._snapshot is None:
+            self._snapshot = snapshot
+            logger.info('Memory snapshot taken, request again to compare')
+            return
+        top = snapshot.compare_to(self._snapshot, 'lineno')
+        self._snapshot = snapshot
+        lines = '\n'.join(str(stat) for stat in top[:TOP_MEMORY_LINES])
+        logger.info(f'Memory growth since the previous snapshot:\n{lines}')
@@ -0,0 +1,47 @@
+"""Token bucket rate limiter."""
+
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Allow `rate` events per second with bursts up to `burst` events.
+
+    rate == 0 means no limit.
+    """
+
+    def __init__(self, rate: float, burst: float = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_take(self, tokens: float = 1) -> bool:
+        """Take tokens if there are enough of them."""
+        if not self.rate:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until try_take(tokens) succeeds."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill()
+            return max(tokens - self._tokens, 0) / self.rate
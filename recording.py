@@ -0,0 +1,92 @@
+"""Recording of answers from Практикум.Домашка for replaying them later.
+
+Every answer is one compact JSON line:
+{"t": <unix time>, "from_date": ..., "status_code": ..., "answer": {...}}.
+Answers to tenants of TENANTS_FILE also have "tenant": <id of the tenant>.
+An answer taken from the cache on 304 Not Modified is recorded as 200 with
+"not_modified": true.
+Files ending with '.gz' are gzip compressed.
+"""
+
+import gzip
+import json
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+SENSITIVE_KEYS = frozenset({'authorization', 'token', 'oauth'})
+SECRET_PLACEHOLDER: str = '***'
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def sanitize(data: Any, secrets: Iterable[str] = ()) -> Any:
+    """Return a copy of data without tokens.
+
+    Values under sensitive keys and any occurrence of the secrets in
+    strings are replaced with SECRET_PLACEHOLDER.
+    """
+    secrets = [secret for secret in secrets if secret]
+    if isinstance(data, dict):
+        return {
+            key: (
+                SECRET_PLACEHOLDER if str(key).lower() in SENSITIVE_KEYS
+                else sanitize(value, secrets)
+            )
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [sanitize(item, secrets) for item in data]
+    if isinstance(data, str):
+        for secret in secrets:
+            data = data.replace(secret, SECRET_PLACEHOLDER)
+    return data
+
+
+class ApiRecorder:
+    """Append sanitized answers of API to the file."""
+
+    def __init__(self, path: str, secrets: Iterable[str] = (),
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.secrets = list(secrets)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def record(self, from_date, status_code: int, answer: Optional[dict],
+               not_modified: bool = False, tenant: Optional[str] = None,
+               secrets: Iterable[str] = ()) -> None:
+        """Append one answer, to the tenant if it is given.
+
+        `secrets` (e.g. the token of the tenant) are hidden in the answer
+        as well as the secrets of the recorder.
+        """
+        record = {
+            't': self._clock(),
+            'from_date': from_date,
+            'status_code': status_code,
+            'answer': sanitize(answer, [*self.secrets, *secrets]),
+        }
+        if not_modified:
+            record['not_modified'] = True
+        if tenant is not None:
+            record['tenant'] = tenant
+        line = json.dumps(
+            record,
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
+        with self._lock, _open(self.path, 'a') as file:
+            file.write(line + '\n')
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Yield recorded answers in the order they were recorded."""
+    with _open(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,97 @@
+"""Replay answers recorded with API_RECORD_FILE through the bot pipeline.
+
+Answers go through check_response and render_status and are compared with
+the previous message of the same tenant just like in main(), but nothing
+is sent. Messages to tenants are prefixed with their ids. With
+--speedup N pauses between answers are N times shorter than they were,
+with --speedup 0 (default) there are no pauses at all.
+
+Usage: python replay.py api.jsonl [--speedup 1000] [--messages]
+"""
+
+import argparse
+import json
+import logging
+import time
+from http import HTTPStatus
+from typing import Callable, Dict, Iterable, Optional
+
+import homework
+from recording import read_records
+
+
+def replay(records: Iterable[dict], speedup: float = 0,
+           sleep: Callable[[float], None] = time.sleep) -> Dict:
+    """Feed recorded answers to the pipeline and return the summary."""
+    summary = {
+        'answers': 0,
+        'errors': 0,
+        'changes': 0,
+        'recorded_seconds': 0.0,
+        'replay_seconds': 0.0,
+        'check_response_seconds': 0.0,
+        'render_status_seconds': 0.0,
+        'messages': [],
+    }
+    previous_messages: Dict[Optional[str], str] = {}
+    first_time = previous_time = None
+    started = time.perf_counter()
+    for record in records:
+        if previous_time is not None and speedup > 0:
+            sleep(max(record['t'] - previous_time, 0) / speedup)
+        if first_time is None:
+            first_time = record['t']
+        previous_time = record['t']
+        summary['answers'] += 1
+        # Files recorded before 304 was written as 200 have 304 answers.
+        if (
+            record['status_code'] not in (HTTPStatus.OK,
+                                          HTTPStatus.NOT_MODIFIED)
+            or record.get('answer') is None
+        ):
+            summary['errors'] += 1
+            continue
+        try:
+            stage_started = time.perf_counter()
+            homework.check_response(record['answer'])
+            parsed = time.perf_counter()
+            message = homework.render_status(
+                record['answer']['homeworks'][0]
+            )
+            summary['check_response_seconds'] += parsed - stage_started
+            summary['render_status_seconds'] += time.perf_counter() - parsed
+        except Exception:
+            summary['errors'] += 1
+            continue
+        tenant = record.get('tenant')
+        if message != previous_messages.get(tenant):
+            summary['changes'] += 1
+            summary['messages'].append(
+                message if tenant is None else f'{tenant}: {message}'
+            )
+            previous_messages[tenant] = message
+    summary['replay_seconds'] = time.perf_counter() - started
+    if first_time is not None:
+        summary['recorded_seconds'] = previous_time - first_time
+    return summary
+
+
+def main():
+    """Replay the file given in command line and print the summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='file written with API_RECORD_FILE')
+    parser.add_argument('--speedup', type=float, default=0)
+    parser.add_argument('--messages', action='store_true',
+                        help='print messages which would have been sent')
+    args = parser.parse_args()
+    # Recorded failures would flood stderr with tracebacks otherwise.
+    homework.logger.setLevel(logging.CRITICAL)
+    summary = replay(read_records(args.path), speedup=args.speedup)
+    messages = summary.pop('messages')
+    print(json.dumps(summary, indent=2))
+    if args.messages:
+        print('\n'.join(messages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Dry-run (shadow) mode: the full pipeline runs but nothing is sent.
+
+ShadowBot takes the place of telegram.Bot and writes every message it
+would have sent as a 'would_send' event to a sink. After every cycle a
+'stages' event with latency percentiles of the stages of the pipeline is
+written too. Status events, which go to EVENT_SINKS in a live worker,
+go to the same sink.
+
+The report compares the shadow with a baseline: the messages with those of
+another dry run, or the status events with EVENT_SINKS output of the live
+worker (errors and digests are not status events):
+python shadow.py dry_run.jsonl [--baseline live.jsonl]
+"""
+
+import argparse
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from metrics import PERCENTILES, REGISTRY, Registry
+
+
+class ShadowMessage:
+    """What telegram.Bot.send_message returns, as far as the bot cares."""
+
+    def __init__(self, message_id: int, chat_id, text: str):
+        self.message_id = message_id
+        self.chat_id = chat_id
+        self.text = text
+
+
+class ShadowBot:
+    """Record messages to the sink instead of sending them."""
+
+    def __init__(self, sink, clock=time.time):
+        self.sink = sink
+        self._clock = clock
+        self._message_ids = itertools.count(1)
+
+    def _emit(self, action: str, chat_id, text: str, **extra) -> None:
+        self.sink.emit({
+            'event': 'would_send',
+            'action': action,
+            'chat_id': str(chat_id),
+            'text': text,
+            't': self._clock(),
+            **extra,
+        })
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Record the message."""
+        message = ShadowMessage(next(self._message_ids), chat_id, text)
+        self._emit('send', chat_id, text, message_id=message.message_id)
+        return message
+
+    def edit_message_text(self, text=None, chat_id=None, message_id=None,
+                          **kwargs):
+        """Record the edit of the message."""
+        self._emit('edit', chat_id, text, message_id=message_id)
+        return True
+
+
+def stage_summary(registry: Registry = REGISTRY) -> Dict[str, dict]:
+    """Return count and percentiles of every stage."""
+    histogram = registry.histogram('stage_seconds')
+    summary = {}
+    for name, labels, value in histogram.samples('stage_seconds'):
+        labels = dict(labels)
+        stage = summary.setdefault(labels['stage'], {})
+        if 'quantile' in labels:
+            stage[f'p{int(float(labels["quantile"]) * 100)}'] = value
+        elif name.endswith('_count'):
+            stage['count'] = value
+    return summary
+
+
+def write_stages(sink, registry: Registry = REGISTRY) -> None:
+    """Write the 'stages' event to the sink."""
+    sink.emit({
+        'event': 'stages', 't': time.time(), 'stages': stage_summary(registry)
+    })
+
+
+def read_events(path: str) -> List[dict]:
+    """Read events of a JSONL file."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def messages(events: Iterable[dict], kind: str = 'would_send') -> Counter:
+    """Count (chat_id, text) of the events of the kind.
+
+    'would_send' events are messages of the shadow, 'status_changed' ones
+    are status events of EVENT_SINKS or of the shadow.
+    """
+    field = 'text' if kind == 'would_send' else 'message'
+    result: Counter = Counter()
+    for event in events:
+        if event.get('event') == kind:
+            result[(str(event['chat_id']), event[field])] += 1
+    return result
+
+
+def comparable_kind(baseline: Iterable[dict]) -> str:
+    """Kind of events to compare: messages if the baseline has them."""
+    if any(event.get('event') == 'would_send' for event in baseline):
+        return 'would_send'
+    return 'status_changed'
+
+
+def compare(shadow: Counter,
+            baseline: Counter) -> Tuple[Counter, Counter]:
+    """Return messages only the shadow sent and only the baseline sent."""
+    return shadow - baseline, baseline - shadow
+
+
+def main():
+    """Print the report of the dry run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='file the dry run wrote events to')
+    parser.add_argument('--baseline', help='events of the live worker')
+    args = parser.parse_args()
+    events = read_events(args.path)
+    shadow = messages(events)
+    print(f'Would have sent {sum(shadow.values())} messages '
+          f'to {len({chat for chat, _ in shadow})} chats')
+    stages = [event for event in events if event.get('event') == 'stages']
+    if stages:
+        quantiles = ', '.join(f'p{int(q * 100)}' for q in PERCENTILES)
+        print(f'Stage latency, seconds ({quantiles}):')
+        for stage, values in sorted(stages[-1]['stages'].items()):
+            numbers = ', '.join(
+                f'{values.get(f"p{int(q * 100)}", float("nan")):.4f}'
+                for q in PERCENTILES
+            )
+            print(f'  {stage}: {numbers} ({values.get("count", 0)} calls)')
+    if args.baseline:
+        baseline = read_events(args.baseline)
+        kind = comparable_kind(baseline)
+        only_shadow, only_baseline = compare(
+            messages(events, kind), messages(baseline, kind)
+        )
+        print(f'Compared {kind} events')
+        print(f'Only in dry run: {sum(only_shadow.values())}')
+        for (chat_id, text), count in sorted(only_shadow.items()):
+            print(f'  + [{chat_id}] x{count} {text}')
+        print(f'Only in baseline: {sum(only_baseline.values())}')
+        for (chat_id, text), count in sorted(only_baseline.items()):
+            print(f'  - [{chat_id}] x{count} {text}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Event sinks: where status change events go besides telegram.
+
+Every sink has its own worker thread and a bounded queue. emit() never
+waits: if the queue of a slow sink is full the event is dropped for that
+sink only, so neither polling nor other sinks are stalled.
+"""
+
+import json
+import logging
+import queue
+import sys
+import threading
+from typing import Iterable, List, Optional, TextIO
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SINK_QUEUE_SIZE: int = 1000
+HTTP_SINK_TIMEOUT: int = 10
+_STOP = object()
+
+
+class EventSink:
+    """Base class of sinks. Subclasses implement write(event)."""
+
+    name = 'sink'
+
+    def __init__(self, queue_size: int = SINK_QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(
+            target=self._work, name=f'sink-{self.name}', daemon=True
+        )
+        self._thread.start()
+
+    def write(self, event: dict) -> None:
+        """Deliver one event. Runs in the worker thread."""
+        raise NotImplementedError
+
+    def emit(self, event: dict) -> bool:
+        """Queue the event without waiting. Return False if it was dropped."""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f'Sink {self.name} is full, event dropped')
+            return False
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Deliver queued events and stop the worker."""
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _work(self) -> None:
+        while True:
+            event = self.queue.get()
+            if event is _STOP:
+                return
+            try:
+                self.write(event)
+            except Exception:
+                self.failed += 1
+                logger.exception(f'Sink {self.name} failed to write event')
+
+
+class StdoutSink(EventSink):
+    """Print events as JSON lines."""
+
+    name = 'stdout'
+
+    def __init__(self, stream: TextIO = sys.stdout, **kwargs):
+        self.stream = stream
+        super().__init__(**kwargs)
+
+    def write(self, event: dict) -> None:
+        """Print the event."""
+        self.stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+class JsonlSink(EventSink):
+    """Append events to a JSONL file."""
+
+    name = 'jsonl'
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, event: dict) -> None:
+        """Append the event to the file."""
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+class HttpSink(EventSink):
+    """POST events as JSON to a webhook."""
+
+    name = 'http'
+
+    def __init__(self, url: str, timeout: float = HTTP_SINK_TIMEOUT,
+                 **kwargs):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        super().__init__(**kwargs)
+
+    def write(self, event: dict) -> None:
+        """POST the event, non 2xx answer is an error."""
+        response = self.session.post(
+            self.url, json=event, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class SinkHub:
+    """Fan out events to all the sinks."""
+
+    def __init__(self, sinks: Iterable[EventSink] = ()):
+        self.sinks: List[EventSink] = list(sinks)
+
+    def emit(self, event: dict) -> None:
+        """Queue the event in every sink."""
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Close every sink."""
+        for sink in self.sinks:
+            sink.close(timeout)
+
+
+def build_sinks(spec: str) -> SinkHub:
+    """Create sinks from a comma separated spec.
+
+    Items of the spec: 'stdout', 'jsonl:<path>', 'http://...', 'https://...'.
+    """
+    sinks: List[EventSink] = []
+    for item in filter(None, (item.strip() for item in spec.split(','))):
+        if item == 'stdout':
+            sinks.append(StdoutSink())
+        elif item.startswith('jsonl:'):
+            sinks.append(JsonlSink(item[len('jsonl:'):]))
+        elif item.startswith(('http://', 'https://')):
+            sinks.append(HttpSink(item))
+        else:
+            raise ValueError(f'Unknown event sink: {item}')
+    return SinkHub(sinks)
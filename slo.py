@@ -0,0 +1,135 @@
+"""Latency of notifications: from a status change to the message.
+
+For every change of status the bot delivers:
+- detection delay: time of the poll which found the change minus
+  date_updated of the homework;
+- delivery delay: time the message was sent minus the time of detection;
+- latency: both together, what the student waits for.
+
+A notification with latency over the objective is a breach. The SLO is
+breached while the `percentile` of recent latencies is over the
+objective. Changes made before the tracker started (e.g. while the bot
+was down) are not measured. A change is measured once: the same status
+sent again after a failure of API has the old date_updated and is not a
+late notification. Measured changes are remembered per tenant and
+homework, for the MEASURED_SIZE most recent of them.
+"""
+
+import calendar
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from metrics import REGISTRY, Registry
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MEASURED_SIZE = 100000
+
+
+def parse_date(value) -> Optional[float]:
+    """Timestamp of date_updated of a homework, None if it is invalid."""
+    try:
+        return float(calendar.timegm(time.strptime(value, DATE_FORMAT)))
+    except (TypeError, ValueError):
+        return None
+
+
+class Detection:
+    """A change of status found by a poll."""
+
+    def __init__(self, updated_at: float, detected_at: float, key=None):
+        self.updated_at = updated_at
+        self.detected_at = detected_at
+        self.key = key
+
+
+class LatencyTracker:
+    """Measure notifications against `objective` seconds.
+
+    At most `measured_size` measured changes are remembered, the least
+    recently measured ones are forgotten first.
+    """
+
+    def __init__(self, objective: float, percentile: float = 0.9,
+                 clock: Callable[[], float] = time.time,
+                 registry: Registry = REGISTRY,
+                 measured_size: int = MEASURED_SIZE):
+        self.objective = objective
+        self.percentile = percentile
+        self.measured_size = measured_size
+        self._clock = clock
+        self.started_at = clock()
+        self._lock = threading.Lock()
+        # date_updated of the last measured change by (tenant, homework).
+        self._measured: 'OrderedDict[tuple, float]' = OrderedDict()
+        self.detection = registry.histogram(
+            'notification_detection_delay_seconds',
+            'Time from date_updated of the homework to the poll detecting it'
+        )
+        self.delivery = registry.histogram(
+            'notification_delivery_delay_seconds',
+            'Time from detection of the change to the message sent'
+        )
+        self.latency = registry.histogram(
+            'notification_latency_seconds',
+            'Time from date_updated of the homework to the message sent'
+        )
+        self.breaches = registry.counter(
+            'notification_slo_breaches_total',
+            'Notifications sent later than the objective'
+        )
+        self.breached_gauge = registry.gauge(
+            'notification_slo_breached',
+            '1 if the percentile of latency is over the objective'
+        )
+
+    def detected(self, homework: dict,
+                 tenant=None) -> Optional[Detection]:
+        """Record detection of the changed status of the tenant's homework."""
+        updated_at = parse_date(homework.get('date_updated'))
+        if updated_at is None or updated_at < self.started_at:
+            return None
+        key = (tenant, homework.get('id', homework.get('homework_name')))
+        with self._lock:
+            if self._measured.get(key) == updated_at:
+                return None
+        detection = Detection(updated_at, self._clock(), key)
+        self.detection.observe(max(detection.detected_at - updated_at, 0.0))
+        return detection
+
+    def delivered(self, detection: Optional[Detection]) -> None:
+        """Record that the message about the detected change is sent."""
+        if detection is None:
+            return
+        with self._lock:
+            self._measured[detection.key] = detection.updated_at
+            self._measured.move_to_end(detection.key)
+            while len(self._measured) > self.measured_size:
+                self._measured.popitem(last=False)
+        now = self._clock()
+        self.delivery.observe(max(now - detection.detected_at, 0.0))
+        latency = max(now - detection.updated_at, 0.0)
+        self.latency.observe(latency)
+        if latency > self.objective:
+            self.breaches.inc()
+            logger.warning(
+                f'Notification latency {latency:.0f}s is over the '
+                f'objective of {self.objective:.0f}s'
+            )
+        self.breached_gauge.set(int(self.breached()))
+
+    def breached(self) -> bool:
+        """Check that the percentile of latency is over the objective."""
+        return self.latency.percentile(self.percentile) > self.objective
+
+    def tracked(self, detection: Optional[Detection],
+                delivery: Callable[[], None]) -> Callable[[], None]:
+        """Wrap the delivery to record its success."""
+        def deliver():
+            delivery()
+            self.delivered(detection)
+        return deliver
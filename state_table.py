@@ -0,0 +1,147 @@
+"""Compact state of hundreds of thousands of tenants.
+
+Instead of an object (or a pair of report dicts holding whole API answers)
+per tenant, the state is a table: every column is an array with one
+element per row, the row of a tenant is found by its id in a dict.
+A tenant costs a couple of hundred bytes, mostly its id and the entry of
+the dict, instead of kilobytes. TenantRegistry keeps the state of its
+tenants here. Columns:
+- cursor: from_date of the next request to API;
+- fingerprint: 64-bit hash of the last message (fingerprint_of());
+- status_fingerprint: the same of the last message about a status;
+- status: status of the latest homework interned to a small code;
+- last_poll: when the tenant was polled, NaN if never;
+- quarantined_at: when the token was rejected, NaN if it was not.
+Comparison with dicts: python -m benchmarks.bench_state.
+"""
+
+import hashlib
+import math
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+NEVER: float = math.nan
+COLUMNS = (
+    'cursor', 'fingerprint', 'status_fingerprint', 'status', 'last_poll',
+    'quarantined_at',
+)
+
+
+def fingerprint_of(text: str) -> int:
+    """64-bit hash of the text, e.g. of the last message."""
+    return int.from_bytes(
+        hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class StatusCodes:
+    """Status strings interned to small numbers, 0 is no status."""
+
+    def __init__(self, statuses: Iterable[str] = ()):
+        self._names: List[str] = ['']
+        self._codes: Dict[str, int] = {'': 0}
+        self._lock = threading.Lock()
+        for status in statuses:
+            self.code(status)
+
+    def code(self, status: str) -> int:
+        """Number of the status, new statuses get the next one."""
+        code = self._codes.get(status)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(status)
+                if code is None:
+                    code = self._codes[status] = len(self._names)
+                    self._names.append(status)
+        return code
+
+    def name(self, code: int) -> str:
+        """Status by its number."""
+        return self._names[code]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class StateTable:
+    """Columns of the state of tenants, rows looked up by tenant id.
+
+    Rows of removed tenants are reused by new ones.
+    """
+
+    def __init__(self, statuses: Iterable[str] = ()):
+        self.codes = StatusCodes(statuses)
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free_rows = array('q')
+        self.cursor = array('q')
+        self.fingerprint = array('Q')
+        self.status_fingerprint = array('Q')
+        self.status = array('H')
+        self.last_poll = array('d')
+        self.quarantined_at = array('d')
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, tenant_id) -> bool:
+        return tenant_id in self._rows
+
+    def row(self, tenant_id: str) -> int:
+        """Row of the tenant, KeyError if there is none."""
+        return self._rows[tenant_id]
+
+    def add(self, tenant_id: str, cursor: int = 0,
+            last_poll: float = NEVER) -> int:
+        """Row of the tenant, a new one if the tenant is not in the table."""
+        with self._lock:
+            row = self._rows.get(tenant_id)
+            if row is not None:
+                return row
+            values = (cursor, 0, 0, 0, last_poll, NEVER)
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._ids[row] = tenant_id
+                for column, value in zip(COLUMNS, values):
+                    getattr(self, column)[row] = value
+            else:
+                row = len(self._ids)
+                self._ids.append(tenant_id)
+                for column, value in zip(COLUMNS, values):
+                    getattr(self, column).append(value)
+            self._rows[tenant_id] = row
+            return row
+
+    def remove(self, tenant_id: str) -> None:
+        """Forget the tenant."""
+        with self._lock:
+            row = self._rows.pop(tenant_id)
+            self._ids[row] = None
+            self._free_rows.append(row)
+
+    def move(self, tenant_id: str, table: 'StateTable') -> int:
+        """Move the row of the tenant to the other table, return the row."""
+        source = self._rows[tenant_id]
+        row = table.add(tenant_id)
+        for column in COLUMNS:
+            getattr(table, column)[row] = getattr(self, column)[source]
+        table.status[row] = table.codes.code(
+            self.codes.name(self.status[source])
+        )
+        self.remove(tenant_id)
+        return row
+
+    def tenants(self) -> List[str]:
+        """Ids of the tenants."""
+        with self._lock:
+            return list(self._rows)
+
+    def status_of(self, row: int) -> str:
+        """Status of the latest homework of the row, '' if it is unknown."""
+        return self.codes.name(self.status[row])
+
+    def set_status(self, row: int, status: str) -> None:
+        """Remember the status of the latest homework of the row."""
+        self.status[row] = self.codes.code(status)
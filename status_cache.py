@@ -0,0 +1,74 @@
+"""Cache of the last API answer used to serve on-demand commands."""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class StatusCache:
+    """Keep the last answer from Практикум.Домашка for `ttl` seconds.
+
+    Only one caller refreshes a stale answer at a time (single-flight):
+    the rest wait for it and get the refreshed answer (or its error)
+    instead of sending their own request to API.
+    """
+
+    def __init__(self, ttl: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._answer: Optional[dict] = None
+        self._updated_at: Optional[float] = None
+        # Number of finished refreshes and the error of the last one.
+        self._refreshes = 0
+        self._error: Optional[Exception] = None
+
+    def update(self, answer: dict) -> None:
+        """Store a fresh answer (e.g. the one main() has just received)."""
+        with self._lock:
+            self._answer = answer
+            self._updated_at = self._clock()
+
+    def peek(self) -> Optional[dict]:
+        """Return the cached answer whatever its age is."""
+        with self._lock:
+            return self._answer
+
+    def is_fresh(self) -> bool:
+        """Check that the cached answer is younger than ttl."""
+        with self._lock:
+            return (
+                self._updated_at is not None
+                and self._clock() - self._updated_at < self.ttl
+            )
+
+    def get(self, fetch: Callable[[], dict]) -> dict:
+        """Return the cached answer, calling `fetch` only if it is stale.
+
+        Callers which waited for a failed refresh get its error.
+        """
+        if self.is_fresh():
+            return self.peek()
+        with self._lock:
+            refreshes = self._refreshes
+        with self._refresh_lock:
+            # Somebody could have refreshed the answer while we were waiting.
+            if self.is_fresh():
+                return self.peek()
+            with self._lock:
+                if self._refreshes != refreshes and self._error is not None:
+                    raise self._error
+            try:
+                answer = fetch()
+            except Exception as error:
+                with self._lock:
+                    self._refreshes += 1
+                    self._error = error
+                raise
+            with self._lock:
+                self._refreshes += 1
+                self._error = None
+            self.update(answer)
+            return answer
@@ -0,0 +1,221 @@
+"""Runtime state of the tenants polled by one process."""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from admission import IDLE, REVIEWING
+from conditional import ConditionalCache
+from config import Tenant
+from state_table import NEVER, StateTable, fingerprint_of
+from status_cache import StatusCache
+
+
+def _optional_time(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class TenantState:
+    """What the bot remembers about a tenant between cycles.
+
+    Numbers are kept in the row of the tenant in `table` (a table of its
+    own if none is given): the cursor, the status of the latest homework,
+    the times of the last poll and of quarantine and fingerprints of the
+    last messages instead of their text. The answer of API is kept only
+    for chats using /status (`cache`, on the `clock`) and with
+    `conditional` requests.
+    """
+
+    __slots__ = (
+        'tenant', 'cache_ttl', 'clock', 'http_cache', '_place', '_cache',
+    )
+
+    def __init__(self, tenant: Tenant, timestamp: int, cache_ttl: float,
+                 conditional: bool = False,
+                 table: Optional[StateTable] = None,
+                 cache: Optional[StatusCache] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tenant = tenant
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        table = StateTable() if table is None else table
+        # Replaced at once by detach(), so the pair is always consistent.
+        self._place = (table, table.add(tenant.id, cursor=timestamp))
+        self._cache = cache
+        self.http_cache: Optional[ConditionalCache] = (
+            ConditionalCache() if conditional else None
+        )
+
+    @property
+    def cache(self) -> StatusCache:
+        """Cache of answers for /status, created on the first command."""
+        if self._cache is None:
+            self._cache = StatusCache(ttl=self.cache_ttl, clock=self.clock)
+        return self._cache
+
+    def reset_caches(self) -> None:
+        """Forget cached answers, e.g. of the previous token."""
+        self._cache = None
+        if self.http_cache is not None:
+            self.http_cache = ConditionalCache()
+
+    def observe(self, answer: dict) -> None:
+        """Remember the status of the latest homework of the answer.
+
+        The answer is also cached if the chat uses /status.
+        """
+        homeworks = answer.get('homeworks') or []
+        table, row = self._place
+        table.set_status(
+            row, homeworks[0].get('status', '') if homeworks else ''
+        )
+        if self._cache is not None:
+            self._cache.update(answer)
+
+    @property
+    def priority(self) -> str:
+        """Priority class of requests of the tenant (see admission.py)."""
+        table, row = self._place
+        return REVIEWING if table.status_of(row) == REVIEWING else IDLE
+
+    @property
+    def timestamp(self) -> int:
+        """from_date of requests to API."""
+        table, row = self._place
+        return table.cursor[row]
+
+    @property
+    def last_poll(self) -> Optional[float]:
+        """When the tenant was polled, None if never."""
+        table, row = self._place
+        return _optional_time(table.last_poll[row])
+
+    @last_poll.setter
+    def last_poll(self, value: Optional[float]) -> None:
+        table, row = self._place
+        table.last_poll[row] = NEVER if value is None else value
+
+    @property
+    def quarantined_at(self) -> Optional[float]:
+        """When the token was rejected, None if it is not quarantined."""
+        table, row = self._place
+        return _optional_time(table.quarantined_at[row])
+
+    @quarantined_at.setter
+    def quarantined_at(self, value: Optional[float]) -> None:
+        table, row = self._place
+        table.quarantined_at[row] = NEVER if value is None else value
+
+    def is_new(self, message: str) -> bool:
+        """Check that the message differs from the last one sent."""
+        table, row = self._place
+        return table.fingerprint[row] != fingerprint_of(message)
+
+    def is_last_status(self, message: str) -> bool:
+        """Check that the message is the same as the last status sent."""
+        table, row = self._place
+        return table.status_fingerprint[row] == fingerprint_of(message)
+
+    def remember(self, message: str, status: bool = False) -> None:
+        """Remember the message as the last one sent, `status` if it is."""
+        table, row = self._place
+        fingerprint = fingerprint_of(message)
+        table.fingerprint[row] = fingerprint
+        if status:
+            table.status_fingerprint[row] = fingerprint
+
+    def detach(self) -> None:
+        """Move the row to a table of its own, the shared one forgets it.
+
+        A poll still running for a removed tenant does not write into the
+        row the table gives to another one.
+        """
+        shared, _ = self._place
+        table = StateTable()
+        self._place = (table, shared.move(self.tenant.id, table))
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Headers of requests to API with the token of the tenant."""
+        return {'Authorization': f'OAuth {self.tenant.practicum_token}'}
+
+
+class TenantRegistry:
+    """Tenants by id. Applying a new config keeps state of existing ones.
+
+    States of all tenants are rows of one StateTable. With `conditional`
+    requests of every tenant are conditional. Answers for /status are
+    cached on the `clock`.
+    """
+
+    def __init__(self, cache_ttl: float = 600, conditional: bool = False,
+                 clock: Callable[[], float] = time.monotonic):
+        self.cache_ttl = cache_ttl
+        self.conditional = conditional
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.table = StateTable()
+        self._states: Dict[str, TenantState] = {}
+        self._by_chat: Dict[str, TenantState] = {}
+
+    def apply(self, tenants: Iterable[Tenant], timestamp: int) -> None:
+        """Add new tenants, remove missing ones, update changed ones."""
+        tenants = {tenant.id: tenant for tenant in tenants}
+        with self._lock:
+            for tenant_id in set(self._states) - set(tenants):
+                self._states.pop(tenant_id).detach()
+            for tenant_id, tenant in tenants.items():
+                state = self._states.get(tenant_id)
+                if state is None:
+                    self._states[tenant_id] = TenantState(
+                        tenant, timestamp, self.cache_ttl, self.conditional,
+                        self.table, clock=self.clock,
+                    )
+                else:
+                    if tenant.practicum_token != state.tenant.practicum_token:
+                        # Answers to the old token are not answers to the
+                        # new one, which deserves a poll at once.
+                        state.reset_caches()
+                        state.quarantined_at = None
+                        state.last_poll = None
+                    state.tenant = tenant
+            self._by_chat = {
+                state.tenant.chat_id: state
+                for state in self._states.values()
+            }
+
+    def states(self) -> List[TenantState]:
+        """Snapshot of the states to iterate over."""
+        with self._lock:
+            return list(self._states.values())
+
+    def unpolled(self) -> List[TenantState]:
+        """States of new tenants and of changed tokens, not polled yet."""
+        with self._lock:
+            return [
+                state for state in self._states.values()
+                if state.last_poll is None
+            ]
+
+    def quarantined(self) -> int:
+        """Number of tenants in quarantine."""
+        with self._lock:
+            return sum(
+                state.quarantined_at is not None
+                for state in self._states.values()
+            )
+
+    def get(self, tenant_id: str) -> Optional[TenantState]:
+        """Return state of the tenant or None."""
+        with self._lock:
+            return self._states.get(tenant_id)
+
+    def by_chat(self, chat_id) -> Optional[TenantState]:
+        """Return state of the tenant sending statuses to the chat."""
+        with self._lock:
+            return self._by_chat.get(str(chat_id))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
@@ -0,0 +1,118 @@
+"""HTTP transports used to request Практикум.Домашка.
+
+- RequestsTransport: plain requests.get, a connection per request.
+- PooledTransport: requests.Session keeping up to pool_size HTTP/1.1
+  connections alive; extra concurrent requests wait for a free one.
+- HTTP2Transport: httpx client multiplexing concurrent requests over a
+  few HTTP/2 connections. Needs the optional `httpx[http2]` package.
+
+Every transport has get(url, headers, params, timeout) returning an
+object with status_code, headers and json(). Network errors are raised
+as requests.RequestException or TransportError.
+"""
+
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from exceptions import TransportError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+REQUEST_TIMEOUT: int = 30
+POOL_SIZE: int = 10
+
+
+class RequestsTransport:
+    """requests.get, the way the bot has always worked."""
+
+    def get(self, url: str, headers: dict, params: dict,
+            timeout: Optional[float] = REQUEST_TIMEOUT):
+        """Send GET request."""
+        return requests.get(
+            url=url, headers=headers, params=params, timeout=timeout
+        )
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+class PooledTransport:
+    """requests.Session with a bounded pool of keep-alive connections."""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, headers: dict, params: dict,
+            timeout: Optional[float] = REQUEST_TIMEOUT):
+        """Send GET request over one of the pooled connections."""
+        return self.session.get(
+            url, headers=headers, params=params, timeout=timeout
+        )
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+
+class HTTP2Transport:
+    """httpx client speaking HTTP/2.
+
+    With `prior_knowledge` HTTP/2 is used without TLS negotiation, which is
+    only needed for plain http:// test servers.
+    """
+
+    def __init__(self, max_connections: int = 2,
+                 prior_knowledge: bool = False):
+        if httpx is None:
+            raise TransportError(
+                'HTTP/2 transport needs httpx: pip install "httpx[http2]"'
+            )
+        try:
+            self.client = httpx.Client(
+                http1=not prior_knowledge,
+                http2=True,
+                limits=httpx.Limits(max_connections=max_connections),
+            )
+        except ImportError as error:
+            # httpx is installed without the http2 extra (h2).
+            raise TransportError(
+                'HTTP/2 transport needs h2: pip install "httpx[http2]"'
+            ) from error
+
+    def get(self, url: str, headers: dict, params: dict,
+            timeout: Optional[float] = REQUEST_TIMEOUT):
+        """Send GET request as a stream of a shared HTTP/2 connection."""
+        try:
+            return self.client.get(
+                url, headers=headers, params=params, timeout=timeout
+            )
+        except httpx.HTTPError as error:
+            raise TransportError(str(error)) from error
+
+    def close(self) -> None:
+        """Close HTTP/2 connections."""
+        self.client.close()
+
+
+def make_transport(name: str, pool_size: int = POOL_SIZE):
+    """Create transport by its name: 'requests', 'pooled' or 'http2'.
+
+    `pool_size` limits connections of 'pooled' and 'http2'.
+    """
+    if name == 'requests':
+        return RequestsTransport()
+    if name == 'pooled':
+        return PooledTransport(pool_size)
+    if name == 'http2':
+        return HTTP2Transport(pool_size)
+    raise ValueError(f'Unknown HTTP transport: {name}')
@@ -0,0 +1,76 @@
+"""Inbound telegram updates: command dispatching and long-polling."""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import telegram
+
+logger = logging.getLogger(__name__)
+
+GET_UPDATES_TIMEOUT: int = 30
+GET_UPDATES_RETRY: int = 5
+
+
+class CommandDispatcher:
+    """Route '/command' messages to the registered callbacks.
+
+    Callback is called as callback(bot, update).
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable] = {}
+
+    def add_handler(self, command: str, callback: Callable) -> None:
+        """Register callback for the command (without leading slash)."""
+        self._handlers[command] = callback
+
+    def dispatch(self, bot, update: telegram.Update) -> None:
+        """Call the handler of the command in the update if there is one."""
+        message = update.effective_message
+        if message is None or not message.text:
+            return
+        if not message.text.startswith('/'):
+            return
+        # '/status@practicum_review_status_bot args' -> 'status'
+        command = message.text.split()[0][1:].split('@')[0]
+        callback = self._handlers.get(command)
+        if callback is None:
+            logger.debug(f'No handler for command "{command}"')
+            return
+        try:
+            callback(bot, update)
+        except Exception:
+            logger.exception(f'Handler of command "{command}" failed')
+
+
+def poll_updates(bot, dispatcher: CommandDispatcher,
+                 stop_event: threading.Event) -> None:
+    """Long-poll getUpdates and dispatch updates until stop_event is set."""
+    logger.debug('poll_updates started')
+    offset: Optional[int] = None
+    while not stop_event.is_set():
+        try:
+            updates = bot.get_updates(
+                offset=offset, timeout=GET_UPDATES_TIMEOUT
+            )
+        except telegram.error.TelegramError:
+            logger.exception('Failed to get updates from telegram')
+            stop_event.wait(GET_UPDATES_RETRY)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            dispatcher.dispatch(bot, update)
+
+
+def start_polling(bot, dispatcher: CommandDispatcher) -> threading.Event:
+    """Run poll_updates in a daemon thread. Set returned event to stop it."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=poll_updates,
+        args=(bot, dispatcher, stop_event),
+        name='telegram-updates',
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
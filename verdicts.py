@@ -0,0 +1,127 @@
+"""Catalog of status messages in several locales.
+
+Templates are compiled once when the catalog is created, rendered
+messages are cached by (homework name, status, locale), so sending the
+same status to many chats costs one rendering.
+
+Catalog file (JSON) adds locales or overrides parts of them, verdicts
+of a locale are overridden one by one:
+{
+    "en": {
+        "message": "Review status of \\"$homework_name\\" changed. $verdict",
+        "unknown": "Review status of \\"$homework_name\\" is \\"$status\\".",
+        "verdicts": {"approved": "...", "reviewing": "...", "rejected": "..."}
+    }
+}
+"""
+
+import json
+from functools import lru_cache
+from string import Template
+from typing import Dict, Optional
+
+RENDER_CACHE_SIZE: int = 4096
+
+BUILTIN_LOCALES: Dict[str, dict] = {
+    'ru': {
+        'message': 'Изменился статус проверки работы "$homework_name". '
+                   '$verdict',
+        'unknown': 'Изменился статус проверки работы "$homework_name": '
+                   '$status.',
+        'verdicts': {},
+    },
+    'en': {
+        'message': 'Review status of "$homework_name" changed. $verdict',
+        'unknown': 'Review status of "$homework_name" changed: $status.',
+        'verdicts': {
+            'approved': 'The reviewer liked everything. Hooray!',
+            'reviewing': 'The reviewer has started the review.',
+            'rejected': 'The reviewer has some remarks.',
+        },
+    },
+}
+
+
+class UnknownStatusError(KeyError):
+    """Status has no verdict in the locale."""
+
+
+class VerdictCatalog:
+    """Compiled templates of every locale."""
+
+    def __init__(self, locales: Dict[str, dict], default_locale: str = 'ru'):
+        if default_locale not in locales:
+            raise ValueError(f'No default locale {default_locale} in catalog')
+        self.default_locale = default_locale
+        self._templates: Dict[str, Template] = {}
+        self._unknown: Dict[str, Template] = {}
+        self._verdicts: Dict[str, Dict[str, str]] = {}
+        for locale, spec in locales.items():
+            try:
+                self._templates[locale] = Template(spec['message'])
+                self._unknown[locale] = Template(spec['unknown'])
+                self._verdicts[locale] = dict(spec['verdicts'])
+            except (KeyError, TypeError) as error:
+                raise ValueError(
+                    f'Invalid locale {locale} in catalog: {error!r}'
+                ) from error
+        self.render = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render)
+
+    @classmethod
+    def build(cls, verdicts: Dict[str, str], path: Optional[str] = None,
+              default_locale: str = 'ru') -> 'VerdictCatalog':
+        """Make catalog of built-in locales, `verdicts` and the file.
+
+        `verdicts` are the verdicts of the 'ru' locale.
+        """
+        locales = {
+            locale: dict(spec, verdicts=dict(spec['verdicts']))
+            for locale, spec in BUILTIN_LOCALES.items()
+        }
+        locales['ru']['verdicts'].update(verdicts)
+        if path:
+            try:
+                with open(path, encoding='utf-8') as file:
+                    loaded = json.load(file)
+            except (OSError, ValueError) as error:
+                raise ValueError(f'Failed to read catalog: {error}') from error
+            if not isinstance(loaded, dict):
+                raise ValueError('Catalog must be an object of locales')
+            for locale, spec in loaded.items():
+                if not isinstance(spec, dict) or not isinstance(
+                    spec.get('verdicts', {}), dict
+                ):
+                    raise ValueError(
+                        f'Invalid locale {locale} in catalog: an object '
+                        'with an object of verdicts is expected'
+                    )
+                current = locales.get(locale, {})
+                locales[locale] = {
+                    **current, **spec,
+                    'verdicts': {
+                        **current.get('verdicts', {}),
+                        **spec.get('verdicts', {}),
+                    },
+                }
+        return cls(locales, default_locale)
+
+    def has_locale(self, locale: str) -> bool:
+        """Check that the locale is in the catalog."""
+        return locale in self._templates
+
+    def _render(self, homework_name: str, status: str,
+                locale: Optional[str] = None, strict: bool = False) -> str:
+        if locale not in self._templates:
+            locale = self.default_locale
+        verdict = self._verdicts[locale].get(status)
+        if verdict is None:
+            if strict:
+                raise UnknownStatusError(
+                    f'Unknown status of the homework: {status}'
+                )
+            return self._unknown[locale].safe_substitute(
+                homework_name=homework_name, status=status
+            )
+        return self._templates[locale].safe_substitute(
+            homework_name=homework_name, verdict=verdict
+        )
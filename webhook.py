@@ -0,0 +1,95 @@
+"""Webhook receiver for inbound telegram updates.
+
+Telegram POSTs every update as JSON to WEBHOOK_URL. The local HTTP server
+answers at once and hands the update over to a small pool of workers, so
+neither slow handlers nor the server itself block polling of
+Практикум.Домашка.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+import telegram
+
+from updates import CommandDispatcher
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_WORKERS: int = 4
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTP server accepting updates at `path` only."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], path: str, bot,
+                 dispatcher: CommandDispatcher,
+                 workers: int = WEBHOOK_WORKERS):
+        super().__init__(address, WebhookRequestHandler)
+        self.webhook_path = path
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='webhook-worker'
+        )
+
+    def handle_update(self, data: dict) -> None:
+        """Schedule dispatching of the update, do not wait for it.
+
+        ValueError if the data is not an update.
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Update is not a JSON object')
+        try:
+            update = telegram.Update.de_json(data, self.bot)
+        except (AttributeError, KeyError, TypeError) as error:
+            raise ValueError(f'Malformed update: {error!r}') from error
+        if update is None:
+            raise ValueError('Update is empty')
+        self.executor.submit(self.dispatcher.dispatch, self.bot, update)
+
+    def serve_in_thread(self) -> threading.Thread:
+        """Run serve_forever in a daemon thread."""
+        thread = threading.Thread(
+            target=self.serve_forever, name='telegram-webhook', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def server_close(self):
+        """Stop accepting updates and wait for the scheduled ones."""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """Accept POSTed updates and reply 200 right away."""
+
+    def do_POST(self):
+        """Pass the update to the server, reply with 200."""
+        if self.path != self.server.webhook_path:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length < 0:
+                raise ValueError(f'Content-Length is negative: {length}')
+            data = json.loads(self.rfile.read(length))
+            self.server.handle_update(data)
+        except ValueError:
+            logger.exception('Got malformed update from telegram')
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        """Write access log to the module logger instead of stderr."""
+        logger.debug(format % args)